@@ -9,10 +9,11 @@ __version__ = "1.0.0"
 __author__ = "Financial Analysis Team"
 
 from .core.financial_analyzer import (
-    setup_environment,
     load_financial_data,
     load_financial_indicators,
+    setup_environment,
     generate_financial_report,
+    agenerate_financial_report,
     extract_simple_table,
     extract_structured_tables
 )
@@ -22,10 +23,11 @@ from .storage.database_manager import db_manager
 from .storage.gcs_client import get_gcs_client
 
 __all__ = [
-    "setup_environment",
     "load_financial_data",
     "load_financial_indicators",
+    "setup_environment",
     "generate_financial_report",
+    "agenerate_financial_report",
     "extract_simple_table",
     "extract_structured_tables",
     "FinancialReportAgent",
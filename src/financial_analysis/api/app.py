@@ -5,39 +5,41 @@ Provides endpoints for uploading Excel files, analyzing financial data,
 and generating reports using OpenAI GPT.
 """
 
-import os
+import asyncio
 import uuid
-import tempfile
-import shutil
-import io
 from datetime import datetime
 from typing import Dict, List, Optional, Any
-from pathlib import Path
 from contextlib import asynccontextmanager
 import json
 
-import pandas as pd
-from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks, Query
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
 import uvicorn
 
 # Import core financial analysis functionality
-from ..core.financial_analyzer import (
-    setup_environment,
-    load_financial_data,
-    load_financial_indicators,
-    generate_financial_report,
-    extract_simple_table,
-    extract_structured_tables
-)
+from ..core.financial_analyzer import astream_financial_report, IncrementalTableExtractor
+from ..core.indicator_registry import get_indicator_registry
+from ..core import llm_client
 # Import the financial agent
 from ..services.financial_agent import FinancialReportAgent
 from ..services.vector_processing import get_vector_processing_service
+from ..services.hybrid_retriever import get_hybrid_retriever
+from ..services.ingest_pipeline import get_ingest_pipeline, IngestQueueFull, IngestPipelineUnavailable
+from ..services.analysis_jobs import (
+    get_analysis_job_manager,
+    load_analysis_inputs,
+    finalize_report,
+    JobQueueFull,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_CANCELLED
+)
 
 # Import database manager
-from ..storage.database_manager import db_manager
+from ..storage.database_manager import db_manager, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 
 # Custom JSON encoder for datetime objects
 class DateTimeEncoder(json.JSONEncoder):
@@ -46,6 +48,16 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
+def sse_event(event: str, data: Any) -> str:
+    """Format a Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, cls=DateTimeEncoder)}\n\n"
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Upload limits (100MB for local development)
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 # Global variables
 openai_client = None
 financial_agent = None
@@ -59,8 +71,21 @@ async def lifespan(app: FastAPI):
     # Startup
     global openai_client, financial_agent
     try:
-        openai_client = setup_environment()
+        openai_client = llm_client.get_async_client()
+        llm_client.bind_event_loop(asyncio.get_running_loop())
         financial_agent = FinancialReportAgent()
+        # Load the lexical file index now so uploads and searches never build it on the loop
+        await asyncio.to_thread(get_hybrid_retriever().bootstrap)
+        # Documents uploaded before workbook terms were stored are indexed in the background
+        get_hybrid_retriever().start_backfill()
+        try:
+            await get_ingest_pipeline().start()
+            print("✅ Ingest pipeline started")
+        except Exception as e:
+            # The rest of the API works without vectors; /api/vector/process reports 503
+            print(f"❌ Ingest pipeline not started: {str(e)}")
+        indicators = get_indicator_registry().get()
+        print(f"✅ Financial indicators loaded (v{indicators.version})")
         print("✅ OpenAI client initialized successfully")
         print("✅ Financial Agent initialized successfully")
         print("✅ Database initialized successfully")
@@ -72,6 +97,10 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     print("🔄 Shutting down Financial Report API...")
+    get_analysis_job_manager().shutdown()
+    await get_ingest_pipeline().stop()
+    await llm_client.aclose()
+    db_manager.log_sink.close()
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(
@@ -95,6 +124,7 @@ class FinancialIndicators(BaseModel):
     balance_sheet: List[str]
     income_statement: List[str]
     cash_flow: List[str]
+    version: Optional[int] = None
 
 class AnalysisRequest(BaseModel):
     file_id: str
@@ -114,11 +144,25 @@ class ReportResponse(BaseModel):
     tables: Optional[Dict[str, Any]] = None
     status: str
 
+class AnalysisJobResponse(BaseModel):
+    job_id: str
+    file_id: str
+    status: str
+    stage: str
+    progress: int
+    submitted_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    report_id: Optional[str] = None
+    error: Optional[str] = None
+
 class UploadResponse(BaseModel):
     file_id: str
     filename: str
     uploaded_at: datetime
     status: str
+    file_size: Optional[int] = None
+    sha256: Optional[str] = None
 
 @app.get("/")
 async def root():
@@ -126,9 +170,11 @@ async def root():
     return {"message": "Financial Report API is running", "status": "healthy"}
 
 @app.post("/api/financial/upload", response_model=UploadResponse)
-async def upload_excel_file(file: UploadFile = File(...)):
+async def upload_excel_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
     Upload an Excel file for financial analysis
+    Streams the file to storage in chunks, enforcing the size limit and
+    computing a SHA-256 on the way through
     Returns a file ID for later use
     """
     try:
@@ -136,47 +182,60 @@ async def upload_excel_file(file: UploadFile = File(...)):
         if not file.filename.endswith(('.xlsx', '.xls')):
             raise HTTPException(status_code=400, detail="Only Excel files (.xlsx, .xls) are supported")
         
-        # Simple file size check (100MB limit for local development)
-        file_content = await file.read()
-        if len(file_content) > 100 * 1024 * 1024:
+        # Reject early when the multipart parser already knows the size
+        if getattr(file, "size", None) and file.size > MAX_UPLOAD_SIZE:
             raise HTTPException(status_code=400, detail="File too large (max 100MB)")
-        
-        # Reset file pointer
-        file.file.seek(0)
 
         # Generate unique file ID
         file_id = str(uuid.uuid4())
 
         # Import GCS client and path utilities
-        from ..storage.gcs_client import get_gcs_client
+        from ..storage.gcs_client import get_gcs_client, stream_upload, UploadTooLarge
         from ..storage.gcs_path_utils import GCSPathManager
         
-        # Upload file to Google Cloud Storage
         gcs_client = get_gcs_client()
         
         # Create standardized GCS blob name using path utilities
         blob_name = GCSPathManager.get_upload_blob_name(file.filename, file_id)
+        content_type = file.content_type or "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         
-        # Upload file content to GCS
-        gcs_client.upload_file(
-            io.BytesIO(file_content), 
-            blob_name, 
-            content_type=file.content_type or "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        # Stream chunks straight into a resumable upload
+        try:
+            file_size, sha256 = await stream_upload(
+                file, gcs_client, blob_name, content_type, MAX_UPLOAD_SIZE, UPLOAD_CHUNK_SIZE
+            )
+        except UploadTooLarge:
+            raise HTTPException(status_code=400, detail="File too large (max 100MB)")
         
         # Store only the relative blob name (not full URL) for consistent access
         file_url = blob_name
         
         # Store file information in the database with GCS URL
-        db_manager.store_uploaded_file(file_id, file.filename, file_url)
+        db_manager.store_uploaded_file(
+            file_id,
+            file.filename,
+            file_url,
+            file_size=file_size,
+            content_type=content_type,
+            metadata={"sha256": sha256}
+        )
+
+        # Make the file searchable by name now and by sheet/account contents shortly after
+        retriever = get_hybrid_retriever()
+        await run_in_threadpool(retriever.add_file, file_id, file.filename)
+        background_tasks.add_task(retriever.index_stored_workbook, file_id, file.filename, blob_name)
 
         return UploadResponse(
             file_id=file_id,
             filename=file.filename,
             uploaded_at=datetime.now(),
-            status="uploaded"
+            status="uploaded",
+            file_size=file_size,
+            sha256=sha256
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
 
@@ -187,98 +246,179 @@ async def get_financial_indicators():
     Returns indicators for Balance Sheet, Income Statement, and Cash Flow
     """
     try:
-        # Load financial indicators from the reference file
-        balance_str, income_str, cf_str = load_financial_indicators()
-
-        # Parse the strings back to lists
-        balance_items = [item.strip("- ") for item in balance_str.split("\n") if item.strip()]
-        income_items = [item.strip("- ") for item in income_str.split("\n") if item.strip()]
-        cf_items = [item.strip("- ") for item in cf_str.split("\n") if item.strip()]
+        # Served from the in-memory indicator registry
+        indicators = get_indicator_registry().get()
 
         return FinancialIndicators(
-            balance_sheet=balance_items,
-            income_statement=income_items,
-            cash_flow=cf_items
+            balance_sheet=list(indicators.balance_items),
+            income_statement=list(indicators.income_items),
+            cash_flow=list(indicators.cf_items),
+            version=indicators.version
         )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading financial indicators: {str(e)}")
 
 @app.post("/api/financial/analyze", response_model=AnalysisResponse)
-async def analyze_financial_data(request: AnalysisRequest, background_tasks: BackgroundTasks):
+async def analyze_financial_data(request: AnalysisRequest):
     """
     Analyze financial data and generate report
     Takes a file ID and optional custom parameters
+    Runs on the analysis worker pool and waits for the result
     """
     try:
         # Validate file exists
-        file_info = db_manager.get_uploaded_file(request.file_id)
-        if not file_info:
+        if not db_manager.get_uploaded_file(request.file_id):
             raise HTTPException(status_code=404, detail="File not found")
 
-        file_url = file_info["file_path"]
-        
-        # Download file from GCS to temporary location for processing
-        from ..storage.gcs_client import get_gcs_client
-        from ..storage.gcs_path_utils import GCSPathManager
-        gcs_client = get_gcs_client()
-        
-        # Extract clean blob name using centralized path utilities
-        blob_name = GCSPathManager.extract_blob_name_from_url(file_url)
-        
-        file_content = gcs_client.download_file(blob_name)
-        
-        # Save to temporary file for processing
-        temp_file = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
-        temp_file.write(file_content)
-        temp_file.close()
-        
-        try:
-            # Load financial data from temporary file
-            df = load_financial_data(temp_file.name)
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file.name):
-                os.unlink(temp_file.name)
+        job = get_analysis_job_manager().submit(request.file_id, request.custom_params)
 
-        # Load financial indicators
-        balance_str, income_str, cf_str = load_financial_indicators()
+        # Wait without blocking the event loop
+        await asyncio.wrap_future(job.future)
 
-        # Generate report ID
-        report_id = str(uuid.uuid4())
+        if job.status != JOB_COMPLETED:
+            raise HTTPException(status_code=500, detail=f"Error analyzing financial data: {job.error or job.status}")
 
-        # Generate financial report using OpenAI
-        report_text = generate_financial_report(openai_client, df, balance_str, income_str, cf_str)
-
-        # Extract tables from the report
-        simple_table = extract_simple_table(report_text)
-        structured_tables = extract_structured_tables(report_text)
-
-        # Prepare tables data for response
-        tables_data = {}
-        if simple_table is not None:
-            tables_data["summary"] = simple_table.to_dict(orient="records")
-        if structured_tables:
-            for table_name, table_df in structured_tables.items():
-                tables_data[table_name.lower().replace(" ", "_")] = table_df.to_dict(orient="records")
-
-        # Store generated report in the database
-        db_manager.store_generated_report(report_id, request.file_id, report_text, tables_data, request.custom_params)
-
-        return AnalysisResponse(
-            report_id=report_id,
-            summary=report_text,
-            tables=tables_data,
-            status="completed"
-        )
+        return AnalysisResponse(**job.result)
 
     except HTTPException:
         # Re-raise HTTP exceptions (like 404) without modification
         raise
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         # Only catch unexpected errors as 500
         raise HTTPException(status_code=500, detail=f"Error analyzing financial data: {str(e)}")
 
+@app.post("/api/financial/analyze/stream")
+async def analyze_financial_data_stream(request: AnalysisRequest):
+    """
+    Analyze financial data and stream the report as Server-Sent Events
+    Emits status, chunk (report text deltas), table (as each statement table
+    completes), done (with the stored report) and error events
+    """
+    if not db_manager.get_uploaded_file(request.file_id):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    async def event_stream():
+        try:
+            yield sse_event("status", {"stage": "loading_file"})
+            df, balance_str, income_str, cf_str = await run_in_threadpool(load_analysis_inputs, request.file_id)
+
+            from ..services.report_cache import get_report_cache
+            cache = get_report_cache()
+            # Hashing the whole DataFrame is CPU-bound; keep it off the event loop
+            cache_key = await run_in_threadpool(cache.make_key, df, balance_str, income_str, cf_str)
+            cached = await run_in_threadpool(cache.get, cache_key)
+
+            if cached:
+                yield sse_event("status", {"stage": "cache_hit"})
+                yield sse_event("chunk", {"text": cached["report_text"]})
+                result = await run_in_threadpool(
+                    finalize_report, request.file_id, cached["report_text"],
+                    request.custom_params, cached["tables"], cache_key
+                )
+                yield sse_event("done", result)
+                return
+
+            yield sse_event("status", {"stage": "generating_report"})
+            extractor = IncrementalTableExtractor()
+            parts = []
+            async for delta in astream_financial_report(df, balance_str, income_str, cf_str):
+                parts.append(delta)
+                yield sse_event("chunk", {"text": delta})
+                for table_name, table_df in extractor.feed(delta):
+                    yield sse_event("table", {"name": table_name, "rows": table_df.to_dict(orient="records")})
+
+            for table_name, table_df in extractor.finish():
+                yield sse_event("table", {"name": table_name, "rows": table_df.to_dict(orient="records")})
+
+            yield sse_event("status", {"stage": "storing_report"})
+            result = await run_in_threadpool(
+                finalize_report, request.file_id, "".join(parts),
+                request.custom_params, None, cache_key
+            )
+            yield sse_event("done", result)
+
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Error analyzing financial data: {str(e)}"})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/api/financial/analyze/jobs", response_model=AnalysisJobResponse, status_code=202)
+async def submit_analysis_job(request: AnalysisRequest):
+    """
+    Submit an analysis job and return immediately
+    Poll the job status endpoint for progress
+    """
+    try:
+        if not db_manager.get_uploaded_file(request.file_id):
+            raise HTTPException(status_code=404, detail="File not found")
+
+        job = get_analysis_job_manager().submit(request.file_id, request.custom_params)
+        return AnalysisJobResponse(**job.to_dict())
+
+    except HTTPException:
+        raise
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error submitting analysis job: {str(e)}")
+
+@app.get("/api/financial/analyze/jobs/{job_id}", response_model=AnalysisJobResponse)
+async def get_analysis_job_status(job_id: str):
+    """
+    Get the status and progress of an analysis job
+    """
+    job = get_analysis_job_manager().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return AnalysisJobResponse(**job.to_dict())
+
+@app.get("/api/financial/analyze/jobs/{job_id}/result", response_model=AnalysisResponse)
+async def get_analysis_job_result(job_id: str):
+    """
+    Get the result of a completed analysis job
+    """
+    job = get_analysis_job_manager().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {job.error}")
+    if job.status == JOB_CANCELLED:
+        raise HTTPException(status_code=410, detail="Analysis job was cancelled")
+    if job.status != JOB_COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Analysis job is {job.status} ({job.progress}%)")
+
+    return AnalysisResponse(**job.result)
+
+@app.delete("/api/financial/analyze/jobs/{job_id}", response_model=AnalysisJobResponse)
+async def cancel_analysis_job(job_id: str):
+    """
+    Cancel a queued or running analysis job
+
+    A running job reports "cancelling" until its worker stops: the report
+    generation request is aborted, other stages finish before the job ends.
+    """
+    job = get_analysis_job_manager().cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return AnalysisJobResponse(**job.to_dict())
+
+@app.get("/api/financial/cache/stats")
+async def get_report_cache_stats():
+    """
+    Get report cache hit/miss metrics
+    """
+    try:
+        from ..services.report_cache import get_report_cache
+        return get_report_cache().get_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting cache statistics: {str(e)}")
+
 @app.get("/api/financial/report/{report_id}", response_model=ReportResponse)
 async def get_financial_report(report_id: str):
     """
@@ -336,22 +476,25 @@ async def export_report_to_excel(report_id: str):
 
 # Additional utility endpoints
 @app.get("/api/financial/files")
-async def list_uploaded_files():
-    """List all uploaded files"""
+async def list_uploaded_files(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                              cursor: Optional[str] = None):
+    """List uploaded files, newest first; pass next_cursor back to get the next page"""
     try:
-        files_list = db_manager.list_uploaded_files()
-
-        return {"files": files_list}
+        return await run_in_threadpool(db_manager.list_uploaded_files_page, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing files: {str(e)}")
 
 @app.get("/api/financial/reports")
-async def list_generated_reports():
-    """List all generated reports"""
+async def list_generated_reports(limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                 cursor: Optional[str] = None,
+                                 file_id: Optional[str] = None):
+    """List generated reports, newest first; pass next_cursor back to get the next page"""
     try:
-        reports_list = db_manager.list_generated_reports()
-
-        return {"reports": reports_list}
+        return await run_in_threadpool(db_manager.list_generated_reports_page, limit, cursor, file_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing reports: {str(e)}")
 
@@ -379,8 +522,9 @@ async def delete_uploaded_file(file_id: str):
             # Log the error but continue with database deletion
             print(f"Warning: Could not delete file from GCS: {str(e)}")
 
-        # Remove from database
+        # Remove from database and the search index
         db_manager.delete_uploaded_file(file_id)
+        await run_in_threadpool(get_hybrid_retriever().remove_file, file_id)
 
         return {"message": "File deleted successfully", "file_id": file_id}
 
@@ -416,6 +560,7 @@ class VectorProcessingResponse(BaseModel):
     vectors_stored: int
     processing_timestamp: str
     vector_ids: List[str]
+    task_id: Optional[str] = None
 
 class VectorSearchResponse(BaseModel):
     results: List[Dict[str, Any]]
@@ -456,23 +601,61 @@ async def chat_with_agent(chat_message: ChatMessage):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
+@app.post("/api/agent/chat/stream")
+async def chat_with_agent_stream(chat_message: ChatMessage):
+    """
+    Chat with the financial report agent, streaming the response as Server-Sent Events
+    Emits a session event, chunk events with response deltas, then done
+    """
+    if not financial_agent:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+
+    # Set session ID if provided
+    if chat_message.session_id:
+        financial_agent.current_session_id = chat_message.session_id
+
+    async def event_stream():
+        try:
+            yield sse_event("session", {"session_id": financial_agent.current_session_id})
+
+            async for delta in financial_agent.stream_message(chat_message.message):
+                yield sse_event("chunk", {"text": delta})
+
+            yield sse_event("done", {
+                "session_id": financial_agent.current_session_id,
+                "timestamp": datetime.now().isoformat()
+            })
+
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Error processing message: {str(e)}"})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @app.get("/api/agent/conversation/{session_id}")
-async def get_conversation_history(session_id: str):
+async def get_conversation_history(session_id: str,
+                                   limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                   cursor: Optional[str] = None):
     """
-    Get the conversation history for a specific session from database
+    Get the latest messages of a session from database, oldest first within the page
+    Pass next_cursor as cursor to load the messages before them
     """
     try:
         if not financial_agent:
             raise HTTPException(status_code=500, detail="Agent not initialized")
 
-        history = financial_agent.get_database_chat_history(session_id)
+        page = await run_in_threadpool(db_manager.get_chat_history_page, session_id, limit, cursor)
 
         return {
             "session_id": session_id,
-            "conversation": history,
-            "message_count": len(history)
+            "conversation": page["messages"],
+            "message_count": len(page["messages"]),
+            "next_cursor": page["next_cursor"]
         }
 
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving conversation: {str(e)}")
 
@@ -593,10 +776,11 @@ async def list_agent_files():
         raise HTTPException(status_code=500, detail=f"Error listing files: {str(e)}")
 
 # Vector processing endpoints
-@app.post("/api/vector/process", response_model=VectorProcessingResponse)
-async def process_document_vectors(request: VectorProcessingRequest, background_tasks: BackgroundTasks):
+@app.post("/api/vector/process", response_model=VectorProcessingResponse, status_code=202)
+async def process_document_vectors(request: VectorProcessingRequest):
     """
-    Process a document for vector storage using Jina embeddings and Qdrant
+    Queue a document for vector storage using Jina embeddings and Qdrant
+    Poll /api/vector/tasks/{task_id} for progress
     """
     try:
         # Validate file exists
@@ -604,29 +788,50 @@ async def process_document_vectors(request: VectorProcessingRequest, background_
         if not file_info:
             raise HTTPException(status_code=404, detail="File not found")
 
-        # Get vector processing service
-        vector_service = get_vector_processing_service()
-        
-        # Start processing in background
-        background_tasks.add_task(
-            vector_service.process_excel_file,
-            file_info["file_path"],
+        # Hand the file to the staged ingest pipeline
+        task = get_ingest_pipeline().submit(
             request.file_id,
             file_info["filename"],
+            file_info["file_path"],
             request.metadata
         )
         
         return VectorProcessingResponse(
-            status="processing_started",
+            status=task.status,
             file_id=request.file_id,
-            vectors_stored=0,
+            vectors_stored=task.vectors_stored,
             processing_timestamp=datetime.now().isoformat(),
-            vector_ids=[]
+            vector_ids=[],
+            task_id=task.task_id
         )
 
+    except HTTPException:
+        raise
+    except IngestQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except IngestPipelineUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error starting vector processing: {str(e)}")
 
+@app.get("/api/vector/tasks/{task_id}")
+async def get_vector_ingest_task(task_id: str):
+    """
+    Get the stage, status and per-stage timings of an ingest task
+    """
+    task = get_ingest_pipeline().get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    return task.to_dict()
+
+@app.get("/api/vector/pipeline/stats")
+async def get_vector_pipeline_stats():
+    """
+    Get ingest pipeline queue depths, worker utilisation and stage timings
+    """
+    return get_ingest_pipeline().get_stats()
+
 @app.get("/api/vector/status/{file_id}")
 async def get_vector_processing_status(file_id: str):
     """
@@ -697,6 +902,25 @@ async def delete_document_vectors(file_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting vectors: {str(e)}")
 
+@app.post("/api/vector/collection/profile")
+async def apply_vector_collection_profile(dry_run: bool = Query(True)):
+    """
+    Compare the Qdrant collection with the configured profile (HNSW, quantization,
+    on-disk storage) and, with dry_run=false, migrate it
+    """
+    try:
+        vector_service = get_vector_processing_service()
+        changes = await run_in_threadpool(vector_service.qdrant_manager.apply_profile, dry_run)
+
+        return {
+            "collection": vector_service.qdrant_manager.collection_name,
+            "dry_run": dry_run,
+            "changes": changes
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error applying collection profile: {str(e)}")
+
 @app.get("/api/vector/stats", response_model=VectorStatsResponse)
 async def get_vector_processing_stats():
     """
@@ -738,7 +962,7 @@ class EnhancedChatResponse(BaseModel):
 
 class FileSearchRequest(BaseModel):
     query: str
-    search_type: str = "semantic"  # "semantic" or "filename"
+    search_type: str = "hybrid"  # "hybrid", "semantic" or "filename"
     limit: int = 10
     filters: Optional[Dict[str, Any]] = None
 
@@ -794,7 +1018,7 @@ async def search_files_endpoint(request: FileSearchRequest):
     Search files using semantic or filename-based search
     """
     try:
-        results = chat_file_manager.search_files(
+        results = await chat_file_manager.search_files(
             query=request.query,
             search_type=request.search_type,
             limit=request.limit,
@@ -837,7 +1061,7 @@ async def auto_select_files(request: Dict[str, Any]):
     Auto-select relevant files based on context
     """
     try:
-        selected = chat_file_manager.auto_select_files(
+        selected = await chat_file_manager.auto_select_files(
             context=request.get('context', ''),
             max_files=request.get('max_files', 5),
             criteria=request.get('criteria', {})
@@ -902,27 +1126,21 @@ async def get_database_stats():
     Get statistics about the database contents
     """
     try:
-        uploaded_files = db_manager.get_all_uploaded_documents()
-        generated_reports = db_manager.get_all_generated_reports()
-
-        # Get chat statistics
-        with db_manager.get_session() as session:
-            from ..storage.database_manager import ChatHistory
-            total_chats = session.query(ChatHistory).count()
-            unique_sessions = session.query(ChatHistory.session_id).distinct().count()
+        stats = await run_in_threadpool(db_manager.get_database_stats)
+        recent = await run_in_threadpool(db_manager.get_documents_overview, None, 5)
 
         return {
-            "uploaded_documents": len(uploaded_files),
-            "generated_reports": len(generated_reports),
-            "total_chat_messages": total_chats,
-            "unique_chat_sessions": unique_sessions,
+            **stats,
+            "processing_log_sink": db_manager.log_sink.get_stats(),
             "recent_uploads": [
                 {
-                    "filename": doc.original_filename,
-                    "uploaded_at": doc.uploaded_at.isoformat(),
-                    "file_size": doc.file_size
+                    "filename": doc["filename"],
+                    "uploaded_at": doc["uploaded_at"],
+                    "file_size": doc["file_size"],
+                    "vector_status": doc["vector_status"],
+                    "report_count": doc["report_count"]
                 }
-                for doc in uploaded_files[:5]
+                for doc in recent
             ]
         }
 
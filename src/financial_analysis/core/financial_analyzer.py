@@ -8,28 +8,87 @@ and Cash Flow Statement.
 
 import os
 import re
+import logging
+import threading
+import numpy as np
 import pandas as pd
-import openai
 from openai import OpenAI
 from dotenv import load_dotenv
 from pathlib import Path
 
+from .indicator_registry import get_indicator_registry
+from .prompt_compactor import compact_financial_table
+from .llm_client import create_chat_completion, stream_chat_completion, run_sync
+
+logger = logging.getLogger(__name__)
+
+# Model used for report generation
+REPORT_MODEL = "gpt-4o"
+
+# Bump whenever generate_prompt_from_df changes so cached reports are not reused
+PROMPT_TEMPLATE_VERSION = "2"
+
+# Serializes writes to the shared output workbooks when analyses run concurrently
+_output_lock = threading.Lock()
+
 def setup_environment():
-    """Setup environment variables and OpenAI client"""
-    # Load from .env file - works both in Docker and locally
+    """Load the OpenAI API key and return a synchronous client
+
+    Kept for existing callers; report generation itself goes through the
+    shared async client in llm_client.
+    """
     load_dotenv()
 
-    # Get API key from environment
     api_key = os.getenv("OPENAI_API_KEY") or os.getenv("API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY or API_KEY not found in environment variables")
 
-    openai.api_key = api_key
-    print("API Key loaded successfully")
+    return OpenAI(api_key=api_key)
+
+# Rows scanned per block when looking for the "code" header row
+HEADER_SCAN_ROWS = 50
+
+# Column headers that name a reporting period ("2023", "Current Year", ...)
+YEAR_COLUMN_PATTERN = re.compile(r"\b(19|20)\d{2}\b|year", re.IGNORECASE)
 
-    # Initialize OpenAI client
-    client = OpenAI(api_key=api_key)
-    return client
+def _find_header_row(df, block_size=HEADER_SCAN_ROWS):
+    """Return the position of the first row containing "code", or None
+
+    Scans the sheet in blocks with vectorized string ops and stops at the
+    first block that contains a hit.
+    """
+    for start in range(0, len(df), block_size):
+        block = df.iloc[start:start + block_size].to_numpy(dtype=str)
+        hits = (np.char.find(np.char.lower(block), "code") >= 0).any(axis=1)
+        if hits.any():
+            return start + int(hits.argmax())
+    return None
+
+def _to_numeric(series):
+    """Coerce a column to numbers, accepting thousands separators in text cells"""
+    if pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+        text = series.astype(str).str.replace(",", "", regex=False).str.strip()
+        series = text.where(series.notna())
+    return pd.to_numeric(series, errors="coerce")
+
+def _detect_year_columns(df):
+    """Return positions of the two columns holding the yearly figures"""
+    named = [i for i, col in enumerate(df.columns)
+             if (isinstance(col, (int, float)) and 1900 <= col <= 2100)
+             or (isinstance(col, str) and YEAR_COLUMN_PATTERN.search(col))]
+    if len(named) >= 2:
+        return named[-2:]
+
+    # Fall back to the right-most mostly-numeric columns
+    numeric = []
+    for i in range(df.shape[1]):
+        column = df.iloc[:, i]
+        non_null = column.notna().sum()
+        if "code" in str(df.columns[i]).lower() or non_null == 0:
+            continue
+        if _to_numeric(column).notna().sum() >= 0.5 * non_null:
+            numeric.append(i)
+    return numeric[-2:]
 
 def load_financial_data(file_path):
     """Load financial data from Excel file and process it"""
@@ -37,61 +96,35 @@ def load_financial_data(file_path):
     df = pd.read_excel(file_path, header=None)
 
     # Find the row containing "code" to determine data start
-    mask = df.apply(lambda row: row.astype(str).str.lower().str.contains("code").any(), axis=1)
-    matches = df[mask]
-
-    if matches.empty:
+    start_index = _find_header_row(df)
+    if start_index is None:
         raise ValueError("No 'code' column found in the data")
 
-    # Extract data from the code row onwards
-    start_index = matches.index[0]
-    df_from_code = df.iloc[start_index:].reset_index(drop=True)
+    # Use the code row as header and keep everything below it
+    df_from_code = df.iloc[start_index + 1:].reset_index(drop=True)
+    df_from_code.columns = df.iloc[start_index].tolist()
 
-    # Set first row as header
-    df_from_code.columns = df_from_code.iloc[0]
-    df_from_code = df_from_code[1:].reset_index(drop=True)
+    # Coerce the two year columns to numeric dtypes once, up front
+    for position in _detect_year_columns(df_from_code):
+        df_from_code.isetitem(position, _to_numeric(df_from_code.iloc[:, position]))
 
     return df_from_code
 
 def load_financial_indicators():
-    """Load financial indicators from the reference Excel file"""
-    # Load indicators from multiple possible locations
-    possible_paths = [
-        Path(__file__).parent.parent / "data" / "full_financial_indicators.xlsx",
-        Path(__file__).parent / "data" / "full_financial_indicators.xlsx",
-        Path.cwd() / "src" / "financial_analysis" / "data" / "full_financial_indicators.xlsx",
-        Path("/app/src/financial_analysis/data/full_financial_indicators.xlsx"),  # Docker path
-    ]
-    
-    indicator_path = None
-    for path in possible_paths:
-        if path.exists():
-            indicator_path = path
-            break
-    
-    if not indicator_path:
-        raise FileNotFoundError(f"Could not find full_financial_indicators.xlsx in any expected location")
-    
-    indicator = pd.read_excel(indicator_path)
-
-    # Extract indicators for each financial statement
-    balance_items = indicator['Balance Sheet'].dropna().tolist()
-    balance_str = "\n".join(f"- {item}" for item in balance_items)
-
-    income_items = indicator['Income Statement'].dropna().tolist()
-    income_str = "\n".join(f"- {item}" for item in income_items)
-
-    cf_items = indicator['Cash Flow Statement'].dropna().tolist()
-    cf_str = "\n".join(f"- {item}" for item in cf_items)
-
-    return balance_str, income_str, cf_str
-
-def generate_prompt_from_df(df, balance_str, income_str, cf_str):
-    """Generate prompt for GPT based on financial data"""
-    table_str = df.to_string(index=False)
+    """Load financial indicators from the reference Excel file
+
+    Served from the in-memory indicator registry; the workbook is only
+    re-read when it changes on disk.
+    """
+    return get_indicator_registry().get().as_prompt_strings()
+
+def build_report_prompt(df, balance_str, income_str, cf_str, token_budget=None):
+    """Generate prompt for GPT and return it with the table compaction statistics"""
+    compaction = compact_financial_table(df, value_columns=_detect_year_columns(df), token_budget=token_budget)
+    table_str = compaction.text
 
     prompt = f"""
-    You are a financial analyst. Below is a table of daily financial data, which contains two key columns representing financial figures for two years.
+    You are a financial analyst. Below is a tab-separated table of daily financial data, which contains two key columns representing financial figures for two years.
     The columns may have names such as "2023" and "2024", or "Last Year" and "Current Year", or similar variants.
 
     {table_str}
@@ -136,30 +169,112 @@ def generate_prompt_from_df(df, balance_str, income_str, cf_str):
 
     Use professional English.
     """
-    return prompt
+    return prompt, compaction
 
-def generate_financial_report(client, df, balance_str, income_str, cf_str):
-    """Generate financial report using OpenAI GPT"""
-    prompt = generate_prompt_from_df(df, balance_str, income_str, cf_str)
+def generate_prompt_from_df(df, balance_str, income_str, cf_str, token_budget=None):
+    """Generate prompt for GPT based on financial data"""
+    prompt, _ = build_report_prompt(df, balance_str, income_str, cf_str, token_budget)
+    return prompt
 
-    print("Generated prompt:")
-    print(prompt)
-    print("\n" + "="*50 + "\n")
+async def agenerate_financial_report(df, balance_str, income_str, cf_str):
+    """Generate financial report through the shared async OpenAI client"""
+    prompt, compaction = build_report_prompt(df, balance_str, income_str, cf_str)
+    logger.info(f"Prompt compaction: {compaction.summary()}")
 
-    # Call GPT to generate report
-    response = client.chat.completions.create(
-        model="gpt-4o",
+    response = await create_chat_completion(
+        model=REPORT_MODEL,
         messages=[
             {"role": "system", "content": "You are a financial analyst"},
             {"role": "user", "content": prompt}
         ]
     )
+    return response.choices[0].message.content
+
+async def astream_financial_report(df, balance_str, income_str, cf_str):
+    """Stream a financial report through the shared async OpenAI client"""
+    prompt, compaction = build_report_prompt(df, balance_str, income_str, cf_str)
+    logger.info(f"Prompt compaction: {compaction.summary()}")
 
-    report_text = response.choices[0].message.content
-    print("Generated Report:")
-    print(report_text)
+    async for delta in stream_chat_completion(
+        model=REPORT_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a financial analyst"},
+            {"role": "user", "content": prompt}
+        ]
+    ):
+        yield delta
+
+def generate_financial_report(client, df, balance_str, income_str, cf_str):
+    """Blocking wrapper around agenerate_financial_report
+
+    client is accepted for compatibility and ignored; the request uses the
+    shared async client. Must not be called from a running event loop.
+    """
+    return run_sync(agenerate_financial_report(df, balance_str, income_str, cf_str))
+
+def stream_financial_report(client, df, balance_str, income_str, cf_str):
+    """Blocking wrapper kept for compatibility; yields the whole report as one chunk
+
+    Use astream_financial_report for incremental output.
+    """
+    yield generate_financial_report(client, df, balance_str, income_str, cf_str)
 
-    return report_text
+TABLE_HEADING_PATTERN = re.compile(r"^####\s+(.*?)\s+Table")
+
+def _table_lines_to_frame(lines):
+    """Turn markdown table lines into a DataFrame (first row is the header)"""
+    rows = [re.split(r"\s*\|\s*", l.strip().strip('|')) for l in lines]
+    if len(rows) > 1:
+        return pd.DataFrame(rows[1:], columns=rows[0])
+    return None
+
+class IncrementalTableExtractor:
+    """Extract structured tables from a report while it is still being streamed
+
+    Feed text deltas as they arrive; a table is emitted once the next
+    "#### ... Table" heading starts or the stream finishes.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._current_table_name = None
+        self._table_lines = []
+
+    def feed(self, text):
+        """Consume a text delta and return any tables completed by it"""
+        self._buffer += text
+        *complete_lines, self._buffer = self._buffer.split("\n")
+
+        finished = []
+        for line in complete_lines:
+            finished.extend(self._consume(line))
+        return finished
+
+    def finish(self):
+        """Flush the remaining buffer and return the last tables"""
+        finished = self._consume(self._buffer) if self._buffer else []
+        self._buffer = ""
+        return finished + self._close_table()
+
+    def _consume(self, line):
+        match = TABLE_HEADING_PATTERN.match(line.strip())
+        if match:
+            finished = self._close_table()
+            self._current_table_name = match.group(1)
+            return finished
+
+        if self._current_table_name and "|" in line and "---" not in line:
+            self._table_lines.append(line)
+        return []
+
+    def _close_table(self):
+        name, lines = self._current_table_name, self._table_lines
+        self._table_lines = []
+        if name and lines:
+            df = _table_lines_to_frame(lines)
+            if df is not None:
+                return [(name, df)]
+        return []
 
 def extract_simple_table(report_text):
     """Extract simple table from GPT output"""
@@ -178,7 +293,8 @@ def extract_simple_table(report_text):
 
         # Save to output directory
         output_path = output_dir / "financial_summary.xlsx"
-        df_summary.to_excel(output_path, index=False)
+        with _output_lock:
+            df_summary.to_excel(output_path, index=False)
         print(f"✅ Saved simple table to {output_path}")
         return df_summary
     else:
@@ -194,14 +310,13 @@ def extract_structured_tables(report_text):
     table_lines = []
 
     def save_table(name, lines):
-        rows = [re.split(r"\s*\|\s*", l.strip().strip('|')) for l in lines]
-        if len(rows) > 1:
-            df = pd.DataFrame(rows[1:], columns=rows[0])
+        df = _table_lines_to_frame(lines)
+        if df is not None:
             tables[name] = df
 
     for line in lines:
         # Match headings like: #### Balance Sheet Table
-        match = re.match(r"^####\s+(.*?)\s+Table", line.strip())
+        match = TABLE_HEADING_PATTERN.match(line.strip())
         if match:
             # Save previous table if exists
             if current_table_name and table_lines:
@@ -226,7 +341,7 @@ def extract_structured_tables(report_text):
 
         # Save to output directory
         output_path = output_dir / "financial_statements_from_gpt.xlsx"
-        with pd.ExcelWriter(output_path, engine="xlsxwriter") as writer:
+        with _output_lock, pd.ExcelWriter(output_path, engine="xlsxwriter") as writer:
             for sheet_name, df in tables.items():
                 df.to_excel(writer, sheet_name=sheet_name, index=False)
         print(f"✅ Saved structured tables to {output_path}")
@@ -235,11 +350,11 @@ def extract_structured_tables(report_text):
         print("⚠️ No tables found in report_text.")
         return None
 
-def ask_calculation_question(client, df, question):
+async def aask_calculation_question(df, question):
     """Ask GPT about specific calculations"""
     prompt = f'{question} from {df}'
 
-    response = client.chat.completions.create(
+    response = await create_chat_completion(
         model="gpt-4o",
         messages=[
             {"role": "system", "content": "You are a financial analyst"},
@@ -252,12 +367,13 @@ def ask_calculation_question(client, df, question):
     print(f"Answer: {answer}")
     return answer
 
+def ask_calculation_question(client, df, question):
+    """Blocking wrapper around aask_calculation_question (client is ignored)"""
+    return run_sync(aask_calculation_question(df, question))
+
 def main():
     """Main function to run the financial report generation process"""
     try:
-        # Setup environment and client
-        client = setup_environment()
-
         # Load financial data - you can specify the file path here
         # For now, assuming demo_data.xlsx exists in the input directory
         demo_path = Path(__file__).parent.parent.parent / "input" / "demo_data.xlsx"
@@ -270,7 +386,9 @@ def main():
         print("Financial indicators loaded successfully")
 
         # Generate financial report
-        report_text = generate_financial_report(client, df, balance_str, income_str, cf_str)
+        report_text = run_sync(agenerate_financial_report(df, balance_str, income_str, cf_str))
+        print("Generated Report:")
+        print(report_text)
 
         # Extract tables from the report
         print("\n" + "="*50)
@@ -285,7 +403,7 @@ def main():
         # Example of asking a specific calculation question
         print("\n" + "="*50)
         print("Asking calculation question...")
-        ask_calculation_question(client, df, "How do you calculate Total Cost of Goods Sold")
+        run_sync(aask_calculation_question(df, "How do you calculate Total Cost of Goods Sold"))
 
         print("\n✅ Financial report generation completed successfully!")
 
@@ -0,0 +1,149 @@
+"""
+Indicator registry for the financial analysis application.
+Loads full_financial_indicators.xlsx once and keeps the parsed indicator
+lists and rendered prompt strings in memory, reloading only when the file changes.
+"""
+
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+INDICATOR_FILENAME = "full_financial_indicators.xlsx"
+
+
+@dataclass(frozen=True)
+class IndicatorSet:
+    """Parsed indicators for the three financial statements."""
+    balance_items: Tuple[str, ...]
+    income_items: Tuple[str, ...]
+    cf_items: Tuple[str, ...]
+    balance_str: str
+    income_str: str
+    cf_str: str
+    version: int
+    digest: str
+    path: str
+    loaded_at: datetime
+
+    def as_prompt_strings(self) -> Tuple[str, str, str]:
+        """Return the bullet-list strings used in report prompts."""
+        return self.balance_str, self.income_str, self.cf_str
+
+
+def candidate_paths() -> List[Path]:
+    """Locations searched for the indicator workbook, in priority order."""
+    return [
+        Path(__file__).parent.parent / "data" / INDICATOR_FILENAME,
+        Path(__file__).parent / "data" / INDICATOR_FILENAME,
+        Path.cwd() / "src" / "financial_analysis" / "data" / INDICATOR_FILENAME,
+        Path("/app/src/financial_analysis/data") / INDICATOR_FILENAME,  # Docker path
+    ]
+
+
+class IndicatorRegistry:
+    """
+    In-memory registry of financial indicators.
+
+    Each access costs one os.stat; the workbook is re-hashed only when its
+    mtime or size changes and re-parsed only when its content hash changes.
+    `version` increases on every content change so downstream caches can key on it.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self._explicit_path = Path(path) if path else None
+        self._path: Optional[Path] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._indicators: Optional[IndicatorSet] = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """Current indicator version (0 until the first load)."""
+        return self._version
+
+    def get(self) -> IndicatorSet:
+        """Return the current indicators, reloading if the workbook changed."""
+        with self._lock:
+            path = self._resolve_path()
+            stat = path.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+
+            if self._indicators is None or signature != self._signature or path != self._path:
+                self._refresh(path, signature)
+
+            return self._indicators
+
+    def reload(self) -> IndicatorSet:
+        """Re-check the workbook now, bypassing the mtime/size shortcut."""
+        with self._lock:
+            self._signature = None
+            self._path = None
+        return self.get()
+
+    def _resolve_path(self) -> Path:
+        """Return the cached path, probing candidates only when it is unknown or gone."""
+        if self._path is not None and self._path.exists():
+            return self._path
+
+        paths = [self._explicit_path] if self._explicit_path else candidate_paths()
+        for path in paths:
+            if path.exists():
+                return path
+
+        raise FileNotFoundError(f"Could not find {INDICATOR_FILENAME} in any expected location")
+
+    def _refresh(self, path: Path, signature: Tuple[int, int]):
+        """Re-hash the workbook and re-parse it if its content changed."""
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        self._path = path
+        self._signature = signature
+
+        if self._indicators is not None and digest == self._indicators.digest:
+            return
+
+        indicator = pd.read_excel(path)
+
+        def items(column: str) -> Tuple[str, ...]:
+            return tuple(str(item) for item in indicator[column].dropna().tolist())
+
+        def render(values: Tuple[str, ...]) -> str:
+            return "\n".join(f"- {item}" for item in values)
+
+        balance_items = items('Balance Sheet')
+        income_items = items('Income Statement')
+        cf_items = items('Cash Flow Statement')
+
+        self._version += 1
+        self._indicators = IndicatorSet(
+            balance_items=balance_items,
+            income_items=income_items,
+            cf_items=cf_items,
+            balance_str=render(balance_items),
+            income_str=render(income_items),
+            cf_str=render(cf_items),
+            version=self._version,
+            digest=digest,
+            path=str(path),
+            loaded_at=datetime.utcnow()
+        )
+        logger.info(f"Loaded financial indicators v{self._version} from {path}")
+
+
+# Global registry instance
+indicator_registry = None
+
+def get_indicator_registry() -> IndicatorRegistry:
+    """Get the singleton indicator registry instance."""
+    global indicator_registry
+    if indicator_registry is None:
+        indicator_registry = IndicatorRegistry()
+    return indicator_registry
@@ -0,0 +1,216 @@
+"""
+Shared OpenAI client for the financial analysis application.
+One AsyncOpenAI client over a pooled httpx connection, a global cap on
+in-flight completions, and retry with jittered backoff on 429/5xx.
+"""
+
+import os
+import random
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+from openai import (
+    AsyncOpenAI,
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    RateLimitError,
+)
+
+logger = logging.getLogger(__name__)
+
+# Connection pool and concurrency settings
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+
+# Retry settings
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+
+# How often a cancellable run_sync checks its cancel event
+CANCEL_POLL_SECONDS = 0.2
+
+_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+_main_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Client and semaphore private to one run_sync fallback loop (see _run_scoped)
+_scoped: ContextVar[Optional[Dict[str, object]]] = ContextVar("llm_client_scoped", default=None)
+
+
+def _create_client() -> AsyncOpenAI:
+    load_dotenv()
+    api_key = os.getenv("OPENAI_API_KEY") or os.getenv("API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY or API_KEY not found in environment variables")
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=10.0)
+    )
+    # Retries are handled here so they share the concurrency limit
+    return AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+
+
+def get_async_client() -> AsyncOpenAI:
+    """Get the shared AsyncOpenAI client, creating it on first use."""
+    global _client
+    scoped = _scoped.get()
+    if scoped is not None:
+        if scoped["client"] is None:
+            scoped["client"] = _create_client()
+        return scoped["client"]
+
+    if _client is None:
+        _client = _create_client()
+    return _client
+
+
+def bind_event_loop(loop: asyncio.AbstractEventLoop):
+    """Register the application event loop that owns the shared client."""
+    global _main_loop
+    _main_loop = loop
+
+
+async def aclose():
+    """Close the shared client's connection pool."""
+    global _client, _semaphore
+    if _client is not None:
+        await _client.close()
+    _client = None
+    _semaphore = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    scoped = _scoped.get()
+    if scoped is not None:
+        if scoped["semaphore"] is None:
+            scoped["semaphore"] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        return scoped["semaphore"]
+
+    if _semaphore is None:
+        # Waiters are woken in FIFO order, so queued requests are served fairly
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (RateLimitError, APIConnectionError, APITimeoutError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """Honor Retry-After when present, else exponential backoff with jitter."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), LLM_BACKOFF_MAX)
+            except ValueError:
+                pass
+
+    ceiling = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+async def _create_with_retry(**kwargs):
+    client = get_async_client()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            return await client.chat.completions.create(**kwargs)
+        except Exception as e:
+            if attempt >= LLM_MAX_RETRIES or not _is_retryable(e):
+                raise
+            delay = _retry_delay(attempt, e)
+            logger.warning(f"OpenAI request failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def create_chat_completion(**kwargs):
+    """
+    Create a chat completion through the shared client.
+
+    Waits for a free concurrency slot, then retries 429/5xx and connection
+    errors with jittered exponential backoff.
+    """
+    async with _get_semaphore():
+        return await _create_with_retry(**kwargs)
+
+
+async def stream_chat_completion(**kwargs) -> AsyncIterator[str]:
+    """
+    Stream a chat completion, yielding content deltas.
+
+    Opening the stream is retried like create_chat_completion; the
+    concurrency slot is held until the stream is exhausted.
+    """
+    async with _get_semaphore():
+        stream = await _create_with_retry(stream=True, **kwargs)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+def run_sync(coro, cancel_event: Optional[threading.Event] = None):
+    """
+    Run a coroutine on the application event loop from a worker thread.
+
+    Lets thread-pool workers share the client, pool and semaphore owned by
+    the API loop. Without a bound loop (scripts, CLI) the coroutine runs in
+    a fresh event loop with its own client and semaphore, closed before
+    the loop ends, so repeated calls never touch objects of a closed loop.
+
+    Args:
+        coro: Coroutine to run
+        cancel_event: Cancels the coroutine (and its in-flight request) once set
+
+    Raises:
+        concurrent.futures.CancelledError: If cancel_event stopped the coroutine
+    """
+    if cancel_event is not None:
+        coro = _cancellable(coro, cancel_event)
+    try:
+        if _main_loop is not None and _main_loop.is_running():
+            return asyncio.run_coroutine_threadsafe(coro, _main_loop).result()
+        return asyncio.run(_run_scoped(coro))
+    except asyncio.CancelledError:
+        raise concurrent.futures.CancelledError() from None
+
+
+async def _cancellable(coro, cancel_event: threading.Event):
+    """Await coro, cancelling it once cancel_event is set"""
+    task = asyncio.ensure_future(coro)
+    try:
+        while not task.done():
+            if cancel_event.is_set():
+                task.cancel()
+            await asyncio.wait({task}, timeout=CANCEL_POLL_SECONDS)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    return task.result()
+
+
+async def _run_scoped(coro):
+    scoped = {"client": None, "semaphore": None}
+    _scoped.set(scoped)
+    try:
+        return await coro
+    finally:
+        if scoped["client"] is not None:
+            await scoped["client"].close()
@@ -0,0 +1,203 @@
+"""
+Prompt compaction for financial report generation.
+Renders the ledger as compact TSV, drops empty rows, rolls sub-accounts up
+by code prefix and trims to a token budget before it is sent to the model.
+"""
+
+import os
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+
+import pandas as pd
+
+try:
+    import tiktoken
+except ImportError:  # Optional dependency; fall back to a character heuristic
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Token budget for the table portion of the prompt
+DEFAULT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "12000"))
+
+# Shortest account-code prefix sub-accounts are rolled up to
+MIN_ROLLUP_PREFIX = 3
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding(model: str):
+    """Load the tiktoken encoding once; None if tiktoken is missing or unusable."""
+    global _encoding, _encoding_failed
+    if _encoding is None and tiktoken is not None and not _encoding_failed:
+        try:
+            try:
+                _encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # The BPE file is downloaded on first use, which fails without network access
+            _encoding_failed = True
+            logger.warning(f"tiktoken encoding unavailable, estimating tokens instead: {e}")
+    return _encoding
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Count tokens with tiktoken when available, else estimate ~4 chars per token."""
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class PromptCompaction:
+    """Compacted table text plus statistics about what was removed."""
+    text: str
+    original_tokens: int
+    compact_tokens: int
+    rows_in: int
+    rows_out: int
+    rolled_up_rows: int = 0
+    truncated_rows: int = 0
+    token_budget: int = DEFAULT_TOKEN_BUDGET
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.original_tokens - self.compact_tokens, 0)
+
+    def summary(self) -> str:
+        return (f"{self.original_tokens} → {self.compact_tokens} tokens "
+                f"(saved ~{self.tokens_saved}); rows {self.rows_in} → {self.rows_out}, "
+                f"{self.rolled_up_rows} rolled up, {self.truncated_rows} truncated")
+
+
+def _render(df: pd.DataFrame, headers: List[str]) -> str:
+    """Render rows as TSV without index or whitespace padding."""
+    out = df.copy()
+    out.columns = headers
+    return out.to_csv(sep="\t", index=False, float_format="%.15g", lineterminator="\n").rstrip("\n")
+
+
+def _code_position(headers: List[str]) -> Optional[int]:
+    for i, header in enumerate(headers):
+        if "code" in header.lower():
+            return i
+    return None
+
+
+def _rollup(df: pd.DataFrame, code_pos: int, value_positions: List[int], prefix_len: int):
+    """
+    Collapse account codes longer than prefix_len into their parent prefix.
+
+    Children of a parent row that is already present are dropped (the parent
+    carries the aggregate); children without a parent row are summed into one
+    synthetic row per prefix.
+    """
+    codes = df[code_pos].astype(str).str.strip()
+    is_child = codes.str.isdigit() & (codes.str.len() > prefix_len)
+    if not is_child.any():
+        return df, 0
+
+    parents = codes.str[:prefix_len]
+    covered = is_child & parents.isin(set(codes[~is_child]))
+    orphans = is_child & ~covered
+
+    rolled = []
+    for prefix, group in df[orphans].groupby(parents[orphans], sort=False):
+        row = group.iloc[0].copy()
+        row[code_pos] = prefix
+        for pos in value_positions:
+            row[pos] = pd.to_numeric(group[pos], errors="coerce").sum(min_count=1)
+        label_pos = next((p for p in df.columns if p != code_pos and p not in value_positions), None)
+        if label_pos is not None and len(group) > 1:
+            row[label_pos] = f"{row[label_pos]} (+{len(group) - 1} sub-accounts)"
+        rolled.append(row)
+
+    kept = df[~is_child]
+    if rolled:
+        kept = pd.concat([kept, pd.DataFrame(rolled)]).sort_index(kind="stable")
+    return kept, int(is_child.sum()) - len(rolled)
+
+
+def compact_financial_table(df: pd.DataFrame,
+                            value_columns: Optional[List[int]] = None,
+                            token_budget: Optional[int] = None) -> PromptCompaction:
+    """
+    Compact a ledger DataFrame for inclusion in a prompt.
+
+    Args:
+        df: Ledger loaded by load_financial_data
+        value_columns: Positions of the numeric year columns (numeric dtypes if None)
+        token_budget: Maximum tokens for the rendered table
+
+    Returns:
+        PromptCompaction with the TSV text and token statistics
+    """
+    token_budget = token_budget or DEFAULT_TOKEN_BUDGET
+    original_tokens = count_tokens(df.to_string(index=False))
+
+    headers = ["" if pd.isna(col) else str(col) for col in df.columns]
+    work = df.copy()
+    work.columns = range(len(headers))
+
+    if value_columns is None:
+        value_columns = [i for i in work.columns if pd.api.types.is_numeric_dtype(work[i])]
+
+    # Drop empty columns/rows and rows whose yearly figures are all zero or missing
+    keep_columns = [i for i in work.columns if work[i].notna().any()]
+    value_columns = [i for i in value_columns if i in keep_columns]
+    work = work[keep_columns].dropna(how="all")
+    if value_columns:
+        values = work[value_columns].apply(pd.to_numeric, errors="coerce").fillna(0)
+        work = work[(values != 0).any(axis=1)]
+    headers = [headers[i] for i in keep_columns]
+    rows_in = len(df)
+
+    text = _render(work, headers)
+    tokens = count_tokens(text)
+    rolled_up = 0
+
+    # Roll sub-accounts up one code level at a time until the table fits
+    code_pos = _code_position(headers)
+    if tokens > token_budget and code_pos is not None:
+        code_pos = keep_columns[code_pos]
+        max_len = int(work[code_pos].astype(str).str.strip().str.len().max() or 0)
+        for prefix_len in range(max_len - 1, MIN_ROLLUP_PREFIX - 1, -1):
+            work, removed = _rollup(work, code_pos, value_columns, prefix_len)
+            rolled_up += removed
+            text = _render(work, headers)
+            tokens = count_tokens(text)
+            if tokens <= token_budget:
+                break
+
+    # Still too large: keep leading rows up to the budget
+    truncated = 0
+    if tokens > token_budget:
+        lines = text.split("\n")
+        kept_lines, used = [lines[0]], count_tokens(lines[0])
+        for line in lines[1:]:
+            line_tokens = count_tokens(line) + 1
+            if used + line_tokens > token_budget:
+                break
+            kept_lines.append(line)
+            used += line_tokens
+        truncated = len(lines) - len(kept_lines)
+        kept_lines.append(f"... {truncated} further rows omitted to fit the token budget")
+        text = "\n".join(kept_lines)
+        tokens = count_tokens(text)
+
+    compaction = PromptCompaction(
+        text=text,
+        original_tokens=original_tokens,
+        compact_tokens=tokens,
+        rows_in=rows_in,
+        rows_out=len(work) - truncated,
+        rolled_up_rows=rolled_up,
+        truncated_rows=truncated,
+        token_budget=token_budget
+    )
+    logger.info(f"Prompt compaction: {compaction.summary()}")
+    return compaction
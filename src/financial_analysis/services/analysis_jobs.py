@@ -0,0 +1,363 @@
+"""
+AnalysisJobManager - Background job queue for financial analysis
+Runs the download → load → LLM → extract pipeline on a bounded worker pool
+so slow analyses never block the API event loop
+"""
+
+import os
+import uuid
+import tempfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable
+
+from ..core.financial_analyzer import (
+    load_financial_data,
+    load_financial_indicators,
+    agenerate_financial_report,
+    extract_simple_table,
+    extract_structured_tables
+)
+from ..core.llm_client import run_sync
+from ..storage.database_manager import db_manager
+from .report_cache import get_report_cache
+
+
+logger = logging.getLogger(__name__)
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = {JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED}
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside a worker when its job has been cancelled"""
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue has no room for another submission"""
+
+
+@dataclass
+class AnalysisJob:
+    job_id: str
+    file_id: str
+    custom_params: Optional[Dict[str, Any]] = None
+    status: str = JOB_QUEUED
+    stage: str = "queued"
+    progress: int = 0
+    submitted_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    future: Optional[Future] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize job status (without the result payload)"""
+        return {
+            "job_id": self.job_id,
+            "file_id": self.file_id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "submitted_at": self.submitted_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "report_id": self.result.get("report_id") if self.result else None,
+            "error": self.error
+        }
+
+
+def load_analysis_inputs(file_id: str):
+    """
+    Download an uploaded workbook and load it with the current indicators (blocking)
+
+    Args:
+        file_id: ID of the uploaded file
+
+    Returns:
+        Tuple of (DataFrame, balance_str, income_str, cf_str)
+    """
+    file_info = db_manager.get_uploaded_file(file_id)
+    if not file_info:
+        raise FileNotFoundError("File not found")
+
+    # Download file from GCS to temporary location for processing
+    from ..storage.gcs_client import get_gcs_client
+    from ..storage.gcs_path_utils import GCSPathManager
+    gcs_client = get_gcs_client()
+    blob_name = GCSPathManager.extract_blob_name_from_url(file_info["file_path"])
+    file_content = gcs_client.download_file(blob_name)
+
+    temp_file = tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False)
+    temp_file.write(file_content)
+    temp_file.close()
+
+    try:
+        df = load_financial_data(temp_file.name)
+    finally:
+        if os.path.exists(temp_file.name):
+            os.unlink(temp_file.name)
+
+    balance_str, income_str, cf_str = load_financial_indicators()
+    return df, balance_str, income_str, cf_str
+
+
+def build_tables_data(report_text: str) -> Dict[str, Any]:
+    """Extract the summary and statement tables from a report into JSON-ready records"""
+    simple_table = extract_simple_table(report_text)
+    structured_tables = extract_structured_tables(report_text)
+
+    tables_data = {}
+    if simple_table is not None:
+        tables_data["summary"] = simple_table.to_dict(orient="records")
+    if structured_tables:
+        for table_name, table_df in structured_tables.items():
+            tables_data[table_name.lower().replace(" ", "_")] = table_df.to_dict(orient="records")
+    return tables_data
+
+
+def finalize_report(file_id: str,
+                    report_text: str,
+                    custom_params: Optional[Dict[str, Any]] = None,
+                    tables_data: Optional[Dict[str, Any]] = None,
+                    cache_key: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extract tables (unless given), cache and store a generated report (blocking)
+
+    Returns:
+        Dictionary with report_id, summary, tables and status
+    """
+    if tables_data is None:
+        tables_data = build_tables_data(report_text)
+        if cache_key:
+            get_report_cache().put(cache_key, report_text, tables_data)
+
+    # store_generated_report assigns its own ID; return that one so the report can be fetched
+    report_id = db_manager.store_generated_report(str(uuid.uuid4()), file_id, report_text, tables_data, custom_params)
+
+    return {
+        "report_id": report_id,
+        "summary": report_text,
+        "tables": tables_data,
+        "status": "completed"
+    }
+
+
+def run_financial_analysis(file_id: str,
+                           custom_params: Optional[Dict[str, Any]] = None,
+                           progress: Optional[Callable[[str, int], None]] = None,
+                           cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
+    """
+    Run the complete analysis pipeline for an uploaded file (blocking)
+
+    Args:
+        file_id: ID of the uploaded file
+        custom_params: Optional custom parameters stored with the report
+        progress: Optional callback receiving (stage, percent); may raise
+            AnalysisCancelled to abort between stages
+        cancel_event: Once set, aborts the report generation call in flight
+
+    Returns:
+        Dictionary with report_id, summary, tables and status
+    """
+    def report(stage: str, percent: int):
+        if progress:
+            progress(stage, percent)
+
+    report("loading_file", 5)
+    df, balance_str, income_str, cf_str = load_analysis_inputs(file_id)
+
+    report("generating_report", 25)
+    cache = get_report_cache()
+    cache_key = cache.make_key(df, balance_str, income_str, cf_str)
+    cached = cache.get(cache_key)
+
+    if cached:
+        report_text, tables_data = cached["report_text"], cached["tables"]
+    else:
+        # The LLM call runs on the API event loop through the shared client
+        try:
+            report_text = run_sync(agenerate_financial_report(df, balance_str, income_str, cf_str),
+                                   cancel_event=cancel_event)
+        except CancelledError:
+            raise AnalysisCancelled()
+        tables_data = None
+        report("extracting_tables", 85)
+
+    return finalize_report(file_id, report_text, custom_params, tables_data, cache_key)
+
+
+class AnalysisJobManager:
+    """Bounded worker pool with job status tracking and cancellation"""
+
+    def __init__(self,
+                 max_workers: int = None,
+                 max_pending: int = None,
+                 retention_seconds: int = None):
+        """
+        Initialize the job manager
+
+        Args:
+            max_workers: Number of concurrent analysis workers
+            max_pending: Maximum queued + running jobs before submissions are rejected
+            retention_seconds: How long finished jobs are kept for polling
+        """
+        self.max_workers = max_workers or int(os.getenv("ANALYSIS_MAX_WORKERS", "4"))
+        self.max_pending = max_pending or int(os.getenv("ANALYSIS_MAX_PENDING", "50"))
+        self.retention_seconds = retention_seconds or int(os.getenv("ANALYSIS_JOB_RETENTION", "3600"))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="analysis-worker"
+        )
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, file_id: str, custom_params: Optional[Dict[str, Any]] = None) -> AnalysisJob:
+        """
+        Queue an analysis job
+
+        Args:
+            file_id: ID of the uploaded file to analyze
+            custom_params: Optional custom parameters
+
+        Returns:
+            The queued AnalysisJob
+
+        Raises:
+            JobQueueFull: If too many jobs are already pending
+        """
+        with self._lock:
+            self._prune_finished()
+            pending = sum(1 for job in self._jobs.values() if job.status not in FINISHED_STATES)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"Analysis queue is full ({pending} pending jobs)")
+
+            job = AnalysisJob(job_id=str(uuid.uuid4()), file_id=file_id, custom_params=custom_params)
+            self._jobs[job.job_id] = job
+            job.future = self._executor.submit(self._run_job, job)
+
+        logger.info(f"Queued analysis job {job.job_id} for file {file_id}")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[AnalysisJob]:
+        """Get a job by ID"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[AnalysisJob]:
+        """
+        Cancel a job
+
+        Queued jobs are removed from the pool immediately. A running job's
+        report generation request is aborted; download and table extraction
+        stop at the next stage boundary. The returned job is "cancelling"
+        until the worker has stopped.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job.status in FINISHED_STATES:
+                return job
+
+            job.cancel_event.set()
+            if job.future and job.future.cancel():
+                self._finish(job, JOB_CANCELLED)
+            else:
+                job.stage = "cancelling"
+
+        return job
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get job counts by status"""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "jobs": counts
+        }
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting jobs and cancel anything still queued"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status not in FINISHED_STATES:
+                    job.cancel_event.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run_job(self, job: AnalysisJob):
+        """Worker entry point"""
+        with self._lock:
+            if job.cancel_event.is_set():
+                self._finish(job, JOB_CANCELLED)
+                return
+            job.status = JOB_RUNNING
+            job.started_at = datetime.utcnow()
+
+        def progress(stage: str, percent: int):
+            if job.cancel_event.is_set():
+                raise AnalysisCancelled()
+            job.stage = stage
+            job.progress = percent
+
+        try:
+            result = run_financial_analysis(job.file_id, job.custom_params, progress, job.cancel_event)
+            with self._lock:
+                job.result = result
+                self._finish(job, JOB_COMPLETED)
+            logger.info(f"Analysis job {job.job_id} completed (report {result['report_id']})")
+
+        except AnalysisCancelled:
+            with self._lock:
+                self._finish(job, JOB_CANCELLED)
+            logger.info(f"Analysis job {job.job_id} cancelled")
+
+        except Exception as e:
+            with self._lock:
+                job.error = str(e)
+                self._finish(job, JOB_FAILED)
+            logger.error(f"Analysis job {job.job_id} failed: {e}")
+
+    def _finish(self, job: AnalysisJob, status: str):
+        """Mark a job as finished (caller holds the lock)"""
+        job.status = status
+        job.stage = status
+        job.finished_at = datetime.utcnow()
+        if status == JOB_COMPLETED:
+            job.progress = 100
+
+    def _prune_finished(self):
+        """Drop finished jobs older than the retention window (caller holds the lock)"""
+        now = datetime.utcnow()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in FINISHED_STATES
+            and job.finished_at
+            and (now - job.finished_at).total_seconds() > self.retention_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# Global job manager instance
+analysis_job_manager = None
+
+def get_analysis_job_manager() -> AnalysisJobManager:
+    """Get the singleton analysis job manager instance"""
+    global analysis_job_manager
+    if analysis_job_manager is None:
+        analysis_job_manager = AnalysisJobManager()
+    return analysis_job_manager
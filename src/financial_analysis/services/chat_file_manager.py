@@ -12,6 +12,7 @@ import logging
 
 from .document_storage import GCSMetadataManager
 from .unified_vector_service import VectorService
+from .hybrid_retriever import get_hybrid_retriever
 from ..storage.database_manager import db_manager
 from ..security.input_validator import InputValidator
 from ..security.sql_sanitizer import SQLSanitizer
@@ -27,6 +28,7 @@ class ChatFileManager:
         """Initialize the chat file manager"""
         self.gcs_manager = GCSMetadataManager()
         self.vector_service = VectorService()
+        self.retriever = get_hybrid_retriever()
         
     def get_available_files(self, 
                           limit: Optional[int] = None,
@@ -42,86 +44,94 @@ class ChatFileManager:
             List of file metadata with chat-specific information
         """
         try:
-            # Get files from database
-            files = db_manager.list_uploaded_files()
+            # Files joined with their latest vector processing status and report count (one query)
+            files = db_manager.get_documents_overview(limit=None if file_type else limit)
             
-            # Enhance with vector processing status
             enhanced_files = []
-            for file_info in files[:limit] if limit else files:
-                # Get vector processing status
-                vector_status = db_manager.get_vector_metadata(file_info['id'])
-                
+            for file_info in files:
                 enhanced_file = {
                     **file_info,
-                    'vector_processed': bool(vector_status),
-                    'vector_status': vector_status.get('status') if vector_status else 'not_processed',
-                    'processed_at': vector_status.get('processed_at') if vector_status else None,
                     'file_type': self._get_file_type(file_info['filename']),
-                    'size_category': self._categorize_file_size(file_info.get('file_size', 0))
+                    'size_category': self._categorize_file_size(file_info.get('file_size') or 0)
                 }
+                if file_type and enhanced_file['file_type'] != file_type:
+                    continue
                 enhanced_files.append(enhanced_file)
                 
-            return enhanced_files
+            return enhanced_files[:limit] if limit else enhanced_files
             
         except Exception as e:
             logger.error(f"Error getting available files: {e}")
             return []
     
-    def search_files(self, 
+    async def search_files(self, 
                     query: str,
-                    search_type: str = "semantic",
+                    search_type: str = "hybrid",
                     limit: int = 10,
                     filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
-        Search files using semantic search or filename matching
+        Search files using hybrid, semantic or filename/keyword matching
         
         Args:
             query: Search query
-            search_type: "semantic" for vector search, "filename" for name matching
+            search_type: "hybrid" for BM25 + vector fusion, "semantic" for vector
+                search only, "filename" for BM25 keyword matching only
             limit: Maximum results
-            filters: Additional filters (date_range, file_type, etc.)
+            filters: Additional filters (date_range, file_type, min_score, etc.)
             
         Returns:
             List of matching files with relevance scores
         """
         try:
+            if search_type == "hybrid":
+                min_score = filters.get('min_score') if filters else None
+                ranked = await self.retriever.search(query, limit * 2, min_score)
+                return self._enrich_ranked(
+                    [(entry["file_id"], entry["score"]) for entry in ranked], "hybrid", limit, filters
+                )
             if search_type == "semantic":
-                return self._semantic_search(query, limit, filters)
-            else:
-                return self._filename_search(query, limit, filters)
+                return await self._semantic_search(query, limit, filters)
+            return self._filename_search(query, limit, filters)
                 
         except Exception as e:
             logger.error(f"Error searching files: {e}")
             return []
     
-    def _semantic_search(self, 
+    def _enrich_ranked(self,
+                       ranked: List[Tuple[str, float]],
+                       search_type: str,
+                       limit: int,
+                       filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Attach file metadata to ranked file IDs and apply filters"""
+        files = []
+        file_infos = db_manager.get_uploaded_files([file_id for file_id, _ in ranked])
+        for file_id, score in ranked:
+            file_info = file_infos.get(file_id)
+            if file_info:
+                files.append({
+                    **file_info,
+                    'relevance_score': score,
+                    'search_type': search_type
+                })
+        
+        # Apply additional filters
+        if filters:
+            if 'file_type' in filters:
+                files = [f for f in files if self._get_file_type(f['filename']) == filters['file_type']]
+            if 'date_range' in filters:
+                files = self._filter_by_date_range(files, filters['date_range'])
+        
+        return files[:limit]
+    
+    async def _semantic_search(self, 
                         query: str,
                         limit: int,
                         filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Perform semantic search using vector embeddings"""
         try:
-            # Use vector service for semantic search
-            results = self.vector_service.search_similar_documents(
-                query_vector=self._get_query_embedding(query),
-                limit=limit,
-                score_threshold=filters.get('min_score', 0.7) if filters else 0.7
-            )
-            
-            # Enhance results with file metadata
-            enhanced_results = []
-            for result in results:
-                doc_id = result.get('doc_id')
-                if doc_id:
-                    file_info = db_manager.get_uploaded_file(doc_id)
-                    if file_info:
-                        enhanced_results.append({
-                            **file_info,
-                            'relevance_score': result.get('score', 0),
-                            'content_preview': result.get('qdrant_payload', {}).get('content_preview', ''),
-                            'search_type': 'semantic'
-                        })
-            
-            return enhanced_results
+            min_score = filters.get('min_score') if filters else None
+            ranked = await self.retriever.vector_search(query, limit * 2, min_score)
+            return self._enrich_ranked(ranked, 'semantic', limit, filters)
             
         except Exception as e:
             logger.error(f"Error in semantic search: {e}")
@@ -131,31 +141,10 @@ class ChatFileManager:
                         query: str,
                         limit: int,
                         filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Perform filename-based search"""
+        """Perform keyword search over filenames, sheet names and account names/codes"""
         try:
-            # Use database search
-            files = db_manager.search_documents_by_filename(query)
-            
-            # Apply additional filters
-            if filters:
-                if 'file_type' in filters:
-                    files = [f for f in files if self._get_file_type(f['filename']) == filters['file_type']]
-                if 'date_range' in filters:
-                    files = self._filter_by_date_range(files, filters['date_range'])
-            
-            # Limit results
-            files = files[:limit]
-            
-            # Add search metadata
-            enhanced_files = []
-            for file_info in files:
-                enhanced_files.append({
-                    **file_info,
-                    'relevance_score': self._calculate_filename_relevance(query, file_info['filename']),
-                    'search_type': 'filename'
-                })
-            
-            return enhanced_files
+            ranked = self.retriever.lexical_search(query, limit * 2)
+            return self._enrich_ranked(ranked, 'filename', limit, filters)
             
         except Exception as e:
             logger.error(f"Error in filename search: {e}")
@@ -202,7 +191,7 @@ class ChatFileManager:
             logger.error(f"Error getting file context: {e}")
             return {}
     
-    def auto_select_files(self, 
+    async def auto_select_files(self, 
                          context: str,
                          max_files: int = 5,
                          criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
@@ -218,10 +207,10 @@ class ChatFileManager:
             List of auto-selected files with relevance scores
         """
         try:
-            # Use semantic search to find relevant files
-            candidates = self.search_files(
+            # Use hybrid search to find relevant files
+            candidates = await self.search_files(
                 query=context,
-                search_type="semantic",
+                search_type="hybrid",
                 limit=max_files * 2,  # Get more candidates for filtering
                 filters=criteria
             )
@@ -275,29 +264,6 @@ class ChatFileManager:
         except Exception:
             return "Preview not available"
     
-    def _get_query_embedding(self, query: str) -> List[float]:
-        """Get vector embedding for search query"""
-        # This would use the embedding service
-        # For now, return a dummy vector
-        return [0.1] * 768  # Jina embeddings are 768-dimensional
-    
-    def _calculate_filename_relevance(self, query: str, filename: str) -> float:
-        """Calculate filename-based relevance score"""
-        query_lower = query.lower()
-        filename_lower = filename.lower()
-        
-        score = 0.0
-        if query_lower in filename_lower:
-            score += 0.8
-        
-        # Bonus for exact word matches
-        query_words = query_lower.split()
-        filename_words = filename_lower.replace('_', ' ').replace('-', ' ').split()
-        matches = sum(1 for qw in query_words if qw in filename_words)
-        score += (matches / len(query_words)) * 0.2
-        
-        return min(score, 1.0)
-    
     def _filter_by_date_range(self, files: List[Dict], date_range: Dict[str, str]) -> List[Dict]:
         """Filter files by date range"""
         try:
@@ -3,14 +3,33 @@ GCSMetadataManager - Document Storage for GCS+Qdrant Architecture
 Handles full document storage in Google Cloud Storage while Qdrant handles vectors
 """
 
+import os
 import json
 import uuid
-from typing import Dict, Any, Optional, List
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 from pathlib import Path
 
 from ..storage.gcs_client import GCSClient
 
+# Parallel document fetches, shared by every manager instance
+DOCUMENT_FETCH_WORKERS = int(os.getenv("DOCUMENT_FETCH_WORKERS", "8"))
+
+_fetch_executor: Optional[ThreadPoolExecutor] = None
+_fetch_executor_lock = threading.Lock()
+
+
+def get_fetch_executor() -> ThreadPoolExecutor:
+    """Get the shared document fetch pool, creating it on first use"""
+    global _fetch_executor
+    with _fetch_executor_lock:
+        if _fetch_executor is None:
+            _fetch_executor = ThreadPoolExecutor(max_workers=DOCUMENT_FETCH_WORKERS, thread_name_prefix="gcs-fetch")
+        return _fetch_executor
+
 
 class GCSMetadataManager:
     """Manages document storage in Google Cloud Storage"""
@@ -31,6 +50,31 @@ class GCSMetadataManager:
         # Import path utilities for consistent path handling
         from ..storage.gcs_path_utils import GCSPathManager
         self.path_manager = GCSPathManager
+        
+        # LRU of recently fetched documents: doc_id -> (generation, document)
+        self.cache_size = int(os.getenv("DOCUMENT_CACHE_SIZE", "256"))
+        self._cache: "OrderedDict[str, Tuple[Optional[int], Dict[str, Any]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    def _cache_get(self, doc_id: str) -> Optional[Tuple[Optional[int], Dict[str, Any]]]:
+        with self._cache_lock:
+            entry = self._cache.get(doc_id)
+            if entry is not None:
+                self._cache.move_to_end(doc_id)
+            return entry
+    
+    def _cache_put(self, doc_id: str, generation: Optional[int], document: Dict[str, Any]):
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            self._cache[doc_id] = (generation, document)
+            self._cache.move_to_end(doc_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def _cache_invalidate(self, doc_id: str):
+        with self._cache_lock:
+            self._cache.pop(doc_id, None)
     
     def store_document(self, 
                       document_data: Dict[str, Any], 
@@ -92,6 +136,7 @@ class GCSMetadataManager:
                     content_type="application/json"
                 )
             
+            self._cache_invalidate(doc_id)
             print(f"✅ Document stored in GCS: {doc_url}")
             return doc_id
             
@@ -112,20 +157,48 @@ class GCSMetadataManager:
         try:
             doc_blob_name = self.path_manager.get_document_blob_name(f"{doc_id}.json", doc_id)
             
-            # Download document content
-            file_content = self.gcs_client.download_file(doc_blob_name)
+            # Revalidate a cached copy by generation; unchanged documents transfer no body
+            cached = self._cache_get(doc_id)
+            cached_generation = cached[0] if cached else None
+            if hasattr(self.gcs_client, "download_file_if_modified"):
+                file_content, generation = self.gcs_client.download_file_if_modified(doc_blob_name, cached_generation)
+            else:
+                # Clients without conditional downloads always transfer the body
+                file_content, generation = self.gcs_client.download_file(doc_blob_name), None
+            if file_content is None and cached:
+                return cached[1]
+            
             document_data = json.loads(file_content.decode('utf-8'))
+            self._cache_put(doc_id, generation, document_data)
             
             return document_data
             
         except Exception as e:
             if "404" in str(e):
+                self._cache_invalidate(doc_id)
                 print(f"⚠️ Document {doc_id} not found in GCS")
                 return None
             else:
                 print(f"❌ Error retrieving document from GCS: {e}")
                 raise
     
+    def get_documents(self, doc_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Retrieve several documents from GCS in parallel
+        
+        Args:
+            doc_ids: Document IDs to retrieve
+            
+        Returns:
+            Mapping of doc_id to document data (None if not found)
+        """
+        unique_ids = list(dict.fromkeys(doc_ids))
+        if len(unique_ids) <= 1:
+            return {doc_id: self.get_document(doc_id) for doc_id in unique_ids}
+        
+        documents = get_fetch_executor().map(self.get_document, unique_ids)
+        return dict(zip(unique_ids, documents))
+    
     def get_document_metadata(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve document metadata from GCS
@@ -201,6 +274,7 @@ class GCSMetadataManager:
             metadata_blob_name = self.path_manager.get_metadata_blob_name(doc_id)
             
             # Delete document
+            self._cache_invalidate(doc_id)
             self.gcs_client.delete_file(doc_blob_name)
             
             # Delete metadata if it exists
@@ -0,0 +1,188 @@
+"""
+EmbeddingCache - Persistent on-disk cache of text embeddings
+Stores float32 vectors in SQLite keyed by (model, task, sha1(text)) so
+re-ingested rows and repeated queries skip the embedding API
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+def text_hash(text: str) -> str:
+    """Hash of the embedded text used in cache keys"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache with LRU eviction"""
+
+    def __init__(self, path: str = None, max_entries: int = None):
+        """
+        Initialize the embedding cache
+
+        Args:
+            path: SQLite file for the cache
+            max_entries: Maximum number of cached vectors before LRU eviction
+        """
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", "./data/embedding_cache.db")
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+        self.enabled = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the cache database on first use (caller holds the lock)"""
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    task TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL,
+                    PRIMARY KEY (model, task, text_hash)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_accessed ON embeddings (last_accessed)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, model: str, task: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up cached vectors
+
+        Args:
+            model: Embedding model name
+            task: Embedding task (e.g. retrieval.passage)
+            hashes: Text hashes from text_hash()
+
+        Returns:
+            Mapping of text hash to vector for every hit
+        """
+        if not self.enabled or not hashes:
+            return {}
+
+        unique = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(unique), _LOOKUP_CHUNK):
+                chunk = unique[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND task = ? AND text_hash IN ({placeholders})",
+                    (model, task, *chunk)
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_accessed = ? WHERE model = ? AND task = ? AND text_hash = ?",
+                    [(now, model, task, key) for key in found]
+                )
+                conn.commit()
+
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(unique) - len(found)
+
+        return found
+
+    def put_many(self, model: str, task: str, items: List[Tuple[str, List[float]]]):
+        """Store (text hash, vector) pairs and evict the least recently used entries"""
+        if not self.enabled or not items:
+            return
+
+        now = time.time()
+        rows = []
+        for key, vector in items:
+            array = np.asarray(vector, dtype=np.float32)
+            rows.append((model, task, key, int(array.shape[0]), array.tobytes(), now, now))
+
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings "
+                "(model, task, text_hash, dim, vector, created_at, last_accessed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._stats["stores"] += len(rows)
+            self._stats["evictions"] += self._evict(conn)
+            conn.commit()
+
+    def clear(self) -> int:
+        """Remove all cached vectors"""
+        with self._lock:
+            conn = self._connect()
+            removed = conn.execute("DELETE FROM embeddings").rowcount
+            conn.commit()
+            return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss metrics and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            entries = self._connect().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] if self.enabled else 0
+
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "entries": entries,
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+            "max_entries": self.max_entries,
+            "path": self.path,
+            "enabled": self.enabled
+        }
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Delete the least recently used entries over the size limit (caller holds the lock)"""
+        if not self.max_entries:
+            return 0
+
+        overflow = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_entries
+        if overflow <= 0:
+            return 0
+
+        conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN "
+            "(SELECT rowid FROM embeddings ORDER BY last_accessed ASC LIMIT ?)",
+            (overflow,)
+        )
+        return overflow
+
+
+# Global embedding cache instance
+embedding_cache = None
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get the singleton embedding cache instance"""
+    global embedding_cache
+    if embedding_cache is None:
+        embedding_cache = EmbeddingCache()
+    return embedding_cache
@@ -1,16 +1,89 @@
 """
-Jina Embedding Service for Financial Document Processing
-Generates embeddings from Excel content for vector storage
+Embedding Services for Financial Document Processing
+Generates embeddings from Excel content for vector storage, via the Jina API
+or a local FastEmbed model (selected with EMBEDDING_BACKEND)
 """
 
 import os
+import sys
+import random
+import asyncio
+import logging
 import pandas as pd
 import numpy as np
-import requests
-from typing import List, Dict, Any, Optional
+import httpx
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 from dataclasses import dataclass
 from pathlib import Path
 
+from .embedding_cache import get_embedding_cache, text_hash
+from .row_chunker import chunk_rows
+
+logger = logging.getLogger(__name__)
+
+# Batching and concurrency settings for the Jina API
+JINA_BATCH_SIZE = int(os.getenv("JINA_BATCH_SIZE", "64"))
+JINA_BATCH_MAX_TOKENS = int(os.getenv("JINA_BATCH_MAX_TOKENS", "32000"))
+JINA_MAX_CONCURRENCY = int(os.getenv("JINA_MAX_CONCURRENCY", "4"))
+JINA_MAX_RETRIES = int(os.getenv("JINA_MAX_RETRIES", "3"))
+JINA_TIMEOUT = float(os.getenv("JINA_TIMEOUT", "60"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# HTTP clients private to one blocking-wrapper event loop, keyed by embedder (see _run_scoped)
+_scoped_http_clients: ContextVar[Optional[Dict[int, httpx.AsyncClient]]] = ContextVar(
+    "embedding_http_clients", default=None
+)
+
+
+async def _run_scoped(coro):
+    """Await coro with loop-scoped HTTP clients, closing them before the loop ends"""
+    clients: Dict[int, httpx.AsyncClient] = {}
+    _scoped_http_clients.set(clients)
+    try:
+        return await coro
+    finally:
+        for client in clients.values():
+            await client.aclose()
+
+
+def _hash_texts(texts: List[str]) -> List[str]:
+    """Embedding cache keys for a list of texts"""
+    return [text_hash(text) for text in texts]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def make_batches(texts: List[str],
+                 max_items: int = JINA_BATCH_SIZE,
+                 max_tokens: int = JINA_BATCH_MAX_TOKENS) -> List[Tuple[int, List[str]]]:
+    """
+    Split texts into batches bounded by item count and estimated tokens
+
+    Returns:
+        List of (start_index, texts) tuples covering the input in order
+    """
+    batches = []
+    start, current, current_tokens = 0, [], 0
+
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append((start, current))
+            start, current, current_tokens = i, [], 0
+        current.append(text)
+        current_tokens += tokens
+
+    if current:
+        batches.append((start, current))
+    return batches
+
 @dataclass
 class EmbeddingResult:
     embedding: List[float]
@@ -18,103 +91,118 @@ class EmbeddingResult:
     tokens: int
     metadata: Dict[str, Any]
 
-class JinaEmbeddingService:
-    def __init__(self, api_key: str = None):
-        self.api_key = api_key or os.getenv("JINA_API_KEY")
-        if not self.api_key:
-            raise ValueError("JINA_API_KEY environment variable is required")
-        
-        self.api_url = "https://api.jina.ai/v1/embeddings"
-        self.model = "jina-embeddings-v3"
-        self.vector_size = 1024
-        
-    def generate_embeddings(self, texts: List[str], task: str = "retrieval.passage") -> List[EmbeddingResult]:
-        """Generate embeddings for a list of texts using Jina API"""
+class BaseEmbedder(ABC):
+    """
+    Common embedder interface
+
+    Backends implement _embed_uncached and set `model`, `backend` and
+    `vector_size`; caching, row/summary text building and the blocking
+    wrappers are shared.
+    """
+
+    backend = "base"
+    model = ""
+    vector_size = 0
+
+    def __init__(self):
+        self.cache = get_embedding_cache()
+
+    @abstractmethod
+    async def _embed_uncached(self, texts: List[str], task: str) -> List[EmbeddingResult]:
+        """Embed texts without consulting the cache"""
+
+    async def aclose(self):
+        """Release backend resources"""
+
+    def _run_blocking(self, coro):
+        """Run a coroutine in a fresh event loop; its HTTP clients are closed with the loop"""
+        return asyncio.run(_run_scoped(coro))
+
+    async def agenerate_embeddings(self, texts: List[str], task: str = "retrieval.passage") -> List[EmbeddingResult]:
+        """
+        Generate embeddings for a list of texts
+
+        Vectors already in the embedding cache are reused; the remaining
+        distinct texts are embedded once by the backend. Results are returned
+        in input order.
+        """
         if not texts:
             return []
-            
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": self.model,
-            "input": texts,
-            "task": task,
-            "encoding_format": "float"
-        }
-        
-        try:
-            response = requests.post(self.api_url, headers=headers, json=payload, timeout=30)
-            response.raise_for_status()
-            
-            data = response.json()
-            results = []
-            
-            for item in data["data"]:
-                results.append(EmbeddingResult(
-                    embedding=item["embedding"],
-                    text=texts[item["index"]],
-                    tokens=item.get("usage", {}).get("total_tokens", 0),
-                    metadata={}
-                ))
-            
-            return results
-            
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Jina API request failed: {str(e)}")
-        except KeyError as e:
-            raise Exception(f"Invalid response format from Jina API: {str(e)}")
-    
+
+        # Hashing thousands of chunk texts is CPU-bound; keep it off the event loop
+        hashes = await asyncio.to_thread(_hash_texts, texts)
+        cached = await asyncio.to_thread(self.cache.get_many, self.model, task, hashes)
+
+        # Embed each distinct uncached text once
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        fresh: Dict[str, EmbeddingResult] = {}
+        if missing:
+            results = await self._embed_uncached(list(missing.values()), task)
+            fresh = dict(zip(missing.keys(), results))
+            await asyncio.to_thread(
+                self.cache.put_many, self.model, task,
+                [(key, result.embedding) for key, result in fresh.items()]
+            )
+
+        if cached:
+            logger.info(f"Embedding cache: {len(texts) - len(missing)}/{len(texts)} texts served from cache")
+
+        return [
+            EmbeddingResult(
+                embedding=fresh[key].embedding if key in fresh else cached[key],
+                text=text,
+                tokens=fresh[key].tokens if key in fresh else 0,
+                metadata={}
+            )
+            for key, text in zip(hashes, texts)
+        ]
+
+    def generate_embeddings(self, texts: List[str], task: str = "retrieval.passage") -> List[EmbeddingResult]:
+        """Generate embeddings for a list of texts (blocking)"""
+        return self._run_blocking(self.agenerate_embeddings(texts, task))
+
     def generate_single_embedding(self, text: str, task: str = "retrieval.query") -> EmbeddingResult:
         """Generate embedding for a single text"""
         results = self.generate_embeddings([text], task)
         return results[0] if results else None
+
+    async def agenerate_single_embedding(self, text: str, task: str = "retrieval.query") -> EmbeddingResult:
+        """Generate embedding for a single text"""
+        results = await self.agenerate_embeddings([text], task)
+        return results[0] if results else None
     
     def generate_excel_embeddings(self, df: pd.DataFrame, filename: str, file_id: str) -> List[EmbeddingResult]:
-        """Generate embeddings for Excel content with structured metadata"""
+        """Generate embeddings for Excel content with structured metadata (blocking)"""
+        return self._run_blocking(self.agenerate_excel_embeddings(df, filename, file_id))
+    
+    async def agenerate_excel_embeddings(self, df: pd.DataFrame, filename: str, file_id: str) -> List[EmbeddingResult]:
+        """
+        Generate embeddings for Excel content with structured metadata
+        
+        Rows are grouped into chunks (see row_chunker) and each chunk becomes
+        one vector whose payload references its row range.
+        """
         if df.empty:
             return []
-            
-        texts = []
-        metadata_list = []
         
-        # Create meaningful text representations for each row
-        for idx, row in df.iterrows():
-            text_parts = []
-            row_metadata = {
-                "row_index": idx,
-                "filename": filename,
-                "file_id": file_id,
-                "columns": list(df.columns),
-                "column_count": len(df.columns),
-                "non_null_fields": 0
-            }
-            
-            # Build text and collect metadata
-            for col in df.columns:
-                value = row[col]
-                if pd.notna(value):
-                    text_parts.append(f"{col}: {value}")
-                    row_metadata[col] = str(value)
-                    row_metadata["non_null_fields"] += 1
-            
-            text = " | ".join(text_parts)
-            texts.append(text)
-            metadata_list.append(row_metadata)
+        chunks = await asyncio.to_thread(chunk_rows, df)
         
-        # Generate embeddings
-        results = self.generate_embeddings(texts, task="retrieval.passage")
+        # Generate embeddings in concurrent batches
+        results = await self.agenerate_embeddings([chunk.text for chunk in chunks], task="retrieval.passage")
         
         # Add metadata to results
-        for result, metadata in zip(results, metadata_list):
-            result.metadata = metadata
+        for result, chunk in zip(results, chunks):
+            result.metadata = chunk.payload(filename, file_id)
         
+        logger.info(f"Embedded {len(df)} rows of {filename} as {len(chunks)} chunks")
         return results
     
-    def generate_file_summary_embedding(self, df: pd.DataFrame, filename: str, file_id: str) -> EmbeddingResult:
-        """Generate a summary embedding for the entire Excel file"""
+    def _build_summary_text(self, df: pd.DataFrame, filename: str, file_id: str) -> str:
+        """Describe the entire Excel file in one line"""
         numeric_cols = df.select_dtypes(include=[np.number]).columns
         date_cols = df.select_dtypes(include=['datetime64']).columns
         
@@ -131,18 +219,29 @@ class JinaEmbeddingService:
         if len(numeric_cols) > 0:
             summary_parts.append(f"Total numeric values: {len(numeric_cols) * len(df)}")
         
-        summary_text = " | ".join(summary_parts)
+        return " | ".join(summary_parts)
+    
+    def _summary_metadata(self, df: pd.DataFrame, filename: str, file_id: str) -> Dict[str, Any]:
+        return {
+            "type": "file_summary",
+            "filename": filename,
+            "file_id": file_id,
+            "row_count": len(df),
+            "column_count": len(df.columns),
+            "columns": list(df.columns)
+        }
+    
+    def generate_file_summary_embedding(self, df: pd.DataFrame, filename: str, file_id: str) -> EmbeddingResult:
+        """Generate a summary embedding for the entire Excel file (blocking)"""
+        return self._run_blocking(self.agenerate_file_summary_embedding(df, filename, file_id))
+    
+    async def agenerate_file_summary_embedding(self, df: pd.DataFrame, filename: str, file_id: str) -> EmbeddingResult:
+        """Generate a summary embedding for the entire Excel file"""
+        summary_text = self._build_summary_text(df, filename, file_id)
         
-        result = self.generate_single_embedding(summary_text, task="retrieval.passage")
+        result = await self.agenerate_single_embedding(summary_text, task="retrieval.passage")
         if result:
-            result.metadata = {
-                "type": "file_summary",
-                "filename": filename,
-                "file_id": file_id,
-                "row_count": len(df),
-                "column_count": len(df.columns),
-                "columns": list(df.columns)
-            }
+            result.metadata = self._summary_metadata(df, filename, file_id)
         
         return result
     
@@ -164,4 +263,207 @@ class JinaEmbeddingService:
         if current_chunk:
             chunks.append(current_chunk.strip())
         
-        return chunks
\ No newline at end of file
+        return chunks
+
+
+class JinaEmbeddingService(BaseEmbedder):
+    """Embedder backed by the Jina embeddings API"""
+
+    backend = "jina"
+
+    def __init__(self, api_key: str = None):
+        super().__init__()
+        self.api_key = api_key or os.getenv("JINA_API_KEY")
+        if not self.api_key:
+            raise ValueError("JINA_API_KEY environment variable is required")
+        
+        self.api_url = "https://api.jina.ai/v1/embeddings"
+        self.model = "jina-embeddings-v3"
+        self.vector_size = 1024
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_loop = None
+
+    def _create_http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            },
+            limits=httpx.Limits(
+                max_connections=JINA_MAX_CONCURRENCY,
+                max_keepalive_connections=JINA_MAX_CONCURRENCY
+            ),
+            timeout=httpx.Timeout(JINA_TIMEOUT, connect=10.0)
+        )
+
+    async def _get_http_client(self) -> httpx.AsyncClient:
+        """
+        Pooled HTTP client for the running event loop
+
+        Blocking wrappers get a client scoped to their short-lived loop. The
+        long-lived client is replaced, and the stale one closed, if it is
+        used from a different loop.
+        """
+        scoped = _scoped_http_clients.get()
+        if scoped is not None:
+            if id(self) not in scoped:
+                scoped[id(self)] = self._create_http_client()
+            return scoped[id(self)]
+
+        loop = asyncio.get_running_loop()
+        if self._http_client is None or self._http_loop is not loop:
+            stale = self._http_client
+            self._http_client = self._create_http_client()
+            self._http_loop = loop
+            if stale is not None:
+                try:
+                    await stale.aclose()
+                except Exception as e:
+                    # Its connections belong to a loop that has already closed
+                    logger.debug(f"Could not close stale Jina HTTP client: {e}")
+        return self._http_client
+
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._http_loop = None
+
+    async def _embed_batch(self, texts: List[str], task: str) -> List[EmbeddingResult]:
+        """Embed one batch, retrying transient failures with jittered backoff"""
+        payload = {
+            "model": self.model,
+            "input": texts,
+            "task": task,
+            "encoding_format": "float"
+        }
+        client = await self._get_http_client()
+
+        for attempt in range(JINA_MAX_RETRIES + 1):
+            try:
+                response = await client.post(self.api_url, json=payload)
+                response.raise_for_status()
+                data = response.json()
+                break
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = (isinstance(e, httpx.TransportError)
+                             or e.response.status_code in RETRYABLE_STATUS_CODES)
+                if attempt >= JINA_MAX_RETRIES or not retryable:
+                    raise Exception(f"Jina API request failed: {str(e)}")
+                delay = random.uniform(0.5, 1.0) * (2 ** attempt)
+                logger.warning(f"Jina batch of {len(texts)} failed ({str(e)}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        try:
+            return [
+                EmbeddingResult(
+                    embedding=item["embedding"],
+                    text=texts[item["index"]],
+                    tokens=item.get("usage", {}).get("total_tokens", 0),
+                    metadata={}
+                )
+                for item in sorted(data["data"], key=lambda item: item["index"])
+            ]
+        except KeyError as e:
+            raise Exception(f"Invalid response format from Jina API: {str(e)}")
+
+    async def _embed_uncached(self, texts: List[str], task: str) -> List[EmbeddingResult]:
+        """
+        Embed texts via the API in concurrent size- and token-bounded batches
+        (at most JINA_MAX_CONCURRENCY at a time)
+        """
+        batches = make_batches(texts)
+        semaphore = asyncio.Semaphore(JINA_MAX_CONCURRENCY)
+
+        async def run(batch: List[str]) -> List[EmbeddingResult]:
+            async with semaphore:
+                return await self._embed_batch(batch, task)
+
+        batch_results = await asyncio.gather(*(run(batch) for _, batch in batches))
+        if len(batches) > 1:
+            logger.info(f"Embedded {len(texts)} texts in {len(batches)} batches")
+        return [result for results in batch_results for result in results]
+
+
+class FastEmbedEmbeddingService(BaseEmbedder):
+    """
+    Local ONNX embedder built on FastEmbed
+
+    Batches run on a thread pool (ONNX Runtime releases the GIL), so
+    embedding needs no network access.
+    """
+
+    backend = "fastembed"
+
+    def __init__(self, model_name: str = None, vector_size: int = None, max_workers: int = None):
+        super().__init__()
+        try:
+            from fastembed import TextEmbedding
+        except ImportError:
+            raise ValueError("fastembed is required for the fastembed embedding backend")
+
+        self.model = model_name or os.getenv("FASTEMBED_MODEL", "BAAI/bge-small-en-v1.5")
+        self.batch_size = int(os.getenv("FASTEMBED_BATCH_SIZE", "64"))
+        self.max_workers = max_workers or int(os.getenv("FASTEMBED_THREADS", str(min(4, os.cpu_count() or 1))))
+
+        self._model = TextEmbedding(model_name=self.model, cache_dir=os.getenv("FASTEMBED_CACHE_DIR"))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fastembed")
+        self.vector_size = vector_size or int(os.getenv("FASTEMBED_DIM", "0")) or self._detect_dimension(TextEmbedding)
+
+    def _detect_dimension(self, text_embedding_cls) -> int:
+        """Look the dimension up in the FastEmbed model list, else embed a probe text"""
+        for description in text_embedding_cls.list_supported_models():
+            if description.get("model") == self.model:
+                return int(description["dim"])
+        return len(next(iter(self._model.embed(["dimension probe"]))))
+
+    def _embed_sync(self, texts: List[str], task: str) -> List[List[float]]:
+        if task == "retrieval.query":
+            vectors = self._model.query_embed(texts)
+        else:
+            vectors = self._model.passage_embed(texts, batch_size=self.batch_size)
+        return [vector.tolist() for vector in vectors]
+
+    async def _embed_uncached(self, texts: List[str], task: str) -> List[EmbeddingResult]:
+        """Embed texts on the thread pool, one batch per task"""
+        loop = asyncio.get_running_loop()
+        batches = make_batches(texts, max_items=self.batch_size, max_tokens=sys.maxsize)
+        batch_vectors = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, self._embed_sync, batch, task)
+            for _, batch in batches
+        ))
+        vectors = [vector for vectors in batch_vectors for vector in vectors]
+        return [
+            EmbeddingResult(embedding=vector, text=text, tokens=0, metadata={})
+            for vector, text in zip(vectors, texts)
+        ]
+
+    async def aclose(self):
+        """Stop the inference thread pool"""
+        self._executor.shutdown(wait=False)
+
+
+EMBEDDING_BACKENDS = {
+    JinaEmbeddingService.backend: JinaEmbeddingService,
+    FastEmbedEmbeddingService.backend: FastEmbedEmbeddingService,
+}
+
+
+def get_embedder(backend: str = None, api_key: str = None) -> BaseEmbedder:
+    """
+    Create the embedder for a backend
+
+    Args:
+        backend: "jina" or "fastembed" (EMBEDDING_BACKEND env var, default jina)
+        api_key: Jina API key (ignored by local backends)
+
+    Returns:
+        Embedder instance
+    """
+    backend = (backend or os.getenv("EMBEDDING_BACKEND", "jina")).lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend} (expected one of {', '.join(EMBEDDING_BACKENDS)})")
+    if backend == JinaEmbeddingService.backend:
+        return JinaEmbeddingService(api_key=api_key)
+    return EMBEDDING_BACKENDS[backend]()
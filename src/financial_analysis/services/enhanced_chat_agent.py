@@ -90,7 +90,7 @@ class EnhancedChatAgent:
         
         # Auto-select files if none specified
         if not file_context['explicit_files']:
-            suggested = self.file_manager.auto_select_files(
+            suggested = await self.file_manager.auto_select_files(
                 context=message,
                 max_files=3,
                 criteria=context.get('selection_criteria') if context else None
@@ -100,9 +100,9 @@ class EnhancedChatAgent:
         # Search for files if requested
         if self._is_search_request(message):
             search_query = self._extract_search_query(message)
-            search_results = self.file_manager.search_files(
+            search_results = await self.file_manager.search_files(
                 query=search_query,
-                search_type="semantic",
+                search_type="hybrid",
                 limit=5
             )
             file_context['search_results'] = search_results
@@ -15,16 +15,17 @@ from pathlib import Path
 import pandas as pd
 
 from ..core.financial_analyzer import (
-    setup_environment,
     load_financial_data,
     load_financial_indicators,
-    generate_financial_report,
-    extract_simple_table,
-    extract_structured_tables
+    agenerate_financial_report
 )
+from ..core.llm_client import get_async_client, create_chat_completion, stream_chat_completion
 
 # Import database manager
 from ..storage.database_manager import db_manager
+from .report_cache import get_report_cache
+from .analysis_jobs import build_tables_data
+from .hybrid_retriever import without_search_index
 
 class FinancialReportAgent:
     """
@@ -39,9 +40,9 @@ class FinancialReportAgent:
         self.initialize_agent()
 
     def initialize_agent(self):
-        """Initialize the agent with OpenAI client"""
+        """Initialize the agent with the shared OpenAI client"""
         try:
-            self.client = setup_environment()
+            self.client = get_async_client()
             self.scan_available_files()
             print("✅ Financial Report Agent initialized successfully")
         except Exception as e:
@@ -88,22 +89,21 @@ class FinancialReportAgent:
 
         return relevant_docs
 
-    async def process_message(self, user_message: str) -> str:
+    def _build_messages(self, user_message: str):
         """
-        Process user message and generate response
-        Stores conversation in database
+        Build the chat messages for a user message
+        Returns (messages, context_docs)
         """
-        try:
-            # Get relevant document context
-            context_docs = self.get_document_context(user_message)
+        # Get relevant document context
+        context_docs = self.get_document_context(user_message)
 
-            # Build context from uploaded documents
-            document_context = ""
-            if context_docs:
-                document_context = self.build_document_context(context_docs)
+        # Build context from uploaded documents
+        document_context = ""
+        if context_docs:
+            document_context = self.build_document_context(context_docs)
 
-            # Create system prompt with context
-            system_prompt = f"""You are a financial report analysis assistant. You can help users analyze financial data, generate reports, and answer questions about uploaded financial documents.
+        # Create system prompt with context
+        system_prompt = f"""You are a financial report analysis assistant. You can help users analyze financial data, generate reports, and answer questions about uploaded financial documents.
 
 Available capabilities:
 1. Analyze financial data from uploaded Excel files
@@ -115,20 +115,48 @@ Available capabilities:
 
 Please provide helpful, accurate financial analysis and be specific about which documents you're referencing when possible."""
 
-            # Build conversation context
-            conversation_context = []
-            for msg in self.conversation_history[-10:]:  # Last 10 messages
-                conversation_context.append({"role": "user", "content": msg["user"]})
-                conversation_context.append({"role": "assistant", "content": msg["assistant"]})
+        # Build conversation context
+        conversation_context = []
+        for msg in self.conversation_history[-10:]:  # Last 10 messages
+            conversation_context.append({"role": "user", "content": msg["user"]})
+            conversation_context.append({"role": "assistant", "content": msg["assistant"]})
 
-            # Generate response
-            messages = [
-                {"role": "system", "content": system_prompt},
-                *conversation_context,
-                {"role": "user", "content": user_message}
-            ]
+        messages = [
+            {"role": "system", "content": system_prompt},
+            *conversation_context,
+            {"role": "user", "content": user_message}
+        ]
+        return messages, context_docs
+
+    def _record_exchange(self, user_message: str, assistant_response: str, context_docs: List[str]):
+        """Store a completed exchange in memory and in the database"""
+        # Store conversation in memory
+        self.conversation_history.append({
+            "user": user_message,
+            "assistant": assistant_response,
+            "timestamp": datetime.now().isoformat(),
+            "context_docs": context_docs
+        })
+
+        # Store in database
+        db_manager.save_chat_message(
+            session_id=self.current_session_id,
+            user_message=user_message,
+            bot_response=assistant_response,
+            context_documents=context_docs
+        )
+
+    async def process_message(self, user_message: str) -> str:
+        """
+        Process user message and generate response
+        Stores conversation in database
+        """
+        try:
+            # Context building touches the database and workbooks, keep it off the event loop
+            messages, context_docs = await asyncio.to_thread(self._build_messages, user_message)
 
-            response = self.client.chat.completions.create(
+            # Generate response
+            response = await create_chat_completion(
                 model="gpt-4",
                 messages=messages,
                 max_tokens=2000,
@@ -136,22 +164,7 @@ Please provide helpful, accurate financial analysis and be specific about which
             )
 
             assistant_response = response.choices[0].message.content
-
-            # Store conversation in memory
-            self.conversation_history.append({
-                "user": user_message,
-                "assistant": assistant_response,
-                "timestamp": datetime.now().isoformat(),
-                "context_docs": context_docs
-            })
-
-            # Store in database
-            db_manager.save_chat_message(
-                session_id=self.current_session_id,
-                user_message=user_message,
-                bot_response=assistant_response,
-                context_documents=context_docs
-            )
+            await asyncio.to_thread(self._record_exchange, user_message, assistant_response, context_docs)
 
             return assistant_response
 
@@ -160,14 +173,39 @@ Please provide helpful, accurate financial analysis and be specific about which
             print(error_msg)
             return error_msg
 
+    async def stream_message(self, user_message: str):
+        """
+        Process user message and yield the response as it is generated
+        The full response is stored in the database once the stream completes
+        """
+        messages, context_docs = await asyncio.to_thread(self._build_messages, user_message)
+
+        parts = []
+        async for delta in stream_chat_completion(
+            model="gpt-4",
+            messages=messages,
+            max_tokens=2000,
+            temperature=0.7
+        ):
+            parts.append(delta)
+            yield delta
+
+        await asyncio.to_thread(self._record_exchange, user_message, "".join(parts), context_docs)
+
     def build_document_context(self, document_ids: List[str]) -> str:
         """
         Build context string from document IDs
         """
         context_parts = []
 
+        # Documents, extracted data and report counts in one query
+        documents = {
+            doc["file_id"]: doc
+            for doc in db_manager.get_documents_overview(document_ids, include_extracted=True)
+        }
+
         for doc_id in document_ids:
-            doc_info = db_manager.get_uploaded_file(doc_id)
+            doc_info = documents.get(doc_id)
             if doc_info:
                 # Add basic file info
                 context_parts.append(f"Document: {doc_info['filename']} (ID: {doc_id})")
@@ -203,14 +241,13 @@ Please provide helpful, accurate financial analysis and be specific about which
                     context_parts.append(f"  - Error loading file data: {str(e)}")
 
                 # Try to get extracted data if available
-                doc_record = db_manager.get_uploaded_document(doc_id)
-                if doc_record and doc_record.extracted_data:
-                    context_parts.append(f"  - Extracted data preview: {str(doc_record.extracted_data)[:200]}...")
+                extracted_data = without_search_index(doc_info["extracted_data"])
+                if extracted_data:
+                    context_parts.append(f"  - Extracted data preview: {str(extracted_data)[:200]}...")
 
                 # Get related reports
-                reports = db_manager.get_reports_for_document(doc_id)
-                if reports:
-                    context_parts.append(f"  - {len(reports)} analysis reports available")
+                if doc_info["report_count"]:
+                    context_parts.append(f"  - {doc_info['report_count']} analysis reports available")
 
         if context_parts:
             return f"\nCurrent document context:\n" + "\n".join(context_parts) + "\n"
@@ -259,30 +296,27 @@ Please provide helpful, accurate financial analysis and be specific about which
             df = load_financial_data(file_path)
             balance_str, income_str, cf_str = load_financial_indicators()
 
-            # Generate comprehensive report
-            report_text = generate_financial_report(self.client, df, balance_str, income_str, cf_str)
-
-            # Extract structured data
-            simple_table = extract_simple_table(report_text)
-            structured_tables = extract_structured_tables(report_text)
+            # Generate comprehensive report, reusing a cached one for identical workbooks
+            cache = get_report_cache()
+            cache_key = cache.make_key(df, balance_str, income_str, cf_str)
+            cached = cache.get(cache_key)
+            if cached:
+                report_text, tables_data = cached["report_text"], cached["tables"]
+            else:
+                report_text = await agenerate_financial_report(df, balance_str, income_str, cf_str)
+                # Same table keys as the API path ("balance_sheet", ...) so cache entries are interchangeable
+                tables_data = build_tables_data(report_text)
+                cache.put(cache_key, report_text, tables_data)
 
             # Prepare response
             analysis_result = {
                 "file_id": file_id,
                 "filename": file_info["filename"],
                 "analysis_summary": report_text,
-                "tables": {},
+                "tables": tables_data,
                 "generated_at": datetime.now().isoformat()
             }
 
-            # Add tables to response
-            if simple_table is not None:
-                analysis_result["tables"]["summary"] = simple_table.to_dict(orient="records")
-
-            if structured_tables:
-                for table_name, table_df in structured_tables.items():
-                    analysis_result["tables"][table_name] = table_df.to_dict(orient="records")
-
             # Store analysis in database
             db_manager.save_generated_report(
                 document_id=file_id,
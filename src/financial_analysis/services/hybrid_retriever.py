@@ -0,0 +1,315 @@
+"""
+HybridRetriever - Lexical + vector file retrieval for chat file search
+Keeps an in-memory BM25 inverted index over filenames, sheet names and
+account names/codes, and fuses it with Qdrant results via reciprocal-rank fusion
+"""
+
+import io
+import os
+import re
+import math
+import threading
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+import pandas as pd
+
+from ..core.financial_analyzer import _find_header_row, _detect_year_columns
+from ..storage.database_manager import db_manager
+
+
+logger = logging.getLogger(__name__)
+
+# Reciprocal-rank fusion constant (Cormack et al.)
+RRF_K = 60
+
+# Cap on indexed cell values per workbook
+MAX_INDEXED_TERMS = int(os.getenv("HYBRID_MAX_INDEXED_TERMS", "20000"))
+
+# extracted_data key holding the lexical terms, kept apart from the document's own extracted data
+SEARCH_INDEX_KEY = "search_index"
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case alphanumeric tokens; account codes stay whole"""
+    return _TOKEN_PATTERN.findall(str(text).lower())
+
+
+def extract_workbook_terms(content: bytes) -> Dict[str, List[str]]:
+    """
+    Pull searchable text out of a workbook
+
+    Indexes sheet names plus, below the "code" header row, every non-period
+    column (account codes and names). Sheets without a header row contribute
+    their text cells.
+
+    Returns:
+        Dictionary with sheet_names and search_terms
+    """
+    sheets = pd.read_excel(io.BytesIO(content), sheet_name=None, header=None)
+    terms: List[str] = []
+
+    for sheet in sheets.values():
+        header_row = _find_header_row(sheet)
+        if header_row is not None:
+            body = sheet.iloc[header_row + 1:].reset_index(drop=True)
+            body.columns = sheet.iloc[header_row].tolist()
+            year_columns = set(_detect_year_columns(body))
+            columns = [body.iloc[:, i] for i in range(body.shape[1]) if i not in year_columns]
+        else:
+            columns = [sheet[col] for col in sheet.columns
+                       if pd.api.types.is_object_dtype(sheet[col]) or pd.api.types.is_string_dtype(sheet[col])]
+
+        for column in columns:
+            for value in column.dropna():
+                if isinstance(value, float) and value.is_integer():
+                    value = int(value)
+                text = str(value).strip()
+                if text:
+                    terms.append(text)
+            if len(terms) >= MAX_INDEXED_TERMS:
+                break
+
+    return {"sheet_names": [str(name) for name in sheets], "search_terms": terms[:MAX_INDEXED_TERMS]}
+
+
+def without_search_index(extracted: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """extracted_data minus the lexical terms, for display and LLM context"""
+    if not isinstance(extracted, dict) or SEARCH_INDEX_KEY not in extracted:
+        return extracted
+    return {key: value for key, value in extracted.items() if key != SEARCH_INDEX_KEY}
+
+
+class LexicalIndex:
+    """In-memory BM25 inverted index keyed by file_id"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, file_id: str) -> bool:
+        return file_id in self._doc_terms
+
+    def add(self, file_id: str, texts: List[str]):
+        """Index (or re-index) a file from its text fields"""
+        counts = Counter(token for text in texts for token in tokenize(text))
+        with self._lock:
+            self.remove(file_id)
+            for term, tf in counts.items():
+                self._postings[term][file_id] = tf
+            self._doc_terms[file_id] = counts
+            length = sum(counts.values())
+            self._doc_lengths[file_id] = length
+            self._total_length += length
+
+    def remove(self, file_id: str):
+        """Drop a file from the index"""
+        with self._lock:
+            counts = self._doc_terms.pop(file_id, None)
+            if counts is None:
+                return
+            for term in counts:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(file_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= self._doc_lengths.pop(file_id, 0)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank files with BM25
+
+        Only the postings of the query terms are visited, so exact lookups
+        such as account codes cost O(matching files).
+        """
+        terms = set(tokenize(query))
+        scores: Dict[str, float] = defaultdict(float)
+
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if not n_docs or not terms:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for file_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[file_id] / avg_length)
+                    scores[file_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+class HybridRetriever:
+    """Fuses BM25 file matches with Qdrant row matches"""
+
+    def __init__(self, vector_min_score: float = None):
+        """
+        Initialize the retriever
+
+        Args:
+            vector_min_score: Minimum cosine score for vector candidates
+        """
+        self.vector_min_score = vector_min_score if vector_min_score is not None else float(os.getenv("HYBRID_VECTOR_MIN_SCORE", "0.3"))
+        self.index = LexicalIndex()
+        self._bootstrapped = False
+        self._bootstrap_lock = threading.Lock()
+
+    def bootstrap(self):
+        """Build the index from the database (blocking; run at startup, off the event loop)"""
+        self._ensure_bootstrapped()
+
+    def _ensure_bootstrapped(self):
+        """Build the index from the database on first use"""
+        if self._bootstrapped:
+            return
+        with self._bootstrap_lock:
+            if self._bootstrapped:
+                return
+            for doc in db_manager.get_all_uploaded_documents():
+                self.index.add(doc.id, self._document_texts(doc.original_filename, doc.extracted_data))
+            self._bootstrapped = True
+            logger.info(f"Hybrid retriever indexed {len(self.index)} files")
+
+    @staticmethod
+    def _document_texts(filename: str, extracted: Optional[Dict[str, Any]]) -> List[str]:
+        # Filenames are repeated so name matches outweigh a single cell match
+        texts = [filename, filename]
+        terms = extracted.get(SEARCH_INDEX_KEY) if isinstance(extracted, dict) else None
+        if isinstance(terms, dict):
+            texts.extend(terms.get("sheet_names", []))
+            texts.extend(terms.get("search_terms", []))
+        return texts
+
+    def add_file(self, file_id: str, filename: str, extracted: Optional[Dict[str, Any]] = None):
+        """Index a new or re-processed file"""
+        self._ensure_bootstrapped()
+        self.index.add(file_id, self._document_texts(filename, extracted))
+
+    def index_workbook(self, file_id: str, filename: str, content: bytes):
+        """Extract workbook terms, persist them with the document and index them"""
+        try:
+            terms = extract_workbook_terms(content)
+        except Exception as e:
+            # Stored empty so backfill does not download an unreadable file on every start
+            logger.warning(f"Could not extract search terms from {filename}: {e}")
+            terms = {"sheet_names": [], "search_terms": []}
+        db_manager.merge_document_extracted_data(file_id, {SEARCH_INDEX_KEY: terms})
+        self.add_file(file_id, filename, {SEARCH_INDEX_KEY: terms})
+
+    def index_stored_workbook(self, file_id: str, filename: str, blob_name: str):
+        """Download an uploaded workbook from storage and index its contents (blocking)"""
+        from ..storage.gcs_client import get_gcs_client
+
+        try:
+            content = get_gcs_client().download_file(blob_name)
+        except Exception as e:
+            logger.warning(f"Could not download {filename} for indexing: {e}")
+            return
+        self.index_workbook(file_id, filename, content)
+
+    def backfill(self) -> int:
+        """
+        Index the contents of documents uploaded before workbook terms were stored (blocking)
+
+        Documents are downloaded one at a time; until a document is reached
+        it stays searchable by filename only.
+
+        Returns:
+            Number of documents backfilled
+        """
+        from ..storage.gcs_path_utils import GCSPathManager
+
+        self._ensure_bootstrapped()
+        backfilled = 0
+        for doc in db_manager.get_all_uploaded_documents():
+            extracted = doc.extracted_data
+            if isinstance(extracted, dict) and SEARCH_INDEX_KEY in extracted:
+                continue
+            blob_name = GCSPathManager.extract_blob_name_from_url(doc.file_path)
+            self.index_stored_workbook(doc.id, doc.original_filename, blob_name)
+            backfilled += 1
+        if backfilled:
+            logger.info(f"Hybrid retriever backfilled workbook terms for {backfilled} files")
+        return backfilled
+
+    def start_backfill(self) -> threading.Thread:
+        """Run backfill() on a daemon thread"""
+        thread = threading.Thread(target=self.backfill, name="hybrid-backfill", daemon=True)
+        thread.start()
+        return thread
+
+    def remove_file(self, file_id: str):
+        """Drop a deleted file from the index"""
+        self.index.remove(file_id)
+
+    def lexical_search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """BM25 ranking of file IDs"""
+        self._ensure_bootstrapped()
+        return self.index.search(query, limit)
+
+    async def vector_search(self, query: str, limit: int = 10, min_score: float = None) -> List[Tuple[str, float]]:
+        """Qdrant row matches collapsed to file IDs by best score"""
+        from .vector_processing import get_vector_processing_service
+
+        try:
+            hits = await get_vector_processing_service().search_similar_documents(
+                query, limit=limit * 5,
+                score_threshold=self.vector_min_score if min_score is None else min_score
+            )
+        except Exception as e:
+            logger.warning(f"Vector search unavailable, using lexical results only: {e}")
+            return []
+
+        best: Dict[str, float] = {}
+        for hit in hits:
+            file_id = hit.get("payload", {}).get("file_id")
+            if file_id and hit["score"] > best.get(file_id, float("-inf")):
+                best[file_id] = hit["score"]
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    async def search(self, query: str, limit: int = 10, min_score: float = None) -> List[Dict[str, Any]]:
+        """
+        Hybrid search with reciprocal-rank fusion
+
+        Returns:
+            List of {file_id, score, lexical_score, vector_score}, best first
+        """
+        lexical = self.lexical_search(query, limit * 2)
+        vector = await self.vector_search(query, limit * 2, min_score)
+
+        fused: Dict[str, Dict[str, Any]] = {}
+        for source, ranking in (("lexical_score", lexical), ("vector_score", vector)):
+            for rank, (file_id, score) in enumerate(ranking, start=1):
+                entry = fused.setdefault(file_id, {"file_id": file_id, "score": 0.0,
+                                                   "lexical_score": None, "vector_score": None})
+                entry["score"] += 1.0 / (RRF_K + rank)
+                entry[source] = score
+
+        return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)[:limit]
+
+
+# Global retriever instance
+hybrid_retriever = None
+
+def get_hybrid_retriever() -> HybridRetriever:
+    """Get the singleton hybrid retriever instance"""
+    global hybrid_retriever
+    if hybrid_retriever is None:
+        hybrid_retriever = HybridRetriever()
+    return hybrid_retriever
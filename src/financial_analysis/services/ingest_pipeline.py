@@ -0,0 +1,335 @@
+"""
+IngestPipeline - Staged background pipeline for vector ingestion
+Moves files through download → parse → embed → upsert → record with a
+bounded asyncio queue between stages and a separate worker count per stage,
+so many uploads ingest in parallel without holding HTTP requests open
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+
+from .vector_processing import get_vector_processing_service
+
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("download", "parse", "embed", "upsert", "record")
+
+# Default workers per stage; downloads and embeddings wait on the network
+DEFAULT_STAGE_WORKERS = {"download": 4, "parse": 2, "embed": 4, "upsert": 2, "record": 1}
+
+# Task states
+TASK_QUEUED = "queued"
+TASK_RUNNING = "running"
+TASK_COMPLETED = "completed"
+TASK_FAILED = "failed"
+
+FINISHED_STATES = {TASK_COMPLETED, TASK_FAILED}
+
+
+class IngestQueueFull(Exception):
+    """Raised when the pipeline has no room for another file"""
+
+
+class IngestPipelineUnavailable(Exception):
+    """Raised when files are submitted while the pipeline is not running"""
+
+
+@dataclass
+class IngestTask:
+    task_id: str
+    file_id: str
+    filename: str
+    gcs_url: str
+    metadata: Optional[Dict[str, Any]] = None
+    status: str = TASK_QUEUED
+    stage: str = "queued"
+    submitted_at: datetime = field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    queue_waits: Dict[str, float] = field(default_factory=dict)
+    vectors_stored: int = 0
+    error: Optional[str] = None
+    # Intermediate stage output, released as the task moves on
+    data: Any = field(default=None, repr=False)
+    enqueued_at: float = field(default_factory=time.monotonic, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize task status with per-stage timings in seconds"""
+        return {
+            "task_id": self.task_id,
+            "file_id": self.file_id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "submitted_at": self.submitted_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "timings": {stage: round(seconds, 4) for stage, seconds in self.timings.items()},
+            "queue_waits": {stage: round(seconds, 4) for stage, seconds in self.queue_waits.items()},
+            "vectors_stored": self.vectors_stored,
+            "error": self.error
+        }
+
+
+@dataclass
+class StageStats:
+    workers: int
+    busy: int = 0
+    processed: int = 0
+    failed: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    total_wait_seconds: float = 0.0
+
+    def record(self, seconds: float, wait_seconds: float, ok: bool):
+        if ok:
+            self.processed += 1
+        else:
+            self.failed += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.total_wait_seconds += wait_seconds
+
+    def to_dict(self, queue_depth: int) -> Dict[str, Any]:
+        handled = self.processed + self.failed
+        return {
+            "workers": self.workers,
+            "busy": self.busy,
+            "queue_depth": queue_depth,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_seconds": round(self.total_seconds / handled, 4) if handled else 0.0,
+            "max_seconds": round(self.max_seconds, 4),
+            "avg_queue_wait_seconds": round(self.total_wait_seconds / handled, 4) if handled else 0.0
+        }
+
+
+class IngestPipeline:
+    """Bounded multi-stage ingest pipeline running on the API event loop"""
+
+    def __init__(self,
+                 queue_size: int = None,
+                 stage_workers: Optional[Dict[str, int]] = None,
+                 retention_seconds: int = None):
+        """
+        Initialize the pipeline
+
+        Args:
+            queue_size: Capacity of each inter-stage queue; a full download
+                queue rejects submissions, full later queues slow the stage before them
+            stage_workers: Worker count per stage (INGEST_<STAGE>_WORKERS by default)
+            retention_seconds: How long finished tasks are kept for polling
+        """
+        self.queue_size = queue_size or int(os.getenv("INGEST_QUEUE_SIZE", "32"))
+        self.retention_seconds = retention_seconds or int(os.getenv("INGEST_TASK_RETENTION", "3600"))
+        workers = {
+            stage: int(os.getenv(f"INGEST_{stage.upper()}_WORKERS", str(default)))
+            for stage, default in DEFAULT_STAGE_WORKERS.items()
+        }
+        workers.update(stage_workers or {})
+        self.stage_workers = {stage: max(1, workers[stage]) for stage in STAGES}
+
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: List[asyncio.Task] = []
+        self._stats = {stage: StageStats(workers=self.stage_workers[stage]) for stage in STAGES}
+        self._tasks: Dict[str, IngestTask] = {}
+        self._active_files: Dict[str, str] = {}
+        self._service = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        """
+        Create the stage queues and workers on the running event loop
+
+        The vector processing service is built first, so missing credentials
+        or an unreachable Qdrant fail here rather than inside a worker.
+        """
+        if self.running:
+            return
+        self._service = await asyncio.to_thread(get_vector_processing_service)
+        self._queues = {stage: asyncio.Queue(maxsize=self.queue_size) for stage in STAGES}
+        for index, stage in enumerate(STAGES):
+            next_stage = STAGES[index + 1] if index + 1 < len(STAGES) else None
+            for n in range(self.stage_workers[stage]):
+                self._workers.append(asyncio.create_task(
+                    self._worker(stage, next_stage), name=f"ingest-{stage}-{n}"
+                ))
+        logger.info(f"Ingest pipeline started with workers {self.stage_workers}")
+
+    async def stop(self):
+        """Cancel the workers; tasks still in flight are marked failed"""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        for task in self._tasks.values():
+            if task.status not in FINISHED_STATES:
+                self._finish(task, TASK_FAILED, "Pipeline stopped before the task completed")
+        logger.info("Ingest pipeline stopped")
+
+    def submit(self,
+               file_id: str,
+               filename: str,
+               gcs_url: str,
+               metadata: Optional[Dict[str, Any]] = None) -> IngestTask:
+        """
+        Queue a file for ingestion (call from the event loop)
+
+        A file that is already in the pipeline is not queued twice; its
+        existing task is returned instead.
+
+        Returns:
+            The IngestTask tracking the file
+
+        Raises:
+            IngestQueueFull: If the download queue is full
+            IngestPipelineUnavailable: If the pipeline is not running
+        """
+        if not self.running:
+            raise IngestPipelineUnavailable("Ingest pipeline is not running")
+
+        self._prune_finished()
+        active_id = self._active_files.get(file_id)
+        if active_id:
+            return self._tasks[active_id]
+
+        task = IngestTask(task_id=str(uuid.uuid4()), file_id=file_id, filename=filename,
+                          gcs_url=gcs_url, metadata=metadata)
+        try:
+            self._queues[STAGES[0]].put_nowait(task)
+        except asyncio.QueueFull:
+            raise IngestQueueFull(f"Ingest queue is full ({self.queue_size} files waiting)")
+
+        self._tasks[task.task_id] = task
+        self._active_files[file_id] = task.task_id
+        logger.info(f"Queued ingest task {task.task_id} for file {file_id}")
+        return task
+
+    def get_task(self, task_id: str) -> Optional[IngestTask]:
+        """Get a task by ID"""
+        return self._tasks.get(task_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-stage queue depth, utilisation and timings plus task counts"""
+        counts: Dict[str, int] = {}
+        for task in self._tasks.values():
+            counts[task.status] = counts.get(task.status, 0) + 1
+
+        return {
+            "running": self.running,
+            "queue_size": self.queue_size,
+            "stages": {
+                stage: self._stats[stage].to_dict(self._queues[stage].qsize() if self._queues else 0)
+                for stage in STAGES
+            },
+            "tasks": counts
+        }
+
+    @property
+    def service(self):
+        if self._service is None:
+            self._service = get_vector_processing_service()
+        return self._service
+
+    async def _worker(self, stage: str, next_stage: Optional[str]):
+        """Take tasks from a stage queue, run the stage and hand them on"""
+        queue = self._queues[stage]
+        handler = getattr(self, f"_{stage}")
+        stats = self._stats[stage]
+
+        while True:
+            task = await queue.get()
+            wait = time.monotonic() - task.enqueued_at
+            task.status = TASK_RUNNING
+            task.stage = stage
+            task.queue_waits[stage] = wait
+
+            stats.busy += 1
+            started = time.monotonic()
+            ok = False
+            try:
+                await handler(task)
+                ok = True
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingest task {task.task_id} failed in {stage} stage: {e}")
+                self._finish(task, TASK_FAILED, str(e))
+                try:
+                    await asyncio.to_thread(self.service.mark_failed, task.file_id, str(e))
+                except Exception:
+                    # Never let bookkeeping kill the worker; later tasks would hang in the queue
+                    logger.exception(f"Could not mark file {task.file_id} as failed")
+            finally:
+                elapsed = time.monotonic() - started
+                task.timings[stage] = elapsed
+                stats.busy -= 1
+                stats.record(elapsed, wait, ok)
+                queue.task_done()
+
+            if ok and next_stage:
+                # Blocks while the next stage is saturated, which in turn fills this queue
+                task.enqueued_at = time.monotonic()
+                await self._queues[next_stage].put(task)
+
+    async def _download(self, task: IngestTask):
+        task.data = await asyncio.to_thread(self.service.download_excel, task.gcs_url)
+
+    async def _parse(self, task: IngestTask):
+        task.data = await asyncio.to_thread(self.service.parse_excel, task.data)
+
+    async def _embed(self, task: IngestTask):
+        task.data = await self.service.embed_excel(task.data, task.filename, task.file_id)
+
+    async def _upsert(self, task: IngestTask):
+        task.data = await asyncio.to_thread(self.service.replace_vectors, task.data, task.file_id)
+        task.vectors_stored = len(task.data)
+
+    async def _record(self, task: IngestTask):
+        await asyncio.to_thread(self.service.record_processing,
+                                task.file_id, task.filename, task.metadata, task.data)
+        self._finish(task, TASK_COMPLETED)
+        total = sum(task.timings.values()) + sum(task.queue_waits.values())
+        logger.info(f"Ingested {task.filename} ({task.vectors_stored} vectors) in {total:.2f}s")
+
+    def _finish(self, task: IngestTask, status: str, error: Optional[str] = None):
+        task.status = status
+        task.stage = status
+        task.error = error
+        task.data = None
+        task.finished_at = datetime.utcnow()
+        if self._active_files.get(task.file_id) == task.task_id:
+            del self._active_files[task.file_id]
+
+    def _prune_finished(self):
+        """Drop finished tasks older than the retention window"""
+        now = datetime.utcnow()
+        expired = [
+            task_id for task_id, task in self._tasks.items()
+            if task.status in FINISHED_STATES
+            and task.finished_at
+            and (now - task.finished_at).total_seconds() > self.retention_seconds
+        ]
+        for task_id in expired:
+            del self._tasks[task_id]
+
+
+# Global pipeline instance
+ingest_pipeline = None
+
+def get_ingest_pipeline() -> IngestPipeline:
+    """Get the singleton ingest pipeline instance"""
+    global ingest_pipeline
+    if ingest_pipeline is None:
+        ingest_pipeline = IngestPipeline()
+    return ingest_pipeline
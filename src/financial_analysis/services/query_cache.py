@@ -0,0 +1,128 @@
+"""
+QueryCache - In-memory caches for vector search
+Two LRU levels: query text → embedding, and (embedding hash, limit,
+threshold, collection version) → results. Writes to the collection bump its
+version, so stale result entries are never served and simply age out
+"""
+
+import os
+import copy
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace so trivially different queries share an entry"""
+    return " ".join(str(text).split())
+
+
+def embedding_hash(vector: List[float]) -> str:
+    """Hash of a query vector used in result cache keys"""
+    return hashlib.sha1(np.asarray(vector, dtype=np.float32).tobytes()).hexdigest()
+
+
+class _LRU:
+    """Thread-safe LRU with an optional TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float = 0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class QueryCache:
+    """Query-embedding and search-result caches for one collection"""
+
+    def __init__(self,
+                 embedding_entries: int = None,
+                 result_entries: int = None,
+                 result_ttl_seconds: float = None):
+        """
+        Initialize the caches
+
+        Args:
+            embedding_entries: Maximum cached query embeddings
+            result_entries: Maximum cached result lists
+            result_ttl_seconds: Upper bound on result age, covering writes made
+                by other processes that do not bump this process's version
+        """
+        self.embeddings = _LRU(
+            embedding_entries if embedding_entries is not None else int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+        )
+        self.results = _LRU(
+            result_entries if result_entries is not None else int(os.getenv("QUERY_RESULT_CACHE_SIZE", "512")),
+            result_ttl_seconds if result_ttl_seconds is not None else float(os.getenv("QUERY_RESULT_CACHE_TTL", "300"))
+        )
+
+    def get_embedding(self, model: str, query: str) -> Optional[List[float]]:
+        """Cached embedding for a query, or None"""
+        return self.embeddings.get((model, normalize_query(query)))
+
+    def put_embedding(self, model: str, query: str, vector: List[float]):
+        self.embeddings.put((model, normalize_query(query)), vector)
+
+    @staticmethod
+    def result_key(vector: List[float], limit: int, score_threshold: float, version: int) -> tuple:
+        return (embedding_hash(vector), limit, score_threshold, version)
+
+    def get_results(self, key: tuple) -> Optional[List[Dict[str, Any]]]:
+        """Copy of cached results (callers may annotate them), or None"""
+        results = self.results.get(key)
+        return copy.deepcopy(results) if results is not None else None
+
+    def put_results(self, key: tuple, results: List[Dict[str, Any]]):
+        self.results.put(key, copy.deepcopy(results))
+
+    def clear(self):
+        self.embeddings.clear()
+        self.results.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "query_embeddings": self.embeddings.get_stats(),
+            "search_results": self.results.get_stats()
+        }
@@ -0,0 +1,208 @@
+"""
+ReportCache - Content-addressed cache of LLM financial reports
+Reuses generated reports when the same workbook is analyzed again,
+keyed by workbook content, indicators, model and prompt version
+"""
+
+import os
+import hashlib
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+import pandas as pd
+
+from ..core.financial_analyzer import REPORT_MODEL, PROMPT_TEMPLATE_VERSION
+from ..core.prompt_compactor import DEFAULT_TOKEN_BUDGET
+from ..storage.database_manager import db_manager, ReportCacheEntry
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReportCache:
+    """Persistent report cache with TTL and LRU eviction"""
+
+    def __init__(self, ttl_seconds: int = None, max_entries: int = None):
+        """
+        Initialize the report cache
+
+        Args:
+            ttl_seconds: Maximum age of a cached report (0 disables expiry)
+            max_entries: Maximum number of cached reports before LRU eviction
+        """
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv("REPORT_CACHE_TTL", str(7 * 24 * 3600)))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "500"))
+        self.enabled = os.getenv("REPORT_CACHE_ENABLED", "true").lower() == "true"
+
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "stores": 0}
+
+    @staticmethod
+    def make_key(df: pd.DataFrame,
+                 balance_str: str,
+                 income_str: str,
+                 cf_str: str,
+                 model: str = REPORT_MODEL,
+                 prompt_version: str = PROMPT_TEMPLATE_VERSION) -> str:
+        """
+        Build the cache key for a report
+
+        Args:
+            df: Normalized DataFrame from load_financial_data
+            balance_str: Balance sheet indicators
+            income_str: Income statement indicators
+            cf_str: Cash flow indicators
+            model: Model used to generate the report
+            prompt_version: Prompt template version (the table token budget is included too)
+
+        Returns:
+            Hex sha256 digest
+        """
+        digest = hashlib.sha256()
+        normalized = df.dropna(how="all")
+        digest.update("\x1f".join(str(col).strip() for col in normalized.columns).encode("utf-8"))
+        digest.update(normalized.to_csv(index=False).encode("utf-8"))
+        for part in (balance_str, income_str, cf_str, model, prompt_version, str(DEFAULT_TOKEN_BUDGET)):
+            digest.update(b"\x1e")
+            digest.update(part.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached report
+
+        Returns:
+            Dictionary with report_text and tables, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        with db_manager.get_session() as session:
+            entry = session.query(ReportCacheEntry).filter(ReportCacheEntry.cache_key == cache_key).first()
+
+            if entry and self._is_expired(entry):
+                session.delete(entry)
+                session.commit()
+                self._bump("expired")
+                entry = None
+
+            if not entry:
+                self._bump("misses")
+                return None
+
+            entry.last_accessed = datetime.utcnow()
+            entry.hit_count = (entry.hit_count or 0) + 1
+            session.commit()
+
+            self._bump("hits")
+            logger.info(f"Report cache hit for {cache_key[:12]}")
+            return {
+                "report_text": entry.report_text,
+                "tables": entry.tables or {},
+                "model_used": entry.model_used,
+                "created_at": entry.created_at
+            }
+
+    def put(self,
+            cache_key: str,
+            report_text: str,
+            tables: Optional[Dict[str, Any]] = None,
+            model: str = REPORT_MODEL,
+            prompt_version: str = PROMPT_TEMPLATE_VERSION):
+        """Store a generated report and evict the least recently used entries"""
+        if not self.enabled:
+            return
+
+        with db_manager.get_session() as session:
+            session.merge(ReportCacheEntry(
+                cache_key=cache_key,
+                report_text=report_text,
+                tables=tables,
+                model_used=model,
+                prompt_version=prompt_version,
+                created_at=datetime.utcnow(),
+                last_accessed=datetime.utcnow(),
+                hit_count=0
+            ))
+            session.commit()
+            self._bump("stores")
+
+            evicted = self._evict(session)
+            if evicted:
+                session.commit()
+                self._bump("evictions", evicted)
+
+    def invalidate(self, cache_key: str = None) -> int:
+        """Remove one entry, or all entries when no key is given"""
+        with db_manager.get_session() as session:
+            query = session.query(ReportCacheEntry)
+            if cache_key:
+                query = query.filter(ReportCacheEntry.cache_key == cache_key)
+            removed = query.delete(synchronize_session=False)
+            session.commit()
+            return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss metrics and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+
+        with db_manager.get_session() as session:
+            entries = session.query(ReportCacheEntry).count()
+
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "entries": entries,
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "enabled": self.enabled
+        }
+
+    def _is_expired(self, entry: ReportCacheEntry) -> bool:
+        """Check whether an entry is past its TTL"""
+        if not self.ttl_seconds or not entry.created_at:
+            return False
+        return datetime.utcnow() - entry.created_at > timedelta(seconds=self.ttl_seconds)
+
+    def _evict(self, session) -> int:
+        """Delete expired entries and the least recently used ones over the size limit"""
+        evicted = 0
+
+        if self.ttl_seconds:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+            evicted += session.query(ReportCacheEntry).filter(
+                ReportCacheEntry.created_at < cutoff
+            ).delete(synchronize_session=False)
+
+        if self.max_entries:
+            overflow = session.query(ReportCacheEntry).count() - self.max_entries
+            if overflow > 0:
+                stale_keys = [
+                    row.cache_key for row in session.query(ReportCacheEntry.cache_key)
+                    .order_by(ReportCacheEntry.last_accessed.asc())
+                    .limit(overflow)
+                ]
+                evicted += session.query(ReportCacheEntry).filter(
+                    ReportCacheEntry.cache_key.in_(stale_keys)
+                ).delete(synchronize_session=False)
+
+        return evicted
+
+    def _bump(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._stats[counter] += amount
+
+
+# Global report cache instance
+report_cache = None
+
+def get_report_cache() -> ReportCache:
+    """Get the singleton report cache instance"""
+    global report_cache
+    if report_cache is None:
+        report_cache = ReportCache()
+    return report_cache
@@ -0,0 +1,312 @@
+"""
+RetentionEngine - Batched, resumable purge of expired documents and reports
+Walks expired uploads oldest first in bounded batches. For each batch it deletes
+the GCS blobs and the Qdrant vectors in parallel, then removes the rows in one
+short transaction. Progress is checkpointed so an interrupted purge continues
+where it stopped instead of holding one long write lock
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..storage.database_manager import db_manager
+
+
+logger = logging.getLogger(__name__)
+
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "200"))
+RETENTION_DELETE_WORKERS = int(os.getenv("RETENTION_DELETE_WORKERS", "16"))
+RETENTION_CHECKPOINT_PATH = os.getenv("RETENTION_CHECKPOINT_PATH", "./data/retention_checkpoint.json")
+
+# Blob delete outcomes
+BLOB_DELETED = "deleted"
+BLOB_MISSING = "missing"
+BLOB_FAILED = "failed"
+
+
+class RetentionAlreadyRunning(Exception):
+    """Raised when a retention run is started while another is in progress"""
+
+
+class RetentionEngine:
+    """Purges expired documents, their blobs and vectors, and old reports"""
+
+    def __init__(self,
+                 batch_size: int = None,
+                 delete_workers: int = None,
+                 checkpoint_path: str = None,
+                 delete_vectors: bool = True):
+        """
+        Initialize the retention engine
+
+        Args:
+            batch_size: Documents/reports deleted per transaction
+            delete_workers: Parallel blob and vector deletes
+            checkpoint_path: JSON file recording progress for resumption
+            delete_vectors: Also delete the documents' Qdrant vectors
+        """
+        self.batch_size = batch_size or RETENTION_BATCH_SIZE
+        self.delete_workers = delete_workers or RETENTION_DELETE_WORKERS
+        self.checkpoint_path = Path(checkpoint_path or RETENTION_CHECKPOINT_PATH)
+        self.delete_vectors = delete_vectors
+        self._run_lock = threading.Lock()
+
+    def run(self, days_old: int = 30, resume: bool = True) -> Dict[str, Any]:
+        """
+        Purge documents and reports older than days_old (blocking)
+
+        Args:
+            days_old: Retention window in days
+            resume: Continue an unfinished run from its checkpoint (keeping its cutoff)
+
+        Returns:
+            Run report with counts and throughput
+
+        Raises:
+            RetentionAlreadyRunning: If another run is in progress
+        """
+        if not self._run_lock.acquire(blocking=False):
+            raise RetentionAlreadyRunning("A retention run is already in progress")
+
+        try:
+            state = self._load_checkpoint() if resume else None
+            if state and state.get("status") != "completed":
+                logger.info(f"Resuming retention run {state['run_id']} (cutoff {state['cutoff']}, phase {state['phase']})")
+                state["resumed"] = True
+            else:
+                state = self._new_state(days_old)
+            state["status"] = "running"
+
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=self.delete_workers, thread_name_prefix="retention") as executor:
+                try:
+                    if state["phase"] == "documents":
+                        self._purge_documents(state, executor, started)
+                        state["phase"] = "reports"
+                        state["cursor"] = None
+                    self._purge_reports(state, started)
+                    state["status"] = "completed"
+                except Exception as e:
+                    state["status"] = "failed"
+                    state["error"] = str(e)
+                    logger.error(f"Retention run {state['run_id']} failed: {e}")
+                    raise
+                finally:
+                    self._save_checkpoint(state, started)
+
+            report = self._report(state)
+            logger.info(
+                f"Retention run {state['run_id']} completed: {report['documents_deleted']} documents, "
+                f"{report['reports_deleted']} reports in {report['elapsed_seconds']}s "
+                f"({report['documents_per_second']} documents/s)"
+            )
+            return report
+
+        finally:
+            self._run_lock.release()
+
+    def get_status(self) -> Optional[Dict[str, Any]]:
+        """Report of the last (or current) run from its checkpoint"""
+        state = self._load_checkpoint()
+        return self._report(state) if state else None
+
+    def _new_state(self, days_old: int) -> Dict[str, Any]:
+        cutoff = datetime.utcnow() - timedelta(days=days_old)
+        return {
+            "run_id": str(uuid.uuid4()),
+            "days_old": days_old,
+            "cutoff": cutoff.isoformat(),
+            "phase": "documents",
+            "cursor": None,
+            "status": "running",
+            "resumed": False,
+            "started_at": datetime.utcnow().isoformat(),
+            "elapsed_seconds": 0.0,
+            "batches": 0,
+            "documents_deleted": 0,
+            "documents_kept": 0,
+            "blobs_deleted": 0,
+            "blob_failures": 0,
+            "vectors_deleted": 0,
+            "reports_deleted": 0,
+            "error": None
+        }
+
+    def _purge_documents(self, state: Dict[str, Any], executor: ThreadPoolExecutor, started: float):
+        """Delete expired documents batch by batch, checkpointing after each"""
+        cutoff = datetime.fromisoformat(state["cutoff"])
+        qdrant_manager = self._get_qdrant_manager() if self.delete_vectors else None
+        from .hybrid_retriever import get_hybrid_retriever
+        retriever = get_hybrid_retriever()
+
+        while True:
+            page = db_manager.get_expired_documents_page(cutoff, self.batch_size, state["cursor"])
+            documents = page["documents"]
+            if not documents:
+                break
+
+            deletable = self._delete_external(documents, state, executor, qdrant_manager)
+            deleted = db_manager.purge_documents(deletable)
+            for file_id in deletable:
+                retriever.remove_file(file_id)
+
+            state["documents_deleted"] += deleted
+            state["documents_kept"] += len(documents) - len(deletable)
+            state["batches"] += 1
+            state["cursor"] = page["next_cursor"]
+            self._save_checkpoint(state, started)
+            logger.info(
+                f"Retention batch {state['batches']}: deleted {deleted} documents "
+                f"({state['documents_deleted']} total, {self._rate(state['documents_deleted'], state):.1f}/s)"
+            )
+
+            if not page["next_cursor"]:
+                break
+
+    def _delete_external(self,
+                         documents: List[Tuple[str, str]],
+                         state: Dict[str, Any],
+                         executor: ThreadPoolExecutor,
+                         qdrant_manager) -> List[str]:
+        """
+        Delete a batch's blobs and vectors in parallel
+
+        Returns:
+            IDs of documents whose external data is gone; the others are kept
+            so a later run can retry them instead of leaving orphans
+        """
+        file_ids = [file_id for file_id, _ in documents]
+        vector_future = executor.submit(qdrant_manager.delete_vectors_by_file_ids, file_ids) if qdrant_manager else None
+        blob_results = list(executor.map(self._delete_blob, [file_path for _, file_path in documents]))
+
+        if vector_future is not None:
+            try:
+                state["vectors_deleted"] += vector_future.result()
+            except Exception as e:
+                logger.warning(f"Keeping {len(file_ids)} documents, vector delete failed: {e}")
+                return []
+
+        deletable = []
+        for file_id, result in zip(file_ids, blob_results):
+            if result == BLOB_DELETED:
+                state["blobs_deleted"] += 1
+            elif result == BLOB_FAILED:
+                state["blob_failures"] += 1
+                continue
+            deletable.append(file_id)
+        return deletable
+
+    def _delete_blob(self, file_path: Optional[str]) -> str:
+        """Delete a document's stored file (local path or GCS blob)"""
+        if not file_path:
+            return BLOB_MISSING
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+                return BLOB_DELETED
+            if os.path.isabs(file_path):
+                # Local file already gone, e.g. removed by an interrupted batch
+                return BLOB_MISSING
+
+            from ..storage.gcs_client import get_gcs_client
+            from ..storage.gcs_path_utils import GCSPathManager
+            get_gcs_client().delete_file(GCSPathManager.extract_blob_name_from_url(file_path))
+            return BLOB_DELETED
+
+        except Exception as e:
+            if "404" in str(e):
+                return BLOB_MISSING
+            logger.warning(f"Could not delete {file_path}: {e}")
+            return BLOB_FAILED
+
+    def _purge_reports(self, state: Dict[str, Any], started: float):
+        """Delete expired reports in bounded chunks"""
+        cutoff = datetime.fromisoformat(state["cutoff"])
+        while True:
+            deleted = db_manager.purge_reports_before(cutoff, self.batch_size)
+            state["reports_deleted"] += deleted
+            if deleted:
+                state["batches"] += 1
+                self._save_checkpoint(state, started)
+            if deleted < self.batch_size:
+                break
+
+    @staticmethod
+    def _get_qdrant_manager():
+        """
+        Qdrant manager for the documents collection
+
+        Reuses the vector service's manager when it is already running, so its
+        search cache sees the deletes. Otherwise builds a bare manager, which
+        needs no embedder or GCS credentials and never creates or migrates
+        the collection. Returns None when the collection does not exist.
+        """
+        from . import vector_processing
+        from .vector_database import QdrantManager
+
+        if vector_processing.vector_processing_service is not None:
+            return vector_processing.vector_processing_service.qdrant_manager
+
+        manager = QdrantManager(
+            host=vector_processing.DEFAULT_QDRANT_HOST,
+            port=vector_processing.DEFAULT_QDRANT_PORT,
+            collection_name=vector_processing.DEFAULT_COLLECTION_NAME,
+            migrate_profile=False,
+            ensure_collection=False
+        )
+        if not manager.collection_exists():
+            logger.info(f"Qdrant collection {manager.collection_name} does not exist, no vectors to delete")
+            return None
+        return manager
+
+    def _rate(self, count: int, state: Dict[str, Any]) -> float:
+        return count / state["elapsed_seconds"] if state["elapsed_seconds"] else 0.0
+
+    def _report(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        report = {key: value for key, value in state.items() if key != "cursor" and not key.startswith("_")}
+        report["elapsed_seconds"] = round(state["elapsed_seconds"], 3)
+        report["documents_per_second"] = round(self._rate(state["documents_deleted"], state), 2)
+        report["reports_per_second"] = round(self._rate(state["reports_deleted"], state), 2)
+        return report
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable retention checkpoint: {e}")
+            return None
+
+    def _save_checkpoint(self, state: Dict[str, Any], started: float):
+        """Persist progress atomically, folding this session's time into elapsed_seconds"""
+        now = time.monotonic()
+        state["elapsed_seconds"] += now - state.pop("_session_mark", started)
+        state["updated_at"] = datetime.utcnow().isoformat()
+
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+        state["_session_mark"] = now
+
+
+# Global retention engine instance
+retention_engine = None
+
+def get_retention_engine() -> RetentionEngine:
+    """Get the singleton retention engine instance"""
+    global retention_engine
+    if retention_engine is None:
+        retention_engine = RetentionEngine()
+    return retention_engine
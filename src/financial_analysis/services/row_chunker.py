@@ -0,0 +1,159 @@
+"""
+Row chunking for spreadsheet embeddings
+Groups ledger rows into windows (N rows with overlap, or account-code ranges)
+so each vector covers a block of related rows with a compact payload
+"""
+
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Any
+
+import pandas as pd
+
+
+# Chunking strategy: "code" (account-code ranges), "window" (N rows with overlap) or "row"
+CHUNK_STRATEGY = os.getenv("EMBEDDING_CHUNK_STRATEGY", "code").lower()
+CHUNK_ROWS = int(os.getenv("EMBEDDING_CHUNK_ROWS", "20"))
+CHUNK_OVERLAP = int(os.getenv("EMBEDDING_CHUNK_OVERLAP", "2"))
+
+# Account-code prefix length that defines a "code" chunk (e.g. 11x, 12x, ...)
+CODE_PREFIX_LENGTH = int(os.getenv("EMBEDDING_CHUNK_CODE_PREFIX", "2"))
+
+PREVIEW_CHARS = 200
+
+
+@dataclass
+class RowChunk:
+    """A block of consecutive rows embedded as one vector"""
+    chunk_index: int
+    row_start: int
+    row_end: int
+    text: str
+    code_start: Optional[str] = None
+    code_end: Optional[str] = None
+
+    def payload(self, filename: str, file_id: str) -> Dict[str, Any]:
+        """Compact Qdrant payload referencing the row range instead of copying cells"""
+        payload = {
+            "type": "row_chunk",
+            "filename": filename,
+            "file_id": file_id,
+            "chunk_index": self.chunk_index,
+            "row_start": self.row_start,
+            "row_end": self.row_end,
+            "row_count": self.row_end - self.row_start + 1,
+            "preview": self.text[:PREVIEW_CHARS]
+        }
+        if self.code_start is not None:
+            payload["code_start"] = self.code_start
+            payload["code_end"] = self.code_end
+        return payload
+
+
+def _code_column(df: pd.DataFrame) -> Optional[str]:
+    for col in df.columns:
+        if "code" in str(col).lower():
+            return col
+    return None
+
+
+def _code_text(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return "" if pd.isna(value) else str(value).strip()
+
+
+def _cell_text(value) -> str:
+    return "" if pd.isna(value) else str(value).strip()
+
+
+def _render_rows(df: pd.DataFrame) -> str:
+    """
+    Render rows as one header line plus one pipe-separated line per row
+
+    Columns that are empty throughout the block are left out, and the
+    remaining cells keep their position under the header (empty cells stay
+    blank) so values such as year columns can be read against their labels.
+    """
+    cells = df.apply(lambda column: column.map(_cell_text))
+    cells = cells.loc[:, (cells != "").any(axis=0)]
+    lines = [" | ".join(str(col) for col in cells.columns)]
+    for row in cells.itertuples(index=False):
+        if any(row):
+            lines.append(" | ".join(row))
+    return "\n".join(lines)
+
+
+def _window_bounds(n_rows: int, size: int, overlap: int) -> List[tuple]:
+    step = max(size - overlap, 1)
+    bounds = []
+    for start in range(0, n_rows, step):
+        end = min(start + size, n_rows)
+        bounds.append((start, end))
+        if end == n_rows:
+            break
+    return bounds
+
+
+def _code_bounds(codes: pd.Series, max_rows: int) -> List[tuple]:
+    """Split at account-code prefix changes, capping each range at max_rows"""
+    prefixes = [_code_text(code)[:CODE_PREFIX_LENGTH] for code in codes]
+    bounds = []
+    start = 0
+    for i in range(1, len(prefixes) + 1):
+        boundary = i == len(prefixes) or (prefixes[i] and prefixes[i] != prefixes[start])
+        if boundary or i - start >= max_rows:
+            bounds.append((start, i))
+            start = i
+    return bounds
+
+
+def chunk_rows(df: pd.DataFrame,
+               strategy: str = None,
+               chunk_rows: int = None,
+               overlap: int = None) -> List[RowChunk]:
+    """
+    Group DataFrame rows into chunks for embedding
+
+    Args:
+        df: Sheet contents
+        strategy: "code", "window" or "row" (EMBEDDING_CHUNK_STRATEGY by default);
+            "code" falls back to "window" when there is no code column
+        chunk_rows: Maximum rows per chunk
+        overlap: Rows shared between consecutive windows
+
+    Returns:
+        List of RowChunk in row order
+    """
+    strategy = (strategy or CHUNK_STRATEGY).lower()
+    chunk_rows = chunk_rows or CHUNK_ROWS
+    overlap = CHUNK_OVERLAP if overlap is None else overlap
+
+    df = df.reset_index(drop=True)
+    if df.empty:
+        return []
+
+    code_col = _code_column(df)
+    if strategy == "row":
+        bounds = [(i, i + 1) for i in range(len(df))]
+    elif strategy == "code" and code_col is not None:
+        bounds = _code_bounds(df[code_col], chunk_rows)
+    else:
+        bounds = _window_bounds(len(df), chunk_rows, min(overlap, chunk_rows - 1))
+
+    chunks = []
+    for start, end in bounds:
+        block = df.iloc[start:end]
+        chunk = RowChunk(
+            chunk_index=len(chunks),
+            row_start=start,
+            row_end=end - 1,
+            text=_render_rows(block)
+        )
+        if code_col is not None:
+            codes = [code for code in map(_code_text, block[code_col]) if code]
+            if codes:
+                chunk.code_start, chunk.code_end = codes[0], codes[-1]
+        chunks.append(chunk)
+
+    return chunks
@@ -92,12 +92,16 @@ class VectorService:
             score_threshold=score_threshold
         )
         
-        # Fetch full documents from GCS
+        # Fetch full documents from GCS in parallel
+        documents = self.gcs_manager.get_documents(
+            [result["doc_id"] for result in qdrant_results if result.get("doc_id")]
+        )
+        
         results = []
         for result in qdrant_results:
             doc_id = result.get("doc_id")
             if doc_id:
-                document = self.gcs_manager.get_document(doc_id)
+                document = documents.get(doc_id)
                 if document:
                     results.append({
                         "document": document,
@@ -5,13 +5,100 @@ Handles all vector operations with Qdrant while storing full documents in GCS
 
 import os
 import uuid
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from enum import Enum
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams, PointStruct, Filter
 
+# Namespace for deterministic point IDs
+POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "financial-analysis/qdrant-points")
+
+# Payload fields with keyword indexes
+PAYLOAD_INDEX_FIELDS = ("file_id", "doc_id")
+
+
+@dataclass
+class CollectionProfile:
+    """
+    Storage and index tuning for a Qdrant collection
+    
+    The default profile keeps int8 scalar-quantized vectors in RAM and the
+    float32 originals on disk, then rescores the oversampled quantized
+    candidates against the originals, so RAM per vector drops by about 4x.
+    """
+    quantization: str = "int8"
+    quantile: float = 0.99
+    quantized_always_ram: bool = True
+    vectors_on_disk: bool = True
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_on_disk: bool = False
+    indexing_threshold: int = 20000
+    memmap_threshold: int = 20000
+    search_hnsw_ef: int = 128
+    rescore: bool = True
+    oversampling: float = 2.0
+    
+    @classmethod
+    def from_env(cls) -> "CollectionProfile":
+        """Build the profile from QDRANT_* environment variables"""
+        def flag(name: str, default: bool) -> bool:
+            return os.getenv(name, str(default)).lower() == "true"
+        
+        return cls(
+            quantization=os.getenv("QDRANT_QUANTIZATION", cls.quantization).lower(),
+            quantile=float(os.getenv("QDRANT_QUANTILE", str(cls.quantile))),
+            quantized_always_ram=flag("QDRANT_QUANTIZED_ALWAYS_RAM", cls.quantized_always_ram),
+            vectors_on_disk=flag("QDRANT_VECTORS_ON_DISK", cls.vectors_on_disk),
+            hnsw_m=int(os.getenv("QDRANT_HNSW_M", str(cls.hnsw_m))),
+            hnsw_ef_construct=int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", str(cls.hnsw_ef_construct))),
+            hnsw_on_disk=flag("QDRANT_HNSW_ON_DISK", cls.hnsw_on_disk),
+            indexing_threshold=int(os.getenv("QDRANT_INDEXING_THRESHOLD", str(cls.indexing_threshold))),
+            memmap_threshold=int(os.getenv("QDRANT_MEMMAP_THRESHOLD", str(cls.memmap_threshold))),
+            search_hnsw_ef=int(os.getenv("QDRANT_SEARCH_HNSW_EF", str(cls.search_hnsw_ef))),
+            rescore=flag("QDRANT_RESCORE", cls.rescore),
+            oversampling=float(os.getenv("QDRANT_OVERSAMPLING", str(cls.oversampling)))
+        )
+    
+    @property
+    def quantized(self) -> bool:
+        return self.quantization == "int8"
+    
+    def vectors_config(self, size: int) -> VectorParams:
+        return VectorParams(size=size, distance=Distance.COSINE, on_disk=self.vectors_on_disk)
+    
+    def hnsw_config(self) -> models.HnswConfigDiff:
+        return models.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct, on_disk=self.hnsw_on_disk)
+    
+    def optimizers_config(self) -> models.OptimizersConfigDiff:
+        return models.OptimizersConfigDiff(
+            indexing_threshold=self.indexing_threshold,
+            memmap_threshold=self.memmap_threshold
+        )
+    
+    def quantization_config(self) -> Optional[models.ScalarQuantization]:
+        if not self.quantized:
+            return None
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=self.quantile,
+                always_ram=self.quantized_always_ram
+            )
+        )
+    
+    def search_params(self) -> models.SearchParams:
+        quantization = None
+        if self.quantized:
+            quantization = models.QuantizationSearchParams(rescore=self.rescore, oversampling=self.oversampling)
+        return models.SearchParams(hnsw_ef=self.search_hnsw_ef, quantization=quantization)
+
 
 class QdrantManager:
     """Manages vector operations with Qdrant database"""
@@ -20,7 +107,10 @@ class QdrantManager:
                  host: str = None, 
                  port: int = 6333,
                  collection_name: str = "documents",
-                 vector_size: int = 1024):
+                 vector_size: int = 1024,
+                 profile: Optional[CollectionProfile] = None,
+                 migrate_profile: Optional[bool] = None,
+                 ensure_collection: bool = True):
         # Use environment variable for host, fallback to localhost
         if host is None:
             host = os.getenv("QDRANT_HOST", "localhost")
@@ -31,18 +121,45 @@ class QdrantManager:
             host: Qdrant server host
             port: Qdrant server port
             collection_name: Name of the collection
-            vector_size: Dimension of vectors (1024 for Jina v3)
+            vector_size: Dimension of vectors (must match the embedder, 1024 for Jina v3)
+            profile: Collection tuning profile (CollectionProfile.from_env() if None)
+            migrate_profile: Migrate an existing collection to the profile on startup
+                (QDRANT_APPLY_PROFILE, off by default); otherwise differences are only logged
+            ensure_collection: Create the collection and payload indexes if missing;
+                maintenance jobs that only read or delete points pass False
         """
         self.host = host
         self.port = port
         self.collection_name = collection_name
         self.vector_size = vector_size
+        self.profile = profile or CollectionProfile.from_env()
+        self.migrate_profile = (
+            migrate_profile if migrate_profile is not None
+            else os.getenv("QDRANT_APPLY_PROFILE", "false").lower() == "true"
+        )
+        self.upsert_batch_size = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+        self.upsert_parallel = int(os.getenv("QDRANT_UPSERT_PARALLEL", "4"))
+        self.scroll_page_size = int(os.getenv("QDRANT_SCROLL_PAGE_SIZE", "1000"))
+        
+        # Bumped on every write so cached search results can be invalidated
+        self._collection_version = 0
+        self._version_lock = threading.Lock()
         
         # Initialize Qdrant client
         self.client = QdrantClient(host=host, port=port)
         
         # Ensure collection exists
-        self._ensure_collection()
+        if ensure_collection:
+            self._ensure_collection()
+    
+    @property
+    def collection_version(self) -> int:
+        """Counter that changes whenever this manager writes to the collection"""
+        return self._collection_version
+    
+    def _bump_version(self):
+        with self._version_lock:
+            self._collection_version += 1
     
     def _ensure_collection(self):
         """Create collection if it doesn't exist"""
@@ -53,30 +170,162 @@ class QdrantManager:
             if self.collection_name not in collection_names:
                 self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(
-                        size=self.vector_size,
-                        distance=Distance.COSINE
-                    )
+                    vectors_config=self.profile.vectors_config(self.vector_size),
+                    hnsw_config=self.profile.hnsw_config(),
+                    optimizers_config=self.profile.optimizers_config(),
+                    quantization_config=self.profile.quantization_config()
                 )
                 print(f"✅ Created Qdrant collection: {self.collection_name}")
             else:
+                existing_size = self._get_collection_vector_size()
+                if existing_size is not None and existing_size != self.vector_size:
+                    raise ValueError(
+                        f"Collection {self.collection_name} stores {existing_size}-dimensional vectors "
+                        f"but the embedder produces {self.vector_size}; use a different collection name "
+                        f"or re-create the collection"
+                    )
                 print(f"✅ Qdrant collection {self.collection_name} already exists")
+                self.apply_profile(dry_run=not self.migrate_profile)
+            
+            self._ensure_payload_indexes()
                 
         except Exception as e:
             print(f"❌ Error creating Qdrant collection: {e}")
             raise
     
+    def collection_exists(self) -> bool:
+        """Whether the collection exists on the server"""
+        collections = self.client.get_collections()
+        return self.collection_name in [col.name for col in collections.collections]
+    
+    def _ensure_payload_indexes(self):
+        """Index the payload fields used by per-file and per-document filters"""
+        info = self.client.get_collection(self.collection_name)
+        existing = set((info.payload_schema or {}).keys())
+        for field_name in PAYLOAD_INDEX_FIELDS:
+            if field_name not in existing:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.KEYWORD
+                )
+                print(f"✅ Created payload index on {field_name}")
+    
+    def _profile_changes(self, config) -> Dict[str, Any]:
+        """update_collection arguments needed to bring an existing collection to the profile"""
+        changes: Dict[str, Any] = {}
+        
+        vectors = config.params.vectors
+        if bool(getattr(vectors, "on_disk", False)) != self.profile.vectors_on_disk:
+            changes["vectors_config"] = {"": models.VectorParamsDiff(on_disk=self.profile.vectors_on_disk)}
+        
+        hnsw = config.hnsw_config
+        if (hnsw.m, hnsw.ef_construct, bool(hnsw.on_disk)) != (
+                self.profile.hnsw_m, self.profile.hnsw_ef_construct, self.profile.hnsw_on_disk):
+            changes["hnsw_config"] = self.profile.hnsw_config()
+        
+        optimizers = config.optimizer_config
+        if (optimizers.indexing_threshold, optimizers.memmap_threshold) != (
+                self.profile.indexing_threshold, self.profile.memmap_threshold):
+            changes["optimizers_config"] = self.profile.optimizers_config()
+        
+        scalar = getattr(config.quantization_config, "scalar", None)
+        if self.profile.quantized:
+            if scalar is None or scalar.quantile != self.profile.quantile or \
+                    bool(scalar.always_ram) != self.profile.quantized_always_ram:
+                changes["quantization_config"] = self.profile.quantization_config()
+        elif config.quantization_config is not None:
+            changes["quantization_config"] = models.Disabled.DISABLED
+        
+        return changes
+    
+    def apply_profile(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Migrate an existing collection to the configured profile
+        
+        Only settings that differ are sent; Qdrant rebuilds quantized vectors,
+        indexes and on-disk storage in the background while the collection
+        keeps serving requests.
+        
+        Args:
+            dry_run: Only log and return the planned changes
+        
+        Returns:
+            The planned or applied changes (empty if the collection already matches)
+        """
+        config = self.client.get_collection(self.collection_name).config
+        changes = self._profile_changes(config)
+        planned = {name: self._plain(value) for name, value in changes.items()}
+        if not changes:
+            return planned
+        
+        if dry_run:
+            print(f"⚠️ Qdrant collection {self.collection_name} differs from the profile, not migrating: {planned}")
+            return planned
+        
+        print(f"🔄 Migrating Qdrant collection {self.collection_name} to profile: {planned}")
+        self.client.update_collection(collection_name=self.collection_name, **changes)
+        print(f"✅ Migrated Qdrant collection {self.collection_name} to profile: {', '.join(changes)}")
+        return planned
+    
+    @classmethod
+    def _plain(cls, value: Any) -> Any:
+        """JSON-friendly form of a qdrant models config value"""
+        if isinstance(value, dict):
+            return {key: cls._plain(item) for key, item in value.items()}
+        if isinstance(value, Enum):
+            return value.value
+        if hasattr(value, "model_dump"):
+            return value.model_dump(exclude_none=True, mode="json")
+        if hasattr(value, "dict"):
+            return value.dict(exclude_none=True)
+        return value
+    
+    def _get_collection_vector_size(self) -> Optional[int]:
+        """Vector dimension of the existing collection (None for named multi-vector configs)"""
+        vectors = self.client.get_collection(self.collection_name).config.params.vectors
+        return getattr(vectors, "size", None)
+    
+    @staticmethod
+    def point_id_for(payload: Dict[str, Any], doc_id: Optional[str] = None) -> str:
+        """
+        Deterministic point ID for a payload
+        
+        Spreadsheet row chunks map to (file_id, chunk_index), single rows to
+        (file_id, row_index) and file summaries to (file_id, "summary"), so
+        re-ingesting a file overwrites its own points and never another file's.
+        Other points are keyed by doc_id.
+        """
+        file_id = payload.get("file_id")
+        if file_id is not None and payload.get("type") == "file_summary":
+            key = f"{file_id}:summary"
+        elif file_id is not None and payload.get("chunk_index") is not None:
+            key = f"{file_id}:chunk:{payload['chunk_index']}"
+        elif file_id is not None and payload.get("row_index") is not None:
+            key = f"{file_id}:row:{payload['row_index']}"
+        elif doc_id is not None:
+            key = f"doc:{doc_id}"
+        else:
+            return str(uuid.uuid4())
+        return str(uuid.uuid5(POINT_ID_NAMESPACE, key))
+    
     def add_vectors(self, 
                    vectors: List[List[float]], 
                    payloads: List[Dict[str, Any]], 
-                   doc_ids: Optional[List[str]] = None) -> List[str]:
+                   doc_ids: Optional[List[str]] = None,
+                   wait: bool = False) -> List[str]:
         """
         Add vectors and associated metadata to Qdrant
         
+        Points get deterministic UUIDv5 IDs (see point_id_for), so repeated
+        ingestion is idempotent. Points are upserted in batches of
+        upsert_batch_size, upsert_parallel batches at a time.
+        
         Args:
             vectors: List of vector embeddings
             payloads: List of metadata payloads
-            doc_ids: Optional list of document IDs (auto-generated if None)
+            doc_ids: Optional list of document IDs (the point IDs if None)
+            wait: Wait until every batch is indexed before returning
             
         Returns:
             List of document IDs used
@@ -84,30 +333,51 @@ class QdrantManager:
         if len(vectors) != len(payloads):
             raise ValueError("Vectors and payloads must have same length")
         
+        point_ids = [
+            self.point_id_for(payload, doc_ids[idx] if doc_ids else None)
+            for idx, payload in enumerate(payloads)
+        ]
         if doc_ids is None:
-            doc_ids = [str(uuid.uuid4()) for _ in vectors]
+            doc_ids = point_ids
         elif len(doc_ids) != len(vectors):
             raise ValueError("doc_ids must match vectors length")
         
+        timestamp = datetime.utcnow().isoformat()
         points = []
-        for idx, (vector, payload, doc_id) in enumerate(zip(vectors, payloads, doc_ids)):
+        for vector, payload, doc_id, point_id in zip(vectors, payloads, doc_ids, point_ids):
             point = PointStruct(
-                id=idx + 1,  # Qdrant uses integer IDs
+                id=point_id,
                 vector=vector,
                 payload={
                     "doc_id": doc_id,
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "timestamp": timestamp,
                     **payload
                 }
             )
             points.append(point)
         
-        try:
+        batches = [
+            points[start:start + self.upsert_batch_size]
+            for start in range(0, len(points), self.upsert_batch_size)
+        ]
+        
+        def upsert(batch: List[PointStruct]):
             self.client.upsert(
                 collection_name=self.collection_name,
-                points=points
+                points=batch,
+                wait=wait
             )
-            print(f"✅ Added {len(points)} vectors to Qdrant")
+        
+        try:
+            if len(batches) <= 1:
+                for batch in batches:
+                    upsert(batch)
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.upsert_parallel, len(batches))) as executor:
+                    # list() re-raises the first failed batch
+                    list(executor.map(upsert, batches))
+            self._bump_version()
+            print(f"✅ Added {len(points)} vectors to Qdrant in {len(batches)} batch(es)")
             return doc_ids
             
         except Exception as e:
@@ -134,7 +404,8 @@ class QdrantManager:
                 collection_name=self.collection_name,
                 query_vector=query_vector,
                 limit=limit,
-                score_threshold=score_threshold
+                score_threshold=score_threshold,
+                search_params=self.profile.search_params()
             )
             
             results = []
@@ -151,6 +422,58 @@ class QdrantManager:
             print(f"❌ Error searching vectors: {e}")
             raise
     
+    def scroll_points(self,
+                      scroll_filter: Optional[Filter] = None,
+                      with_vectors: bool = False,
+                      page_size: Optional[int] = None) -> Iterator[models.Record]:
+        """
+        Iterate over every point matching a filter
+        
+        Follows next_page_offset until the collection is exhausted, yielding
+        points one page at a time.
+        
+        Args:
+            scroll_filter: Optional filter
+            with_vectors: Include vectors in the returned points
+            page_size: Points per scroll request
+        """
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=page_size or self.scroll_page_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=with_vectors
+            )
+            yield from points
+            if offset is None:
+                break
+    
+    def _delete_by_filter(self, filter_condition: Filter) -> int:
+        """
+        Delete all points matching a filter server-side
+        
+        Returns:
+            Number of matching points counted just before the delete. This is
+            approximate: points upserted or removed concurrently between the
+            count and the delete are not reflected in it.
+        """
+        count = self.client.count(
+            collection_name=self.collection_name,
+            count_filter=filter_condition,
+            exact=True
+        ).count
+        
+        if count:
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.FilterSelector(filter=filter_condition)
+            )
+            self._bump_version()
+        return count
+    
     def delete_vectors(self, doc_ids: List[str]) -> int:
         """
         Delete vectors by document IDs
@@ -159,10 +482,9 @@ class QdrantManager:
             doc_ids: List of document IDs to delete
             
         Returns:
-            Number of vectors deleted
+            Number of vectors deleted (approximate, see _delete_by_filter)
         """
         try:
-            # Create filter for doc_ids
             filter_condition = Filter(
                 must=[
                     models.FieldCondition(
@@ -172,26 +494,63 @@ class QdrantManager:
                 ]
             )
             
-            # Get points to delete
-            scroll_result = self.client.scroll(
-                collection_name=self.collection_name,
-                scroll_filter=filter_condition,
-                limit=1000
-            )
+            deleted = self._delete_by_filter(filter_condition)
+            if deleted:
+                print(f"✅ Deleted {deleted} vectors from Qdrant")
+            return deleted
             
-            if scroll_result[0]:
-                point_ids = [point.id for point in scroll_result[0]]
-                self.client.delete(
-                    collection_name=self.collection_name,
-                    points_selector=models.PointIdsList(points=point_ids)
-                )
-                print(f"✅ Deleted {len(point_ids)} vectors from Qdrant")
-                return len(point_ids)
+        except Exception as e:
+            print(f"❌ Error deleting vectors: {e}")
+            raise
+    
+    def delete_vectors_by_file_id(self, file_id: str) -> int:
+        """
+        Delete all vectors for a file in one server-side call
+        
+        Args:
+            file_id: File whose vectors should be deleted
+            
+        Returns:
+            Number of vectors deleted (approximate, see _delete_by_filter)
+        """
+        try:
+            deleted = self._delete_by_filter(self._file_filter(file_id))
+            if deleted:
+                print(f"✅ Deleted {deleted} vectors for file {file_id} from Qdrant")
+            return deleted
+            
+        except Exception as e:
+            print(f"❌ Error deleting vectors for file {file_id}: {e}")
+            raise
+    
+    def delete_vectors_by_file_ids(self, file_ids: List[str]) -> int:
+        """
+        Delete all vectors for several files with one filter-delete
+        
+        Args:
+            file_ids: Files whose vectors should be deleted
             
+        Returns:
+            Number of vectors deleted (approximate, see _delete_by_filter)
+        """
+        if not file_ids:
             return 0
+        try:
+            filter_condition = Filter(
+                must=[
+                    models.FieldCondition(
+                        key="file_id",
+                        match=models.MatchAny(any=list(file_ids))
+                    )
+                ]
+            )
+            deleted = self._delete_by_filter(filter_condition)
+            if deleted:
+                print(f"✅ Deleted {deleted} vectors for {len(file_ids)} files from Qdrant")
+            return deleted
             
         except Exception as e:
-            print(f"❌ Error deleting vectors: {e}")
+            print(f"❌ Error deleting vectors for {len(file_ids)} files: {e}")
             raise
     
     def get_collection_info(self) -> Dict[str, Any]:
@@ -199,10 +558,13 @@ class QdrantManager:
         try:
             info = self.client.get_collection(self.collection_name)
             return {
-                "name": info.config.params.vectors.size,
+                "name": self.collection_name,
                 "vector_size": info.config.params.vectors.size,
                 "distance": str(info.config.params.vectors.distance),
-                "points_count": info.points_count
+                "points_count": info.points_count,
+                "vectors_on_disk": bool(getattr(info.config.params.vectors, "on_disk", False)),
+                "quantization": "int8" if getattr(info.config.quantization_config, "scalar", None) else "none",
+                "hnsw": {"m": info.config.hnsw_config.m, "ef_construct": info.config.hnsw_config.ef_construct}
             }
         except Exception as e:
             print(f"❌ Error getting collection info: {e}")
@@ -213,40 +575,40 @@ class QdrantManager:
         try:
             self.client.delete_collection(self.collection_name)
             self._ensure_collection()
+            self._bump_version()
             print(f"✅ Cleared Qdrant collection: {self.collection_name}")
         except Exception as e:
             print(f"❌ Error clearing collection: {e}")
             raise
 
-    def get_vectors_by_file_id(self, file_id: str) -> List[Dict[str, Any]]:
-        """Get all vectors for a specific file_id"""
+    @staticmethod
+    def _file_filter(file_id: str) -> Filter:
+        return Filter(
+            must=[
+                models.FieldCondition(
+                    key="file_id",
+                    match=models.MatchValue(value=file_id)
+                )
+            ]
+        )
+
+    def iter_vectors_by_file_id(self, file_id: str, with_vectors: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream all points for a specific file_id, page by page
+        
+        Vectors are only fetched when with_vectors is set; otherwise "vector" is None.
+        """
+        for point in self.scroll_points(self._file_filter(file_id), with_vectors=with_vectors):
+            yield {
+                "id": point.id,
+                "payload": point.payload,
+                "vector": point.vector
+            }
+
+    def get_vectors_by_file_id(self, file_id: str, with_vectors: bool = False) -> List[Dict[str, Any]]:
+        """Get all points for a specific file_id, with their vectors only when requested"""
         try:
-            # Create filter for file_id
-            filter_condition = Filter(
-                must=[
-                    models.FieldCondition(
-                        key="file_id",
-                        match=models.MatchValue(value=file_id)
-                    )
-                ]
-            )
-            
-            # Get all vectors for this file
-            scroll_result = self.client.scroll(
-                collection_name=self.collection_name,
-                scroll_filter=filter_condition,
-                limit=1000
-            )
-            
-            vectors = []
-            for point in scroll_result[0]:
-                vectors.append({
-                    "id": point.id,
-                    "payload": point.payload,
-                    "vector": point.vector
-                })
-            
-            return vectors
+            return list(self.iter_vectors_by_file_id(file_id, with_vectors=with_vectors))
             
         except Exception as e:
             print(f"❌ Error getting vectors by file_id: {e}")
@@ -3,6 +3,7 @@ Vector Processing Service - Orchestrates complete workflow from Excel upload to
 Coordinates Excel analysis, Jina embeddings, GCS metadata storage, and Qdrant vector storage
 """
 
+import io
 import asyncio
 import uuid
 from datetime import datetime
@@ -10,39 +11,51 @@ from typing import Dict, List, Optional, Any
 import pandas as pd
 import logging
 
-from .embedding_service import JinaEmbeddingService, EmbeddingResult
+from .embedding_service import get_embedder, EmbeddingResult
 from .vector_database import QdrantManager
+from .query_cache import QueryCache
+from .vector_stats import VectorStatsService
 from ..storage.gcs_client import GCSClient
-from ..storage.database_manager import DatabaseManager
+from ..storage.database_manager import db_manager
 
 logger = logging.getLogger(__name__)
 
+# Qdrant connection and collection used by the service (also by retention's bare manager)
+DEFAULT_QDRANT_HOST = "localhost"
+DEFAULT_QDRANT_PORT = 6333
+DEFAULT_COLLECTION_NAME = "financial_documents"
+
 class VectorProcessingService:
     """Orchestrates the complete vector processing workflow"""
     
     def __init__(self, 
                  jina_api_key: str = None,
-                 qdrant_host: str = "localhost", 
-                 qdrant_port: int = 6333,
-                 collection_name: str = "financial_documents"):
+                 embedding_backend: str = None,
+                 qdrant_host: str = DEFAULT_QDRANT_HOST, 
+                 qdrant_port: int = DEFAULT_QDRANT_PORT,
+                 collection_name: str = DEFAULT_COLLECTION_NAME):
         """
         Initialize the vector processing service
         
         Args:
             jina_api_key: Jina API key for embeddings
+            embedding_backend: Embedding backend ("jina" or "fastembed", EMBEDDING_BACKEND by default)
             qdrant_host: Qdrant server host
             qdrant_port: Qdrant server port
             collection_name: Name for Qdrant collection
         """
-        self.embedding_service = JinaEmbeddingService(api_key=jina_api_key)
+        self.embedding_service = get_embedder(embedding_backend, api_key=jina_api_key)
         self.qdrant_manager = QdrantManager(
             host=qdrant_host,
             port=qdrant_port,
             collection_name=collection_name,
-            vector_size=1024  # Jina v3 embedding size
+            vector_size=self.embedding_service.vector_size
         )
+        self.query_cache = QueryCache()
+        self.stats = VectorStatsService(self.qdrant_manager)
         self.gcs_client = GCSClient()
-        self.db_manager = DatabaseManager()
+        # Shared manager so its vector stats counters see every write
+        self.db_manager = db_manager
         
     async def process_excel_file(self, 
                                gcs_url: str, 
@@ -65,41 +78,44 @@ class VectorProcessingService:
             logger.info(f"Starting vector processing for file: {filename} (ID: {file_id})")
             
             # Step 1: Download and load Excel file from GCS
-            df = await self._load_excel_from_gcs(gcs_url)
+            content = await asyncio.to_thread(self.download_excel, gcs_url)
+            df = await asyncio.to_thread(self.parse_excel, content)
             logger.info(f"Loaded Excel file with {len(df)} rows and {len(df.columns)} columns")
             
             # Step 2: Generate embeddings for Excel content
-            embeddings = await self._generate_excel_embeddings(df, filename, file_id)
+            embeddings = await self.embed_excel(df, filename, file_id)
             logger.info(f"Generated {len(embeddings)} embeddings")
             
-            # Step 3: Store vectors in Qdrant
-            vector_ids = await self._store_vectors_in_qdrant(embeddings, file_id)
+            # Step 3: Replace the file's previous vectors in Qdrant
+            vector_ids = await asyncio.to_thread(self.replace_vectors, embeddings, file_id)
             logger.info(f"Stored {len(vector_ids)} vectors in Qdrant")
             
-            # Step 4: Store metadata in database
-            metadata_record = await self._store_vector_metadata(file_id, filename, metadata, vector_ids)
+            # Step 4: Store metadata in database and update document status
+            metadata_record = await asyncio.to_thread(self.record_processing, file_id, filename, metadata, vector_ids)
             logger.info(f"Stored metadata for file processing")
             
-            # Step 5: Update document status
-            await self._update_document_status(file_id, "processed", metadata_record)
-            
-            return {
-                "status": "success",
-                "file_id": file_id,
-                "filename": filename,
-                "vectors_stored": len(vector_ids),
-                "vector_ids": vector_ids,
-                "processing_timestamp": datetime.utcnow().isoformat(),
-                "metadata_record": metadata_record
-            }
+            return self.build_result(file_id, filename, vector_ids, metadata_record)
             
         except Exception as e:
             logger.error(f"Error processing Excel file {filename}: {str(e)}")
-            await self._update_document_status(file_id, "failed", {"error": str(e)})
+            await asyncio.to_thread(self.mark_failed, file_id, str(e))
             raise
     
-    async def _load_excel_from_gcs(self, gcs_url: str) -> pd.DataFrame:
-        """Download and load Excel file from GCS"""
+    @staticmethod
+    def build_result(file_id: str, filename: str, vector_ids: List[str], metadata_record: Dict[str, Any]) -> Dict[str, Any]:
+        """Processing result returned for a stored file"""
+        return {
+            "status": "success",
+            "file_id": file_id,
+            "filename": filename,
+            "vectors_stored": len(vector_ids),
+            "vector_ids": vector_ids,
+            "processing_timestamp": datetime.utcnow().isoformat(),
+            "metadata_record": metadata_record
+        }
+    
+    def download_excel(self, gcs_url: str) -> bytes:
+        """Download an Excel file from GCS (blocking)"""
         try:
             # Import path utilities for consistent URL handling
             from ..storage.gcs_path_utils import GCSPathManager
@@ -107,11 +123,16 @@ class VectorProcessingService:
             # Extract clean blob name using centralized path utilities
             blob_name = GCSPathManager.extract_blob_name_from_url(gcs_url)
             
-            # Download file content
-            file_content = self.gcs_client.download_file(blob_name)
+            return self.gcs_client.download_file(blob_name)
             
-            # Load into pandas DataFrame
-            df = pd.read_excel(file_content)
+        except Exception as e:
+            logger.error(f"Error downloading Excel from GCS: {str(e)}")
+            raise Exception(f"Failed to download Excel file: {str(e)}")
+    
+    def parse_excel(self, content: bytes) -> pd.DataFrame:
+        """Load downloaded Excel content into a cleaned DataFrame (blocking)"""
+        try:
+            df = pd.read_excel(io.BytesIO(content))
             
             # Basic data cleaning
             df = df.dropna(how='all')  # Remove empty rows
@@ -120,17 +141,17 @@ class VectorProcessingService:
             return df
             
         except Exception as e:
-            logger.error(f"Error loading Excel from GCS: {str(e)}")
+            logger.error(f"Error parsing Excel content: {str(e)}")
             raise Exception(f"Failed to load Excel file: {str(e)}")
     
-    async def _generate_excel_embeddings(self, df: pd.DataFrame, filename: str, file_id: str) -> List[EmbeddingResult]:
+    async def embed_excel(self, df: pd.DataFrame, filename: str, file_id: str) -> List[EmbeddingResult]:
         """Generate embeddings for Excel content"""
         try:
-            # Generate embeddings for each row
-            row_embeddings = self.embedding_service.generate_excel_embeddings(df, filename, file_id)
-            
-            # Generate summary embedding for the entire file
-            summary_embedding = self.embedding_service.generate_file_summary_embedding(df, filename, file_id)
+            # Generate embeddings for each row (row batches and the summary run concurrently)
+            row_embeddings, summary_embedding = await asyncio.gather(
+                self.embedding_service.agenerate_excel_embeddings(df, filename, file_id),
+                self.embedding_service.agenerate_file_summary_embedding(df, filename, file_id)
+            )
             
             # Combine all embeddings
             all_embeddings = row_embeddings + [summary_embedding]
@@ -141,20 +162,22 @@ class VectorProcessingService:
             logger.error(f"Error generating embeddings: {str(e)}")
             raise Exception(f"Failed to generate embeddings: {str(e)}")
     
-    async def _store_vectors_in_qdrant(self, embeddings: List[EmbeddingResult], file_id: str) -> List[str]:
-        """Store vectors in Qdrant database"""
+    def replace_vectors(self, embeddings: List[EmbeddingResult], file_id: str) -> List[str]:
+        """Replace a file's vectors in Qdrant (blocking); its chunk count may have changed"""
         try:
+            replaced = self.qdrant_manager.delete_vectors_by_file_id(file_id)
+            if replaced:
+                logger.info(f"Removed {replaced} previous vectors for file {file_id}")
+            
             vectors = [emb.embedding for emb in embeddings]
             payloads = [emb.metadata for emb in embeddings]
             
-            # Generate vector IDs
-            vector_ids = [str(uuid.uuid4()) for _ in embeddings]
-            
-            # Store in Qdrant
+            # Store in Qdrant (IDs are derived from file_id and chunk_index, so re-processing is idempotent).
+            # Waiting keeps cached searches from being refilled before the new points are visible
             stored_ids = self.qdrant_manager.add_vectors(
                 vectors=vectors,
                 payloads=payloads,
-                doc_ids=vector_ids
+                wait=True
             )
             
             return stored_ids
@@ -163,12 +186,12 @@ class VectorProcessingService:
             logger.error(f"Error storing vectors in Qdrant: {str(e)}")
             raise Exception(f"Failed to store vectors: {str(e)}")
     
-    async def _store_vector_metadata(self, 
-                                   file_id: str, 
-                                   filename: str, 
-                                   metadata: Optional[Dict], 
-                                   vector_ids: List[str]) -> Dict[str, Any]:
-        """Store vector processing metadata in database"""
+    def record_processing(self, 
+                          file_id: str, 
+                          filename: str, 
+                          metadata: Optional[Dict], 
+                          vector_ids: List[str]) -> Dict[str, Any]:
+        """Store vector processing metadata and mark the document processed (blocking)"""
         try:
             metadata_record = {
                 "file_id": file_id,
@@ -176,14 +199,18 @@ class VectorProcessingService:
                 "processing_date": datetime.utcnow().isoformat(),
                 "vector_count": len(vector_ids),
                 "vector_ids": vector_ids,
-                "processing_method": "jina_embeddings_v3",
-                "vector_size": 1024,
+                "processing_method": f"{self.embedding_service.backend}:{self.embedding_service.model}",
+                "vector_size": self.embedding_service.vector_size,
                 "collection_name": self.qdrant_manager.collection_name,
                 "additional_metadata": metadata or {}
             }
             
             # Store metadata in database
             self.db_manager.store_vector_processing_metadata(file_id, metadata_record)
+            self.db_manager.update_document_status(file_id, "processed", metadata_record)
+            self.db_manager.log_processing_operation(
+                file_id, "process", "success", {"vector_count": len(vector_ids)}
+            )
             
             return metadata_record
             
@@ -191,10 +218,11 @@ class VectorProcessingService:
             logger.error(f"Error storing vector metadata: {str(e)}")
             raise Exception(f"Failed to store vector metadata: {str(e)}")
     
-    async def _update_document_status(self, file_id: str, status: str, metadata: Dict[str, Any]):
-        """Update document processing status"""
+    def mark_failed(self, file_id: str, error: str):
+        """Record a processing failure on the document (blocking)"""
         try:
-            self.db_manager.update_document_status(file_id, status, metadata)
+            self.db_manager.update_document_status(file_id, "failed", {"error": error})
+            self.db_manager.log_processing_operation(file_id, "process", "failed", error_message=error)
         except Exception as e:
             logger.error(f"Error updating document status: {str(e)}")
     
@@ -214,29 +242,44 @@ class VectorProcessingService:
             List of similar documents with scores
         """
         try:
-            # Generate query embedding
-            query_embedding = self.embedding_service.generate_single_embedding(
-                query_text, 
-                task="retrieval.query"
+            # Generate query embedding (repeated queries skip the embedder)
+            model_key = f"{self.embedding_service.backend}:{self.embedding_service.model}"
+            query_vector = self.query_cache.get_embedding(model_key, query_text)
+            if query_vector is None:
+                query_embedding = await self.embedding_service.agenerate_single_embedding(
+                    query_text, 
+                    task="retrieval.query"
+                )
+                query_vector = query_embedding.embedding
+                self.query_cache.put_embedding(model_key, query_text, query_vector)
+            
+            # Serve identical searches from the result cache until the collection changes
+            cache_key = self.query_cache.result_key(
+                query_vector, limit, score_threshold, self.qdrant_manager.collection_version
             )
+            cached = self.query_cache.get_results(cache_key)
+            if cached is not None:
+                return cached
             
             # Search in Qdrant
             search_results = self.qdrant_manager.search_vectors(
-                query_vector=query_embedding.embedding,
+                query_vector=query_vector,
                 limit=limit,
                 score_threshold=score_threshold
             )
             
             # Enrich results with file information
+            file_infos = self.db_manager.get_uploaded_files(
+                [result["payload"]["file_id"] for result in search_results if result["payload"].get("file_id")]
+            )
             enriched_results = []
             for result in search_results:
-                file_id = result["payload"].get("file_id")
-                if file_id:
-                    file_info = self.db_manager.get_uploaded_file(file_id)
-                    if file_info:
-                        result["file_info"] = file_info
+                file_info = file_infos.get(result["payload"].get("file_id"))
+                if file_info:
+                    result["file_info"] = file_info
                 enriched_results.append(result)
             
+            self.query_cache.put_results(cache_key, enriched_results)
             return enriched_results
             
         except Exception as e:
@@ -257,17 +300,14 @@ class VectorProcessingService:
     async def delete_document_vectors(self, file_id: str) -> int:
         """Delete all vectors for a specific document"""
         try:
-            # Get vector metadata to find vector IDs
-            metadata = self.db_manager.get_vector_metadata(file_id)
-            if metadata and "vector_ids" in metadata:
-                vector_ids = metadata["vector_ids"]
-                deleted_count = self.qdrant_manager.delete_vectors(vector_ids)
-                
+            # Delete by file_id server-side so no points are left behind
+            deleted_count = self.qdrant_manager.delete_vectors_by_file_id(file_id)
+            
+            if deleted_count:
                 # Update database
                 self.db_manager.update_document_status(file_id, "deleted", {"vectors_deleted": deleted_count})
-                
-                return deleted_count
-            return 0
+            
+            return deleted_count
             
         except Exception as e:
             logger.error(f"Error deleting document vectors: {str(e)}")
@@ -276,16 +316,13 @@ class VectorProcessingService:
     async def get_processing_stats(self) -> Dict[str, Any]:
         """Get vector processing statistics"""
         try:
-            # Get collection info from Qdrant
-            collection_info = self.qdrant_manager.get_collection_info()
-            
-            # Get processing stats from database
-            stats = self.db_manager.get_vector_processing_stats()
+            # Counters and cached collection info; neither scans the database per call
+            stats = await asyncio.to_thread(self.stats.get_stats)
             
             return {
-                "collection_info": collection_info,
-                "processing_stats": stats,
-                "timestamp": datetime.utcnow().isoformat()
+                **stats,
+                "embedding_cache": await asyncio.to_thread(self.embedding_service.cache.get_stats),
+                "query_cache": self.query_cache.get_stats()
             }
             
         except Exception as e:
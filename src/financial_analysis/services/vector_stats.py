@@ -0,0 +1,67 @@
+"""
+VectorStatsService - Cheap vector processing statistics for dashboards
+Combines the database's incrementally maintained per-status counters with a
+short-lived cache of the Qdrant collection info, so frequent polling costs
+neither a table scan nor a Qdrant round trip per request
+"""
+
+import os
+import time
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from .vector_database import QdrantManager
+from ..storage.database_manager import db_manager
+
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStatsService:
+    """Vector stats with a TTL cache over Qdrant collection info"""
+
+    def __init__(self, qdrant_manager: QdrantManager, collection_ttl_seconds: float = None):
+        """
+        Initialize the stats service
+
+        Args:
+            qdrant_manager: Manager for the collection being reported
+            collection_ttl_seconds: How long collection info is reused
+        """
+        self.qdrant_manager = qdrant_manager
+        self.collection_ttl_seconds = (
+            collection_ttl_seconds if collection_ttl_seconds is not None
+            else float(os.getenv("VECTOR_STATS_COLLECTION_TTL", "10"))
+        )
+        self._collection_info: Optional[Dict[str, Any]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_collection_info(self) -> Dict[str, Any]:
+        """Qdrant collection info, refreshed at most once per TTL (blocking)"""
+        with self._lock:
+            if self._collection_info is not None and time.monotonic() - self._fetched_at < self.collection_ttl_seconds:
+                return self._collection_info
+
+            try:
+                self._collection_info = self.qdrant_manager.get_collection_info()
+                self._fetched_at = time.monotonic()
+            except Exception as e:
+                if self._collection_info is None:
+                    raise
+                # Serve the last known info rather than failing the dashboard
+                logger.warning(f"Using cached collection info, Qdrant unavailable: {e}")
+            return self._collection_info
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Processing counters plus collection info (blocking)"""
+        processing_stats = db_manager.get_vector_processing_stats()
+        return {
+            "total_files": processing_stats["total_files"],
+            "total_vectors": processing_stats["total_vectors"],
+            "collection_info": self.get_collection_info(),
+            "processing_stats": processing_stats,
+            "timestamp": datetime.utcnow().isoformat()
+        }
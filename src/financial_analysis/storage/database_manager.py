@@ -5,18 +5,91 @@ Handles document persistence and retrieval
 
 import os
 import json
+import time
+import base64
+import threading
 from datetime import datetime
 from typing import Dict, List, Optional, Any
-from sqlalchemy import create_engine, Column, String, DateTime, Text, JSON, Integer, func
+from sqlalchemy import create_engine, event, Column, String, DateTime, Text, JSON, Integer, Index, func, and_, or_
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.dialects.sqlite import JSON as SQLiteJSON
 import uuid
 from pathlib import Path
 
-# Database configuration
-DATABASE_URL = "sqlite:///./data/financial_reports.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+from .log_sink import LogSink
+
+# Database configuration (SQLite by default; any SQLAlchemy URL such as postgresql+psycopg2://... works)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/financial_reports.db")
+
+# Connection pool (shared by API handlers, background workers and the ingest pipeline)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite tuning applied to every new connection
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+
+# Vector stats counters are re-seeded from the database at this interval (covers writes by other processes)
+VECTOR_STATS_RESYNC_SECONDS = int(os.getenv("VECTOR_STATS_RESYNC_SECONDS", "300"))
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the single writer; busy_timeout makes writers wait instead of failing"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def build_engine(database_url: str = DATABASE_URL):
+    """
+    Create the SQLAlchemy engine for a database URL
+
+    Args:
+        database_url: SQLAlchemy URL
+
+    Returns:
+        Engine with a thread-safe connection pool (plus pragmas for SQLite)
+    """
+    url = make_url(database_url)
+
+    if url.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+
+    connect_args = {"check_same_thread": False}
+    if url.database in (None, "", ":memory:"):
+        # In-memory databases live in a single connection
+        sqlite_engine = create_engine(url, connect_args=connect_args)
+    else:
+        Path(url.database).parent.mkdir(parents=True, exist_ok=True)
+        sqlite_engine = create_engine(
+            url,
+            connect_args=connect_args,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT
+        )
+    event.listen(sqlite_engine, "connect", _set_sqlite_pragmas)
+    return sqlite_engine
+
+
+engine = build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -37,11 +110,15 @@ class UploadedDocument(Base):
     extracted_data = Column(SQLiteJSON, nullable=True)
     file_metadata = Column(SQLiteJSON, nullable=True)  # Renamed from metadata
 
+    __table_args__ = (
+        Index("ix_uploaded_documents_uploaded_at_id", "uploaded_at", "id"),
+    )
+
 class GeneratedReport(Base):
     __tablename__ = "generated_reports"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    document_id = Column(String, nullable=False)  # Foreign key to uploaded_documents
+    document_id = Column(String, nullable=False, index=True)  # Foreign key to uploaded_documents
     report_type = Column(String, nullable=False)
     generated_at = Column(DateTime, default=datetime.utcnow)
     status = Column(String, default="generated")
@@ -55,12 +132,16 @@ class GeneratedReport(Base):
     generation_params = Column(SQLiteJSON, nullable=True)
     model_used = Column(String, nullable=True)
 
+    __table_args__ = (
+        Index("ix_generated_reports_generated_at_id", "generated_at", "id"),
+    )
+
 class ChatHistory(Base):
     __tablename__ = "chat_history"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     session_id = Column(String, nullable=False)
-    document_id = Column(String, nullable=True)  # Can be null for general queries
+    document_id = Column(String, nullable=True, index=True)  # Can be null for general queries
     user_message = Column(Text, nullable=False)
     bot_response = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
@@ -69,13 +150,17 @@ class ChatHistory(Base):
     context_documents = Column(SQLiteJSON, nullable=True)  # List of document IDs used
     chat_metadata = Column(SQLiteJSON, nullable=True)  # Renamed from metadata to avoid conflict
 
+    __table_args__ = (
+        Index("ix_chat_history_session_timestamp_id", "session_id", "timestamp", "id"),
+    )
+
 class VectorMetadata(Base):
     __tablename__ = "vector_metadata"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    file_id = Column(String, nullable=False)  # Foreign key to uploaded_documents
+    file_id = Column(String, nullable=False, index=True)  # Foreign key to uploaded_documents
     filename = Column(String, nullable=False)
-    processing_date = Column(DateTime, default=datetime.utcnow)
+    processing_date = Column(DateTime, default=datetime.utcnow, index=True)
     status = Column(String, default="processing")  # processing, completed, failed
     
     # Vector information
@@ -95,21 +180,96 @@ class ProcessingLog(Base):
     __tablename__ = "processing_log"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    file_id = Column(String, nullable=False)
+    file_id = Column(String, nullable=False, index=True)
     operation = Column(String, nullable=False)  # upload, process, search, delete
     status = Column(String, nullable=False)  # success, failed
     timestamp = Column(DateTime, default=datetime.utcnow)
     details = Column(SQLiteJSON, nullable=True)
     error_message = Column(Text, nullable=True)
 
+class ReportCacheEntry(Base):
+    __tablename__ = "report_cache"
+
+    cache_key = Column(String, primary_key=True)  # sha256 of workbook, indicators, model and prompt version
+    report_text = Column(Text, nullable=False)
+    tables = Column(SQLiteJSON, nullable=True)
+    model_used = Column(String, nullable=True)
+    prompt_version = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed = Column(DateTime, default=datetime.utcnow, index=True)
+    hit_count = Column(Integer, default=0)
+
+# Keyset pagination
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort_value: datetime, row_id: str) -> str:
+    """Opaque cursor for the last row of a page"""
+    raw = json.dumps([sort_value.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """
+    Decode a cursor from encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(sort_value), str(row_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
 # Database operations
 class DatabaseManager:
+    # Listing projections (no JSON blobs)
+    _FILE_LIST_COLUMNS = (
+        UploadedDocument.id,
+        UploadedDocument.original_filename,
+        UploadedDocument.uploaded_at,
+        UploadedDocument.status,
+        UploadedDocument.file_size
+    )
+
+    _REPORT_LIST_COLUMNS = (
+        GeneratedReport.id,
+        GeneratedReport.document_id,
+        GeneratedReport.generated_at,
+        GeneratedReport.status,
+        GeneratedReport.report_type
+    )
+
+    _CHAT_LIST_COLUMNS = (
+        ChatHistory.id,
+        ChatHistory.user_message,
+        ChatHistory.bot_response,
+        ChatHistory.timestamp,
+        ChatHistory.document_id,
+        ChatHistory.context_documents
+    )
+
     def __init__(self):
         self.engine = engine
         self.SessionLocal = SessionLocal
+
+        # Vector metadata counters per status, seeded by one GROUP BY and kept current on writes
+        self._vector_counts: Optional[Dict[str, Dict[str, int]]] = None
+        self._vector_counts_synced_at = 0.0
+        self._vector_writes = 0
+        self._recent_vector_rows: Optional[tuple] = None  # (limit, rows)
+        self._vector_stats_lock = threading.Lock()
+
         self.ensure_data_directory()
         self.create_tables()
 
+        # Processing log rows are buffered and batch-inserted off the request path
+        self.log_sink_enabled = os.getenv("LOG_SINK_ENABLED", "true").lower() == "true"
+        self.log_sink = LogSink(self.engine, ProcessingLog.__table__)
+
     def ensure_data_directory(self):
         """Ensure the data directory exists"""
         data_dir = Path("./data")
@@ -118,6 +278,70 @@ class DatabaseManager:
     def create_tables(self):
         """Create all database tables"""
         Base.metadata.create_all(bind=self.engine)
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """Create indexes added after a table was first created (create_all skips existing tables)"""
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=self.engine, checkfirst=True)
+
+    def _keyset_page(self,
+                     columns: list,
+                     sort_column,
+                     id_column,
+                     filters: list = None,
+                     limit: int = DEFAULT_PAGE_SIZE,
+                     cursor: Optional[str] = None,
+                     descending: bool = True) -> Dict[str, Any]:
+        """
+        Fetch one page of rows ordered by (sort_column, id_column)
+
+        Seeks past the cursor row instead of using OFFSET, so every page costs
+        the same regardless of depth.
+
+        Args:
+            columns: Columns to select (rows come back as named tuples)
+            sort_column: Timestamp column to order by
+            id_column: Primary key used as the tie-breaker
+            filters: Extra filter expressions
+            limit: Page size (capped at MAX_PAGE_SIZE)
+            cursor: next_cursor from the previous page
+            descending: Newest first when True
+
+        Returns:
+            Dictionary with rows and next_cursor (None on the last page)
+        """
+        limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+        with self.get_session() as session:
+            query = session.query(*columns)
+            for condition in filters or []:
+                query = query.filter(condition)
+
+            if cursor:
+                sort_value, row_id = decode_cursor(cursor)
+                if descending:
+                    query = query.filter(or_(sort_column < sort_value,
+                                             and_(sort_column == sort_value, id_column < row_id)))
+                else:
+                    query = query.filter(or_(sort_column > sort_value,
+                                             and_(sort_column == sort_value, id_column > row_id)))
+
+            if descending:
+                query = query.order_by(sort_column.desc(), id_column.desc())
+            else:
+                query = query.order_by(sort_column.asc(), id_column.asc())
+
+            # One extra row tells whether another page exists
+            rows = query.limit(limit + 1).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+        return {"rows": rows, "next_cursor": next_cursor}
 
     def get_session(self) -> Session:
         """Get database session"""
@@ -166,6 +390,14 @@ class DatabaseManager:
                 doc.extracted_data = extracted_data
                 session.commit()
 
+    def merge_document_extracted_data(self, document_id: str, updates: Dict):
+        """Set keys of a document's extracted data, keeping the others"""
+        with self.get_session() as session:
+            doc = session.query(UploadedDocument).filter(UploadedDocument.id == document_id).first()
+            if doc:
+                doc.extracted_data = {**(doc.extracted_data or {}), **updates}
+                session.commit()
+
     # Report operations
     def save_generated_report(self,
                             document_id: str,
@@ -286,6 +518,7 @@ class DatabaseManager:
             session.add(vector_meta)
             session.commit()
             session.refresh(vector_meta)
+            self._adjust_vector_counts(vector_meta.status, 1, vector_meta.vector_count or 0)
             return vector_meta.id
 
     def get_vector_metadata(self, file_id: str) -> Optional[Dict[str, Any]]:
@@ -312,6 +545,94 @@ class DatabaseManager:
                 }
             return None
 
+    def get_documents_overview(self,
+                               file_ids: Optional[List[str]] = None,
+                               limit: Optional[int] = None,
+                               include_extracted: bool = False) -> List[Dict[str, Any]]:
+        """
+        Documents with their latest vector metadata and report count in one query
+
+        Args:
+            file_ids: Only these documents (all documents if None)
+            limit: Maximum number of documents, newest first
+            include_extracted: Also return each document's extracted_data
+
+        Returns:
+            List of document dictionaries, newest first
+        """
+        if file_ids is not None and not file_ids:
+            return []
+
+        with self.get_session() as session:
+            # Latest vector metadata row per file
+            ranked = session.query(
+                VectorMetadata.file_id,
+                VectorMetadata.status,
+                VectorMetadata.processing_date,
+                VectorMetadata.vector_count,
+                func.row_number().over(
+                    partition_by=VectorMetadata.file_id,
+                    order_by=VectorMetadata.processing_date.desc()
+                ).label("rank")
+            )
+            report_counts = session.query(
+                GeneratedReport.document_id,
+                func.count(GeneratedReport.id).label("report_count")
+            )
+            if file_ids is not None:
+                ranked = ranked.filter(VectorMetadata.file_id.in_(file_ids))
+                report_counts = report_counts.filter(GeneratedReport.document_id.in_(file_ids))
+            latest_vectors = ranked.subquery()
+            report_counts = report_counts.group_by(GeneratedReport.document_id).subquery()
+
+            columns = [
+                UploadedDocument.id,
+                UploadedDocument.original_filename,
+                UploadedDocument.file_path,
+                UploadedDocument.uploaded_at,
+                UploadedDocument.status,
+                UploadedDocument.file_size,
+                latest_vectors.c.status.label("vector_status"),
+                latest_vectors.c.processing_date,
+                latest_vectors.c.vector_count,
+                func.coalesce(report_counts.c.report_count, 0).label("report_count")
+            ]
+            if include_extracted:
+                columns.append(UploadedDocument.extracted_data)
+
+            query = session.query(*columns).outerjoin(
+                latest_vectors,
+                and_(latest_vectors.c.file_id == UploadedDocument.id, latest_vectors.c.rank == 1)
+            ).outerjoin(
+                report_counts, report_counts.c.document_id == UploadedDocument.id
+            )
+            if file_ids is not None:
+                query = query.filter(UploadedDocument.id.in_(file_ids))
+            query = query.order_by(UploadedDocument.uploaded_at.desc(), UploadedDocument.id.desc())
+            if limit:
+                query = query.limit(limit)
+            rows = query.all()
+
+        documents = []
+        for row in rows:
+            document = {
+                "file_id": row.id,
+                "filename": row.original_filename,
+                "file_path": row.file_path,
+                "uploaded_at": row.uploaded_at.isoformat(),
+                "status": row.status,
+                "file_size": row.file_size,
+                "vector_processed": row.vector_status is not None,
+                "vector_status": row.vector_status or "not_processed",
+                "processed_at": row.processing_date.isoformat() if row.processing_date else None,
+                "vector_count": row.vector_count or 0,
+                "report_count": row.report_count
+            }
+            if include_extracted:
+                document["extracted_data"] = row.extracted_data
+            documents.append(document)
+        return documents
+
     def get_all_vector_metadata(self) -> List[Dict[str, Any]]:
         """Get all vector metadata records"""
         with self.get_session() as session:
@@ -352,9 +673,12 @@ class DatabaseManager:
                 VectorMetadata.file_id == file_id
             ).all()
             
+            removed = [(meta.status, meta.vector_count or 0) for meta in metadata]
             for meta in metadata:
                 session.delete(meta)
             session.commit()
+            for status, vector_count in removed:
+                self._adjust_vector_counts(status, -1, -vector_count)
             return len(metadata) > 0
 
     # Processing log operations
@@ -364,7 +688,25 @@ class DatabaseManager:
                                status: str, 
                                details: Dict[str, Any] = None, 
                                error_message: str = None) -> str:
-        """Log a processing operation"""
+        """
+        Log a processing operation
+
+        Rows go through the buffered log sink and are written within
+        LOG_SINK_FLUSH_MS; the returned ID is assigned up front.
+        """
+        if self.log_sink_enabled:
+            log_id = str(uuid.uuid4())
+            self.log_sink.write({
+                "id": log_id,
+                "file_id": file_id,
+                "operation": operation,
+                "status": status,
+                "timestamp": datetime.utcnow(),
+                "details": details,
+                "error_message": error_message
+            })
+            return log_id
+
         with self.get_session() as session:
             log_entry = ProcessingLog(
                 file_id=file_id,
@@ -378,8 +720,19 @@ class DatabaseManager:
             session.refresh(log_entry)
             return log_entry.id
 
-    def get_processing_logs(self, file_id: str = None, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get processing logs, optionally filtered by file_id"""
+    def get_processing_logs(self,
+                            file_id: str = None,
+                            limit: int = 100,
+                            flush: bool = False) -> List[Dict[str, Any]]:
+        """
+        Get processing logs, optionally filtered by file_id
+
+        Rows still buffered in the log sink (at most LOG_SINK_FLUSH_MS old)
+        are not included unless flush is set, which waits for them (blocking,
+        up to 1s).
+        """
+        if flush:
+            self.log_sink.flush(timeout=1.0)
         with self.get_session() as session:
             query = session.query(ProcessingLog)
             
@@ -401,75 +754,173 @@ class DatabaseManager:
                 for log in logs
             ]
 
-    def get_vector_processing_stats(self) -> Dict[str, Any]:
-        """Get vector processing statistics"""
+    def _adjust_vector_counts(self, status: str, files: int, vectors: int):
+        """Apply a vector_metadata insert/delete/status change to the cached counters"""
+        with self._vector_stats_lock:
+            self._vector_writes += 1
+            self._recent_vector_rows = None
+            if self._vector_counts is not None:
+                entry = self._vector_counts.setdefault(status, {"files": 0, "vectors": 0})
+                entry["files"] += files
+                entry["vectors"] += vectors
+                if entry["files"] <= 0:
+                    # Match the GROUP BY seed, which has no row for an emptied status
+                    del self._vector_counts[status]
+
+    def get_vector_status_counts(self) -> Dict[str, Dict[str, int]]:
+        """
+        Vector metadata row and vector counts per status
+
+        Served from in-memory counters; the database is only queried (one
+        GROUP BY) to seed them and every VECTOR_STATS_RESYNC_SECONDS.
+
+        Returns:
+            Mapping of status to {"files", "vectors"}
+        """
+        with self._vector_stats_lock:
+            if (self._vector_counts is not None
+                    and time.monotonic() - self._vector_counts_synced_at < VECTOR_STATS_RESYNC_SECONDS):
+                return {status: dict(entry) for status, entry in self._vector_counts.items()}
+            writes_before = self._vector_writes
+
         with self.get_session() as session:
-            total_files = session.query(VectorMetadata).count()
-            completed_files = session.query(VectorMetadata).filter(
-                VectorMetadata.status == "completed"
-            ).count()
-            failed_files = session.query(VectorMetadata).filter(
-                VectorMetadata.status == "failed"
-            ).count()
-            
-            total_vectors = session.query(VectorMetadata).with_entities(
-                func.sum(VectorMetadata.vector_count)
-            ).scalar() or 0
-            
-            recent_processing = session.query(VectorMetadata).order_by(
-                VectorMetadata.processing_date.desc()
-            ).limit(5).all()
-            
-            return {
-                "total_files": total_files,
-                "completed_files": completed_files,
-                "failed_files": failed_files,
-                "total_vectors": total_vectors,
-                "recent_processing": [
-                    {
-                        "filename": meta.filename,
-                        "processing_date": meta.processing_date,
-                        "vector_count": meta.vector_count,
-                        "status": meta.status
-                    }
-                    for meta in recent_processing
-                ]
+            rows = session.query(
+                VectorMetadata.status,
+                func.count(VectorMetadata.id),
+                func.coalesce(func.sum(VectorMetadata.vector_count), 0)
+            ).group_by(VectorMetadata.status).all()
+        counts = {status: {"files": files, "vectors": int(vectors)} for status, files, vectors in rows}
+
+        with self._vector_stats_lock:
+            self._vector_counts = counts
+            # A write that raced the query may be missing from the snapshot; re-seed next time
+            self._vector_counts_synced_at = time.monotonic() if self._vector_writes == writes_before else 0.0
+            return {status: dict(entry) for status, entry in counts.items()}
+
+    def get_recent_vector_processing(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Most recent vector processing runs (cached until the next vector_metadata write)"""
+        with self._vector_stats_lock:
+            if self._recent_vector_rows is not None and self._recent_vector_rows[0] >= limit:
+                return self._recent_vector_rows[1][:limit]
+            writes_before = self._vector_writes
+
+        with self.get_session() as session:
+            rows = session.query(
+                VectorMetadata.filename,
+                VectorMetadata.processing_date,
+                VectorMetadata.vector_count,
+                VectorMetadata.status
+            ).order_by(VectorMetadata.processing_date.desc()).limit(limit).all()
+        recent = [
+            {
+                "filename": row.filename,
+                "processing_date": row.processing_date,
+                "vector_count": row.vector_count,
+                "status": row.status
             }
+            for row in rows
+        ]
 
-    def cleanup_old_files(self, days_old: int = 30):
-        """Clean up old documents and reports (utility function)"""
-        from datetime import timedelta
-        cutoff_date = datetime.utcnow() - timedelta(days=days_old)
+        with self._vector_stats_lock:
+            if self._vector_writes == writes_before:
+                self._recent_vector_rows = (limit, recent)
+        return recent
+
+    def get_vector_processing_stats(self) -> Dict[str, Any]:
+        """Get vector processing statistics"""
+        counts = self.get_vector_status_counts()
+
+        return {
+            "total_files": sum(entry["files"] for entry in counts.values()),
+            "completed_files": counts.get("completed", {}).get("files", 0),
+            "failed_files": counts.get("failed", {}).get("files", 0),
+            "total_vectors": sum(entry["vectors"] for entry in counts.values()),
+            "by_status": counts,
+            "recent_processing": self.get_recent_vector_processing()
+        }
+
+    def cleanup_old_files(self, days_old: int = 30) -> Dict[str, Any]:
+        """
+        Clean up old documents and reports with their blobs and vectors
+
+        Delegates to the batched, resumable retention engine.
+
+        Returns:
+            Retention run report (counts and throughput)
+        """
+        from ..services.retention import get_retention_engine
+        return get_retention_engine().run(days_old=days_old)
+
+    def get_expired_documents_page(self,
+                                   cutoff_date: datetime,
+                                   limit: int,
+                                   cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Documents uploaded before cutoff_date, oldest first (id and file_path only)"""
+        page = self._keyset_page(
+            (UploadedDocument.id, UploadedDocument.file_path, UploadedDocument.uploaded_at),
+            UploadedDocument.uploaded_at, UploadedDocument.id,
+            filters=[UploadedDocument.uploaded_at < cutoff_date],
+            limit=limit, cursor=cursor, descending=False
+        )
+        return {"documents": [(row.id, row.file_path) for row in page["rows"]], "next_cursor": page["next_cursor"]}
+
+    def purge_documents(self, file_ids: List[str]) -> int:
+        """
+        Delete documents and their vector metadata in one transaction
+
+        Args:
+            file_ids: Documents to delete
+
+        Returns:
+            Number of documents deleted
+        """
+        if not file_ids:
+            return 0
 
         with self.get_session() as session:
-            # Clean up old documents
-            old_docs = session.query(UploadedDocument).filter(
-                UploadedDocument.uploaded_at < cutoff_date
-            ).all()
+            removed = session.query(
+                VectorMetadata.status,
+                func.count(VectorMetadata.id),
+                func.coalesce(func.sum(VectorMetadata.vector_count), 0)
+            ).filter(VectorMetadata.file_id.in_(file_ids)).group_by(VectorMetadata.status).all()
 
-            for doc in old_docs:
-                # Remove physical file if it exists
-                if os.path.exists(doc.file_path):
-                    os.remove(doc.file_path)
+            session.query(VectorMetadata).filter(
+                VectorMetadata.file_id.in_(file_ids)
+            ).delete(synchronize_session=False)
+            deleted = session.query(UploadedDocument).filter(
+                UploadedDocument.id.in_(file_ids)
+            ).delete(synchronize_session=False)
+            session.commit()
 
-                # Remove from database
-                session.delete(doc)
+        for status, files, vectors in removed:
+            self._adjust_vector_counts(status, -files, -int(vectors))
+        return deleted
 
-            # Clean up old reports
-            old_reports = session.query(GeneratedReport).filter(
+    def purge_reports_before(self, cutoff_date: datetime, limit: int) -> int:
+        """Delete up to limit of the oldest reports generated before cutoff_date"""
+        with self.get_session() as session:
+            expired_ids = session.query(GeneratedReport.id).filter(
                 GeneratedReport.generated_at < cutoff_date
-            ).all()
-
-            for report in old_reports:
-                session.delete(report)
+            ).order_by(GeneratedReport.generated_at.asc()).limit(limit).scalar_subquery()
 
+            deleted = session.query(GeneratedReport).filter(
+                GeneratedReport.id.in_(expired_ids)
+            ).delete(synchronize_session=False)
             session.commit()
+            return deleted
 
     # Convenience methods for API compatibility
-    def store_uploaded_file(self, file_id: str, filename: str, file_path: str):
+    def store_uploaded_file(self,
+                            file_id: str,
+                            filename: str,
+                            file_path: str,
+                            file_size: int = None,
+                            content_type: str = None,
+                            metadata: Dict = None):
         """Store uploaded file (compatibility method)"""
         # Get file size
-        file_size = os.path.getsize(file_path) if os.path.exists(file_path) else None
+        if file_size is None:
+            file_size = os.path.getsize(file_path) if os.path.exists(file_path) else None
 
         # Create document record
         with self.get_session() as session:
@@ -479,7 +930,8 @@ class DatabaseManager:
                 original_filename=filename,
                 file_path=file_path,
                 file_size=file_size,
-                content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                content_type=content_type or "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                file_metadata=metadata
             )
             session.add(doc)
             session.commit()
@@ -498,6 +950,42 @@ class DatabaseManager:
             }
         return None
 
+    def get_uploaded_files(self, file_ids: List[str]) -> Dict[str, Dict]:
+        """Bulk get_uploaded_file: file info keyed by ID for the files that exist"""
+        if not file_ids:
+            return {}
+        with self.get_session() as session:
+            rows = session.query(
+                UploadedDocument.id,
+                UploadedDocument.filename,
+                UploadedDocument.file_path,
+                UploadedDocument.uploaded_at,
+                UploadedDocument.status,
+                UploadedDocument.file_size
+            ).filter(UploadedDocument.id.in_(set(file_ids))).all()
+        return {
+            row.id: {
+                "file_id": row.id,
+                "filename": row.filename,
+                "file_path": row.file_path,
+                "uploaded_at": row.uploaded_at,
+                "status": row.status,
+                "file_size": row.file_size
+            }
+            for row in rows
+        }
+
+    def get_database_stats(self) -> Dict[str, int]:
+        """Row counts for documents, reports and chat history in one query"""
+        with self.get_session() as session:
+            row = session.query(
+                session.query(func.count(UploadedDocument.id)).scalar_subquery().label("uploaded_documents"),
+                session.query(func.count(GeneratedReport.id)).scalar_subquery().label("generated_reports"),
+                session.query(func.count(ChatHistory.id)).scalar_subquery().label("total_chat_messages"),
+                session.query(func.count(ChatHistory.session_id.distinct())).scalar_subquery().label("unique_chat_sessions")
+            ).one()
+        return dict(row._mapping)
+
     def store_generated_report(self, report_id: str, file_id: str, summary: str, tables: Dict, custom_params: Dict = None):
         """Store generated report (compatibility method)"""
         return self.save_generated_report(
@@ -524,31 +1012,115 @@ class DatabaseManager:
 
     def list_uploaded_files(self) -> List[Dict]:
         """List all uploaded files (compatibility method)"""
-        docs = self.get_all_uploaded_documents()
-        return [
-            {
-                "file_id": doc.id,
-                "filename": doc.original_filename,
-                "uploaded_at": doc.uploaded_at.isoformat(),
-                "status": doc.status,
-                "file_size": doc.file_size
-            }
-            for doc in docs
-        ]
+        with self.get_session() as session:
+            rows = session.query(*self._FILE_LIST_COLUMNS).order_by(
+                UploadedDocument.uploaded_at.desc()
+            ).all()
+        return [self._file_row_to_dict(row) for row in rows]
+
+    def list_uploaded_files_page(self, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        List uploaded files newest first, one page at a time
+
+        Args:
+            limit: Page size
+            cursor: next_cursor from the previous page
+
+        Returns:
+            Dictionary with files and next_cursor
+        """
+        page = self._keyset_page(
+            self._FILE_LIST_COLUMNS, UploadedDocument.uploaded_at, UploadedDocument.id,
+            limit=limit, cursor=cursor
+        )
+        return {"files": [self._file_row_to_dict(row) for row in page["rows"]], "next_cursor": page["next_cursor"]}
 
     def list_generated_reports(self) -> List[Dict]:
         """List all generated reports (compatibility method)"""
-        reports = self.get_all_generated_reports()
-        return [
-            {
-                "report_id": report.id,
-                "file_id": report.document_id,
-                "generated_at": report.generated_at.isoformat(),
-                "status": report.status,
-                "report_type": report.report_type
-            }
-            for report in reports
-        ]
+        with self.get_session() as session:
+            rows = session.query(*self._REPORT_LIST_COLUMNS).order_by(
+                GeneratedReport.generated_at.desc()
+            ).all()
+        return [self._report_row_to_dict(row) for row in rows]
+
+    def list_generated_reports_page(self,
+                                    limit: int = DEFAULT_PAGE_SIZE,
+                                    cursor: Optional[str] = None,
+                                    file_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        List generated reports newest first, one page at a time
+
+        Args:
+            limit: Page size
+            cursor: next_cursor from the previous page
+            file_id: Only reports for this file
+
+        Returns:
+            Dictionary with reports and next_cursor
+        """
+        filters = [GeneratedReport.document_id == file_id] if file_id else None
+        page = self._keyset_page(
+            self._REPORT_LIST_COLUMNS, GeneratedReport.generated_at, GeneratedReport.id,
+            filters=filters, limit=limit, cursor=cursor
+        )
+        return {"reports": [self._report_row_to_dict(row) for row in page["rows"]], "next_cursor": page["next_cursor"]}
+
+    def get_chat_history_page(self,
+                              session_id: str,
+                              limit: int = DEFAULT_PAGE_SIZE,
+                              cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get a session's chat history one page at a time, paging back from the latest message
+
+        The first page holds the most recent messages; next_cursor fetches the
+        ones before them. Messages within a page are oldest first, ready to render.
+
+        Args:
+            session_id: Chat session ID
+            limit: Page size
+            cursor: next_cursor from the previous (newer) page
+
+        Returns:
+            Dictionary with messages and next_cursor (None once the start of the session is reached)
+        """
+        page = self._keyset_page(
+            self._CHAT_LIST_COLUMNS, ChatHistory.timestamp, ChatHistory.id,
+            filters=[ChatHistory.session_id == session_id],
+            limit=limit, cursor=cursor, descending=True
+        )
+        messages = [self._chat_row_to_dict(row) for row in reversed(page["rows"])]
+        return {"messages": messages, "next_cursor": page["next_cursor"]}
+
+    @staticmethod
+    def _file_row_to_dict(row) -> Dict[str, Any]:
+        return {
+            "file_id": row.id,
+            "filename": row.original_filename,
+            "uploaded_at": row.uploaded_at.isoformat(),
+            "status": row.status,
+            "file_size": row.file_size
+        }
+
+    @staticmethod
+    def _report_row_to_dict(row) -> Dict[str, Any]:
+        return {
+            "report_id": row.id,
+            "file_id": row.document_id,
+            "generated_at": row.generated_at.isoformat(),
+            "status": row.status,
+            "report_type": row.report_type
+        }
+
+    @staticmethod
+    def _chat_row_to_dict(row) -> Dict[str, Any]:
+        return {
+            "message_id": row.id,
+            "user_message": row.user_message,
+            "bot_response": row.bot_response,
+            "timestamp": row.timestamp.isoformat(),
+            "document_id": row.document_id,
+            "context_documents": row.context_documents
+        }
 
     def delete_uploaded_file(self, file_id: str):
         """Delete uploaded file (compatibility method)"""
@@ -1,10 +1,108 @@
 import os
+import asyncio
+import hashlib
+import logging
 from google.cloud import storage
 from google.oauth2 import service_account
-from typing import Optional, BinaryIO
+from google.api_core.exceptions import NotModified
+from typing import Optional, BinaryIO, Tuple
 import io
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+# Resumable upload chunk size; GCS requires a multiple of 256 KB
+DEFAULT_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class GCSUploadStream:
+    """Writable stream that sends chunks to GCS through a resumable upload session."""
+
+    def __init__(self, blob, blob_name: str, content_type: str = None):
+        self.blob_name = blob_name
+        self.bytes_written = 0
+        self._writer = blob.open("wb", content_type=content_type, ignore_flush=True)
+
+    def write(self, chunk: bytes):
+        """Write a chunk; full chunks are flushed to GCS as they fill up."""
+        try:
+            self._writer.write(chunk)
+            self.bytes_written += len(chunk)
+        except Exception as e:
+            raise Exception(f"Failed to stream upload to GCS: {str(e)}")
+
+    def commit(self) -> str:
+        """Finalize the upload and return the blob name."""
+        try:
+            self._writer.close()
+            return self.blob_name
+        except Exception as e:
+            raise Exception(f"Failed to finalize GCS upload: {str(e)}")
+
+    def abort(self):
+        """
+        Abandon the upload and cancel its resumable session.
+
+        Nothing was sent before the first full chunk, so there is no session
+        to cancel. Otherwise the session is deleted (writer.terminate() on
+        newer google-cloud-storage, the same DELETE on the session URL on
+        older ones) instead of lingering server-side until it expires.
+        A failed cancel is logged; the unfinalized session still never
+        becomes an object.
+        """
+        writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        try:
+            if hasattr(writer, "terminate"):
+                writer.terminate()
+            elif writer._upload_and_transport:
+                upload, transport = writer._upload_and_transport
+                transport.delete(upload.upload_url)
+        except Exception as e:
+            logger.warning(f"Could not cancel GCS upload session for {self.blob_name}: {str(e)}")
+
+
+class UploadTooLarge(Exception):
+    """Raised by stream_upload when the source exceeds the size limit"""
+
+
+async def stream_upload(source, storage_client, blob_name: str, content_type: str,
+                        max_size: int, chunk_size: int) -> Tuple[int, str]:
+    """
+    Copy an async-readable source (e.g. an UploadFile) into storage chunk by chunk.
+
+    The size limit is enforced while streaming, so the whole file is never
+    buffered. On any failure, including UploadTooLarge and cancellation, the
+    partial upload is aborted.
+
+    Returns:
+        (size in bytes, SHA-256 hex digest)
+    """
+    upload_stream = await asyncio.to_thread(storage_client.open_upload_stream, blob_name, content_type)
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        while True:
+            chunk = await source.read(chunk_size)
+            if not chunk:
+                break
+
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLarge(f"Upload exceeds {max_size} bytes")
+
+            sha256.update(chunk)
+            await asyncio.to_thread(upload_stream.write, chunk)
+
+        await asyncio.to_thread(upload_stream.commit)
+    except BaseException:
+        # Cancelling a GCS session is a network call
+        await asyncio.to_thread(upload_stream.abort)
+        raise
+    return size, sha256.hexdigest()
+
+
 class GCSClient:
     def __init__(self, credentials_path: str = None, bucket_name: str = None):
         # Always use Docker path since we're container-only
@@ -12,6 +110,7 @@ class GCSClient:
             credentials_path = "/app/gcs-credentials.json"
         self.credentials_path = credentials_path
         self.bucket_name = bucket_name or os.getenv("GCS_BUCKET_NAME", "tum-gen-ai-storage")
+        self.upload_chunk_size = int(os.getenv("GCS_UPLOAD_CHUNK_SIZE", str(DEFAULT_UPLOAD_CHUNK_SIZE)))
         self.client = None
         self.bucket = None
         self._initialize_client()
@@ -39,6 +138,18 @@ class GCSClient:
         except Exception as e:
             raise Exception(f"Failed to upload file to GCS: {str(e)}")
     
+    def open_upload_stream(self, destination_blob_name: str, content_type: str = None) -> GCSUploadStream:
+        """Open a streaming resumable upload so callers never buffer the whole file."""
+        try:
+            # Normalize blob name to prevent duplication
+            from .gcs_path_utils import GCSPathManager
+            clean_blob_name = GCSPathManager.normalize_blob_name(destination_blob_name)
+            
+            blob = self.bucket.blob(clean_blob_name, chunk_size=self.upload_chunk_size)
+            return GCSUploadStream(blob, clean_blob_name, content_type=content_type)
+        except Exception as e:
+            raise Exception(f"Failed to open GCS upload stream: {str(e)}")
+    
     def upload_file_from_path(self, file_path: str, destination_blob_name: str, content_type: str = None) -> str:
         """Upload a file from local path to GCS and return the blob name."""
         try:
@@ -64,6 +175,29 @@ class GCSClient:
         except Exception as e:
             raise Exception(f"Failed to download file from GCS: {str(e)}")
     
+    def download_file_if_modified(self, blob_name: str, generation: Optional[int] = None) -> Tuple[Optional[bytes], Optional[int]]:
+        """
+        Download a file unless its generation still matches.
+
+        Returns:
+            (content, generation); content is None when the stored object is
+            still at the given generation (HTTP 304, no body transferred).
+        """
+        try:
+            from .gcs_path_utils import GCSPathManager
+            clean_blob_name = GCSPathManager.normalize_blob_name(blob_name)
+
+            blob = self.bucket.blob(clean_blob_name)
+            if generation is None:
+                content = blob.download_as_bytes()
+            else:
+                content = blob.download_as_bytes(if_generation_not_match=generation)
+            return content, blob.generation
+        except NotModified:
+            return None, generation
+        except Exception as e:
+            raise Exception(f"Failed to download file from GCS: {str(e)}")
+    
     def download_file_to_path(self, blob_name: str, destination_path: str):
         """Download a file from GCS to a local path."""
         try:
@@ -1,9 +1,38 @@
 import os
 import shutil
 from pathlib import Path
-from typing import Optional, BinaryIO
+from typing import Optional, BinaryIO, Tuple
 import tempfile
 
+
+class LocalUploadStream:
+    """Writable stream into local storage; the file only appears once committed."""
+
+    def __init__(self, file_path: Path, blob_name: str):
+        self.blob_name = blob_name
+        self.bytes_written = 0
+        self._final_path = file_path
+        self._part_path = file_path.with_name(file_path.name + ".part")
+        self._file = open(self._part_path, 'wb')
+
+    def write(self, chunk: bytes):
+        """Append a chunk to the partial file."""
+        self._file.write(chunk)
+        self.bytes_written += len(chunk)
+
+    def commit(self) -> str:
+        """Close the partial file and move it into place."""
+        self._file.close()
+        os.replace(self._part_path, self._final_path)
+        return self.blob_name
+
+    def abort(self):
+        """Discard the partial file."""
+        self._file.close()
+        if self._part_path.exists():
+            self._part_path.unlink()
+
+
 class LocalStorageClient:
     """Local file storage client for development/testing when GCS is not available."""
     
@@ -21,12 +50,21 @@ class LocalStorageClient:
             file_path.parent.mkdir(parents=True, exist_ok=True)
             
             with open(file_path, 'wb') as f:
-                f.write(file_data.read())
+                shutil.copyfileobj(file_data, f)
             
             return str(destination_blob_name)
         except Exception as e:
             raise Exception(f"Failed to upload file to local storage: {str(e)}")
     
+    def open_upload_stream(self, destination_blob_name: str, content_type: str = None) -> LocalUploadStream:
+        """Open a streaming upload to local storage."""
+        try:
+            file_path = self.base_path / destination_blob_name
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            return LocalUploadStream(file_path, str(destination_blob_name))
+        except Exception as e:
+            raise Exception(f"Failed to open local upload stream: {str(e)}")
+    
     def download_file(self, blob_name: str) -> bytes:
         """Download a file from local storage."""
         try:
@@ -39,6 +77,30 @@ class LocalStorageClient:
         except Exception as e:
             raise Exception(f"Failed to download file from local storage: {str(e)}")
     
+    def download_file_if_modified(self, blob_name: str, generation: Optional[int] = None) -> Tuple[Optional[bytes], Optional[int]]:
+        """
+        Download a file unless it is unchanged since the given generation.
+
+        The file's modification time in nanoseconds stands in for the GCS
+        object generation.
+
+        Returns:
+            (content, generation); content is None when the file still has the given generation.
+        """
+        try:
+            file_path = self.base_path / blob_name
+            if not file_path.exists():
+                raise FileNotFoundError(f"File {blob_name} not found in local storage")
+            
+            current = file_path.stat().st_mtime_ns
+            if generation is not None and current == generation:
+                return None, generation
+            
+            with open(file_path, 'rb') as f:
+                return f.read(), current
+        except Exception as e:
+            raise Exception(f"Failed to download file from local storage: {str(e)}")
+    
     def delete_file(self, blob_name: str):
         """Delete a file from local storage."""
         try:
@@ -0,0 +1,212 @@
+"""
+Buffered log sink for high-volume audit rows
+Callers enqueue rows in memory; a background thread batch-inserts them
+(executemany) every flush interval or batch size, whichever comes first
+"""
+
+import os
+import time
+import queue
+import atexit
+import threading
+import logging
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import Table
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+
+class _FlushMarker:
+    """Queued behind pending rows; set once everything before it is written"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class LogSink:
+    """Bounded in-memory queue drained into a table by a background writer"""
+
+    def __init__(self,
+                 engine: Engine,
+                 table: Table,
+                 max_queue: int = None,
+                 batch_size: int = None,
+                 flush_interval_ms: int = None):
+        """
+        Initialize the sink
+
+        Args:
+            engine: Engine to write with
+            table: Destination table
+            max_queue: Pending rows kept before new rows are dropped
+            batch_size: Maximum rows per insert
+            flush_interval_ms: Maximum time a row waits before being written
+        """
+        self.engine = engine
+        self.table = table
+        self.max_queue = max_queue or int(os.getenv("LOG_SINK_MAX_QUEUE", "10000"))
+        self.batch_size = batch_size or int(os.getenv("LOG_SINK_BATCH_SIZE", "500"))
+        self.flush_interval = (flush_interval_ms or int(os.getenv("LOG_SINK_FLUSH_MS", "200"))) / 1000
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._atexit_registered = False
+        self._closed = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "batches": 0}
+
+    def start(self):
+        """Start the writer thread, reopening the sink if it was closed"""
+        with self._start_lock:
+            self._closed.clear()
+            self._start_thread()
+
+    def _ensure_running(self) -> bool:
+        """Start or restart the writer for a write; False once the sink is closed"""
+        with self._start_lock:
+            if self._closed.is_set():
+                return False
+            self._start_thread()
+            return True
+
+    def _start_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f"log-sink-{self.table.name}", daemon=True)
+            self._thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close)
+                self._atexit_registered = True
+
+    def write(self, row: Dict[str, Any]) -> bool:
+        """
+        Queue a row without blocking
+
+        Returns:
+            False if the row was dropped (queue full or sink closed)
+        """
+        if self._thread is None or not self._thread.is_alive() or self._closed.is_set():
+            if not self._ensure_running():
+                self._count_drop("closed")
+                return False
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count_drop("full")
+            return False
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until rows queued before this call are written"""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        marker = _FlushMarker()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Write everything still queued and stop the writer thread; later writes are dropped"""
+        with self._start_lock:
+            if self._closed.is_set():
+                return
+            if self._thread is None:
+                self._closed.set()
+                return
+        self.flush(timeout)
+        self._closed.set()
+        try:
+            # Wake an idle writer so it sees the close now, not after a flush interval
+            self._queue.put_nowait(_FlushMarker())
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+        # Rows that raced with shutdown are written here rather than lost
+        if not self._thread.is_alive():
+            leftovers = self._drain()
+            if leftovers:
+                self._write_batch(leftovers)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, written/dropped/failed counts"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            **stats,
+            "pending": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000)
+        }
+
+    def _count_drop(self, reason: str):
+        with self._stats_lock:
+            self._stats["dropped"] += 1
+            dropped = self._stats["dropped"]
+        if dropped == 1 or dropped % 1000 == 0:
+            logger.warning(f"Log sink for {self.table.name} is {reason}; {dropped} rows dropped")
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        """Take everything left in the queue without waiting"""
+        rows = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return rows
+            if isinstance(item, _FlushMarker):
+                item.done.set()
+            else:
+                rows.append(item)
+
+    def _run(self):
+        """Writer loop: gather up to batch_size rows or flush_interval, then insert them"""
+        while not (self._closed.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            rows: List[Dict[str, Any]] = []
+            markers: List[_FlushMarker] = []
+            deadline = time.monotonic() + self.flush_interval
+            item = first
+            while True:
+                if isinstance(item, _FlushMarker):
+                    markers.append(item)
+                    break
+                rows.append(item)
+                if len(rows) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if rows:
+                self._write_batch(rows)
+            for marker in markers:
+                marker.done.set()
+
+    def _write_batch(self, rows: List[Dict[str, Any]]):
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(self.table.insert(), rows)
+            with self._stats_lock:
+                self._stats["written"] += len(rows)
+                self._stats["batches"] += 1
+        except Exception as e:
+            with self._stats_lock:
+                self._stats["failed"] += len(rows)
+            logger.error(f"Log sink failed to write {len(rows)} rows to {self.table.name}: {e}")
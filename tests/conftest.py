@@ -0,0 +1,38 @@
+"""
+Shared test setup
+
+The storage layer creates its SQLite database and ./data directory at import
+time, so the working directory and DATABASE_URL are pointed at a scratch
+directory before anything from financial_analysis is imported.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+_workdir = tempfile.mkdtemp(prefix="financial-analysis-tests-")
+os.chdir(_workdir)
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/data/test.db"
+os.environ.setdefault("LOCAL_STORAGE_PATH", os.path.join(_workdir, "local_storage"))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("REPORT_CACHE_ENABLED", "true")
+
+import pytest
+
+
+@pytest.fixture
+def db():
+    """The shared DatabaseManager with every table emptied"""
+    from financial_analysis.storage.database_manager import db_manager, Base
+
+    db_manager.log_sink.flush()
+    with db_manager.engine.begin() as connection:
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    db_manager._vector_counts = None
+    db_manager._recent_vector_rows = None
+    return db_manager
@@ -0,0 +1,165 @@
+"""Tests for the background analysis job manager (services/analysis_jobs.py)"""
+
+import asyncio
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from financial_analysis.core import financial_analyzer
+from financial_analysis.services import analysis_jobs
+from financial_analysis.services.analysis_jobs import (
+    AnalysisJobManager,
+    JobQueueFull,
+    JOB_CANCELLED,
+    JOB_COMPLETED,
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    FINISHED_STATES,
+)
+from financial_analysis.services.report_cache import ReportCache
+
+from test_report_cache import INDICATORS, REPORT_TEXT
+
+
+class FakeAnalysis:
+    """Stands in for the workbook download and the LLM call"""
+
+    def __init__(self):
+        self.load_gate = threading.Event()
+        self.load_gate.set()
+        self.loading = threading.Event()
+        self.fail_load = False
+        self.llm_started = threading.Event()
+        self.llm_cancelled = threading.Event()
+        self.llm_hangs = False
+
+    def load_analysis_inputs(self, file_id):
+        self.loading.set()
+        assert self.load_gate.wait(5)
+        if self.fail_load:
+            raise FileNotFoundError("File not found")
+        df = pd.DataFrame({"Code": ["111"], "Account": [file_id], "2023": [1.0], "2024": [2.0]})
+        return (df, *INDICATORS)
+
+    async def agenerate_financial_report(self, *args):
+        self.llm_started.set()
+        if self.llm_hangs:
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                self.llm_cancelled.set()
+                raise
+        return REPORT_TEXT
+
+
+@pytest.fixture
+def analysis(db, monkeypatch, tmp_path):
+    fake = FakeAnalysis()
+    monkeypatch.setattr(analysis_jobs, "load_analysis_inputs", fake.load_analysis_inputs)
+    monkeypatch.setattr(analysis_jobs, "agenerate_financial_report", fake.agenerate_financial_report)
+    monkeypatch.setattr(analysis_jobs, "get_report_cache", lambda: ReportCache(ttl_seconds=0, max_entries=10))
+    monkeypatch.setattr(financial_analyzer, "Path", lambda *_: tmp_path / "src" / "core" / "financial_analyzer.py")
+    return fake
+
+
+@pytest.fixture
+def manager():
+    manager = AnalysisJobManager(max_workers=1, max_pending=2)
+    yield manager
+    manager.shutdown(wait=True)
+
+
+def _wait_finished(manager, job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while manager.get_job(job.job_id).status not in FINISHED_STATES:
+        assert time.monotonic() < deadline, f"job stuck in {job.status}"
+        time.sleep(0.01)
+    return manager.get_job(job.job_id)
+
+
+def test_job_runs_to_completion(analysis, manager, db):
+    job = manager.submit("file-1", {"note": "test"})
+    assert job.status in (JOB_QUEUED, JOB_RUNNING)
+
+    job = _wait_finished(manager, job)
+
+    assert job.status == JOB_COMPLETED
+    assert job.progress == 100
+    assert job.started_at and job.finished_at and job.submitted_at <= job.started_at <= job.finished_at
+    assert "balance_sheet" in job.result["tables"]
+    assert job.to_dict()["report_id"] == job.result["report_id"]
+    assert db.get_generated_report_dict(job.result["report_id"])["file_id"] == "file-1"
+
+
+def test_running_job_reports_its_stage(analysis, manager):
+    analysis.load_gate.clear()
+    job = manager.submit("file-1")
+    assert analysis.loading.wait(5)
+
+    assert job.status == JOB_RUNNING
+    assert job.stage == "loading_file"
+    analysis.load_gate.set()
+    assert _wait_finished(manager, job).status == JOB_COMPLETED
+
+
+def test_failed_job_keeps_the_error(analysis, manager):
+    analysis.fail_load = True
+
+    job = _wait_finished(manager, manager.submit("file-1"))
+
+    assert job.status == JOB_FAILED
+    assert job.error == "File not found"
+    assert job.result is None
+
+
+def test_submissions_beyond_max_pending_are_rejected(analysis, manager):
+    analysis.load_gate.clear()
+    running = manager.submit("file-1")
+    queued = manager.submit("file-2")
+
+    with pytest.raises(JobQueueFull):
+        manager.submit("file-3")
+
+    analysis.load_gate.set()
+    _wait_finished(manager, running)
+    _wait_finished(manager, queued)
+    # Finished jobs no longer count against the limit
+    _wait_finished(manager, manager.submit("file-3"))
+    assert manager.get_stats()["jobs"] == {JOB_COMPLETED: 3}
+
+
+def test_cancel_queued_job(analysis, manager):
+    analysis.load_gate.clear()
+    running = manager.submit("file-1")
+    queued = manager.submit("file-2")
+
+    cancelled = manager.cancel(queued.job_id)
+
+    assert cancelled.status == JOB_CANCELLED
+    analysis.load_gate.set()
+    assert _wait_finished(manager, running).status == JOB_COMPLETED
+    assert manager.get_job(queued.job_id).status == JOB_CANCELLED
+
+
+def test_cancel_aborts_report_generation_in_flight(analysis, manager):
+    analysis.llm_hangs = True
+    job = manager.submit("file-1")
+    assert analysis.llm_started.wait(5)
+
+    started = time.monotonic()
+    assert manager.cancel(job.job_id).stage == "cancelling"
+    job = _wait_finished(manager, job)
+
+    assert job.status == JOB_CANCELLED
+    assert analysis.llm_cancelled.is_set()
+    assert time.monotonic() - started < 5
+
+
+def test_cancel_finished_or_unknown_job(analysis, manager):
+    job = _wait_finished(manager, manager.submit("file-1"))
+
+    assert manager.cancel(job.job_id).status == JOB_COMPLETED
+    assert manager.cancel("missing") is None
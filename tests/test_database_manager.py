@@ -0,0 +1,254 @@
+"""Tests for the database engine and aggregate queries (storage/database_manager.py)"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, text
+
+from financial_analysis.storage import database_manager
+from financial_analysis.storage.database_manager import UploadedDocument, VectorMetadata, build_engine
+
+
+def _pragma(engine, name):
+    with engine.connect() as connection:
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_file_engine_applies_pragmas_on_every_connection(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path}/nested/dir/test.db")
+
+    assert (tmp_path / "nested" / "dir").is_dir()
+    assert _pragma(engine, "journal_mode") == "wal"
+    assert _pragma(engine, "synchronous") == 1  # NORMAL
+    assert _pragma(engine, "busy_timeout") == database_manager.SQLITE_BUSY_TIMEOUT_MS
+    assert _pragma(engine, "cache_size") == -database_manager.SQLITE_CACHE_SIZE_KB
+    assert _pragma(engine, "temp_store") == 2  # MEMORY
+    assert engine.pool.size() == database_manager.DB_POOL_SIZE
+
+    # A second pooled connection is configured too
+    with engine.connect() as first, engine.connect() as second:
+        assert first.execute(text("PRAGMA busy_timeout")).scalar() == database_manager.SQLITE_BUSY_TIMEOUT_MS
+        assert second.execute(text("PRAGMA busy_timeout")).scalar() == database_manager.SQLITE_BUSY_TIMEOUT_MS
+    engine.dispose()
+
+
+def test_memory_engine_skips_pool_sizing():
+    engine = build_engine("sqlite://")
+
+    assert _pragma(engine, "busy_timeout") == database_manager.SQLITE_BUSY_TIMEOUT_MS
+    assert _pragma(engine, "journal_mode") == "memory"
+
+
+def test_server_databases_get_a_pre_pinged_pool(monkeypatch):
+    calls = []
+    monkeypatch.setattr(database_manager, "create_engine", lambda url, **kwargs: calls.append((url, kwargs)))
+
+    build_engine("postgresql+psycopg2://user:secret@db/reports")
+
+    (url, kwargs), = calls
+    assert url.get_backend_name() == "postgresql"
+    assert kwargs == {
+        "pool_size": database_manager.DB_POOL_SIZE,
+        "max_overflow": database_manager.DB_MAX_OVERFLOW,
+        "pool_timeout": database_manager.DB_POOL_TIMEOUT,
+        "pool_recycle": database_manager.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def test_shared_engine_uses_wal(db):
+    assert _pragma(db.engine, "journal_mode") == "wal"
+
+
+def _upload(db, file_id, uploaded_at, extracted=None):
+    db.store_uploaded_file(file_id, f"{file_id}.xlsx", f"uploads/{file_id}.xlsx", file_size=100)
+    with db.get_session() as session:
+        document = session.get(UploadedDocument, file_id)
+        document.uploaded_at = uploaded_at
+        document.extracted_data = extracted
+        session.commit()
+
+
+def _vector_run(db, file_id, processed_at, status, vector_count):
+    with db.get_session() as session:
+        session.add(VectorMetadata(file_id=file_id, filename=f"{file_id}.xlsx", processing_date=processed_at,
+                                   status=status, vector_count=vector_count))
+        session.commit()
+
+
+@pytest.fixture
+def documents(db):
+    _upload(db, "old", datetime(2024, 1, 1), extracted={"sheets": ["Sheet1"]})
+    _upload(db, "new", datetime(2024, 3, 1))
+    _upload(db, "mid", datetime(2024, 2, 1))
+    # "old" was re-processed: only the latest run counts
+    _vector_run(db, "old", datetime(2024, 1, 2), "failed", 0)
+    _vector_run(db, "old", datetime(2024, 1, 3), "completed", 12)
+    _vector_run(db, "mid", datetime(2024, 2, 2), "completed", 5)
+    for _ in range(2):
+        db.store_generated_report(None, "old", "summary", {})
+    db.store_generated_report(None, "new", "summary", {})
+    return db
+
+
+def test_overview_joins_latest_vector_run_and_report_count(documents):
+    overview = documents.get_documents_overview()
+
+    assert [doc["file_id"] for doc in overview] == ["new", "mid", "old"]
+    by_id = {doc["file_id"]: doc for doc in overview}
+    assert by_id["old"]["vector_status"] == "completed"
+    assert by_id["old"]["vector_count"] == 12
+    assert by_id["old"]["processed_at"] == datetime(2024, 1, 3).isoformat()
+    assert by_id["old"]["report_count"] == 2
+    assert by_id["new"] == {
+        "file_id": "new",
+        "filename": "new.xlsx",
+        "file_path": "uploads/new.xlsx",
+        "uploaded_at": datetime(2024, 3, 1).isoformat(),
+        "status": "uploaded",
+        "file_size": 100,
+        "vector_processed": False,
+        "vector_status": "not_processed",
+        "processed_at": None,
+        "vector_count": 0,
+        "report_count": 1,
+    }
+    assert by_id["mid"]["report_count"] == 0
+    assert "extracted_data" not in by_id["old"]
+
+
+def test_overview_filters_limits_and_extracted_data(documents):
+    assert [doc["file_id"] for doc in documents.get_documents_overview(limit=2)] == ["new", "mid"]
+    assert documents.get_documents_overview(file_ids=[]) == []
+
+    selected = documents.get_documents_overview(file_ids=["old", "missing"], include_extracted=True)
+
+    assert [doc["file_id"] for doc in selected] == ["old"]
+    assert selected[0]["extracted_data"] == {"sheets": ["Sheet1"]}
+    assert selected[0]["report_count"] == 2
+
+
+def _selects(db, call):
+    """Number of SELECT statements issued by call()"""
+    statements = []
+    listen = lambda *args: statements.append(args[2])
+    event.listen(db.engine, "before_cursor_execute", listen)
+    try:
+        call()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listen)
+    return len([sql for sql in statements if sql.lstrip().upper().startswith("SELECT")])
+
+
+def test_overview_uses_one_query(documents):
+    assert _selects(documents, documents.get_documents_overview) == 1
+
+
+def test_get_uploaded_files_returns_existing_files(documents):
+    files = documents.get_uploaded_files(["mid", "new", "missing", "mid"])
+
+    assert set(files) == {"mid", "new"}
+    assert files["mid"] == documents.get_uploaded_file("mid")
+    assert documents.get_uploaded_files([]) == {}
+
+
+def test_database_stats(documents):
+    documents.save_chat_message("session-1", "hi", "hello")
+    documents.save_chat_message("session-1", "and?", "more")
+    documents.save_chat_message("session-2", "hi", "hello")
+
+    assert documents.get_database_stats() == {
+        "uploaded_documents": 3,
+        "generated_reports": 3,
+        "total_chat_messages": 3,
+        "unique_chat_sessions": 2,
+    }
+    assert _selects(documents, documents.get_database_stats) == 1
+
+
+def test_database_stats_when_empty(db):
+    assert set(db.get_database_stats().values()) == {0}
+
+
+def _database_counts(db):
+    """Vector status counts straight from the database"""
+    db._vector_counts_synced_at = 0.0
+    return db.get_vector_status_counts()
+
+
+def _store_run(db, file_id, vector_count):
+    return db.store_vector_processing_metadata(file_id, {"filename": f"{file_id}.xlsx", "vector_count": vector_count})
+
+
+def test_counters_track_inserts_and_deletes(db):
+    assert db.get_vector_status_counts() == {}
+
+    _store_run(db, "a", 10)
+    _store_run(db, "b", 5)
+    _store_run(db, "a", 7)
+    counters = db.get_vector_status_counts()
+
+    assert counters == {"completed": {"files": 3, "vectors": 22}}
+    assert counters == _database_counts(db)
+
+    assert db.delete_vector_metadata("a")
+    assert not db.delete_vector_metadata("a")
+    assert db.get_vector_status_counts() == {"completed": {"files": 1, "vectors": 5}} == _database_counts(db)
+
+
+def test_counters_track_purges(db):
+    for file_id in ("a", "b", "c"):
+        db.store_uploaded_file(file_id, f"{file_id}.xlsx", f"uploads/{file_id}.xlsx", file_size=1)
+        _store_run(db, file_id, 4)
+    db.get_vector_status_counts()
+
+    assert db.purge_documents(["a", "b"]) == 2
+
+    assert db.get_vector_status_counts() == {"completed": {"files": 1, "vectors": 4}} == _database_counts(db)
+
+
+def test_failed_insert_leaves_counters_unchanged(db):
+    _store_run(db, "a", 3)
+    before = db.get_vector_status_counts()
+
+    with pytest.raises(Exception):
+        _store_run(db, None, 8)
+
+    assert db.get_vector_status_counts() == before == _database_counts(db)
+
+
+def test_failed_runs_are_counted_separately(db):
+    _store_run(db, "a", 3)
+    _vector_run(db, "b", datetime(2024, 1, 1), "failed", 0)
+
+    counts = _database_counts(db)
+    stats = db.get_vector_processing_stats()
+
+    assert counts == {"completed": {"files": 1, "vectors": 3}, "failed": {"files": 1, "vectors": 0}}
+    assert (stats["total_files"], stats["completed_files"], stats["failed_files"], stats["total_vectors"]) == (2, 1, 1, 3)
+
+    assert db.delete_vector_metadata("b")
+    assert db.get_vector_status_counts() == {"completed": {"files": 1, "vectors": 3}} == _database_counts(db)
+
+
+def test_counters_are_served_without_queries_until_resync(db, monkeypatch):
+    _store_run(db, "a", 3)
+    db.get_vector_status_counts()
+    # Written by another process: invisible until the periodic re-seed
+    _vector_run(db, "b", datetime(2024, 1, 1), "completed", 9)
+
+    assert _selects(db, db.get_vector_status_counts) == 0
+    assert db.get_vector_status_counts() == {"completed": {"files": 1, "vectors": 3}}
+
+    monkeypatch.setattr(database_manager, "VECTOR_STATS_RESYNC_SECONDS", 0)
+    assert db.get_vector_status_counts() == {"completed": {"files": 2, "vectors": 12}}
+
+
+def test_recent_processing_is_refreshed_after_writes(db):
+    _store_run(db, "a", 3)
+    assert [row["filename"] for row in db.get_recent_vector_processing()] == ["a.xlsx"]
+    assert _selects(db, db.get_recent_vector_processing) == 0
+
+    _store_run(db, "b", 4)
+
+    assert {row["filename"] for row in db.get_recent_vector_processing()} == {"a.xlsx", "b.xlsx"}
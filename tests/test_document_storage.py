@@ -0,0 +1,166 @@
+"""Tests for cached document fetches (services/document_storage.py)"""
+
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+from google.api_core.exceptions import NotModified
+
+from financial_analysis.services import document_storage
+from financial_analysis.services.document_storage import GCSMetadataManager
+from financial_analysis.storage.gcs_client import GCSClient
+from financial_analysis.storage.gcs_path_utils import GCSPathManager
+from financial_analysis.storage.local_storage_client import LocalStorageClient
+
+
+class CountingLocalClient(LocalStorageClient):
+    """Local storage recording which documents had their body transferred"""
+
+    bucket_name = "local"
+
+    def __init__(self, base_path):
+        super().__init__(base_path=base_path)
+        self.transfers = []
+
+    def download_file_if_modified(self, blob_name, generation=None):
+        content, generation = super().download_file_if_modified(blob_name, generation)
+        if content is not None:
+            self.transfers.append(blob_name)
+        return content, generation
+
+
+class UnconditionalClient:
+    """Storage client without conditional downloads"""
+
+    bucket_name = "plain"
+
+    def __init__(self, base_path):
+        local = LocalStorageClient(base_path=base_path)
+        self.base_path = local.base_path
+        self.upload_file = local.upload_file
+        self._download_file = local.download_file
+        self.transfers = []
+
+    def download_file(self, blob_name):
+        self.transfers.append(blob_name)
+        return self._download_file(blob_name)
+
+
+@pytest.fixture
+def manager_for(tmp_path, monkeypatch):
+    def build(client_cls):
+        client = client_cls(str(tmp_path / "storage"))
+        monkeypatch.setattr(document_storage, "GCSClient", lambda **_: client)
+        return GCSMetadataManager()
+    return build
+
+
+def _rewrite(manager, doc_id, document):
+    """Change a stored document behind the manager's back, with a new mtime"""
+    path = manager.gcs_client.base_path / GCSPathManager.get_document_blob_name(f"{doc_id}.json", doc_id)
+    previous = path.stat().st_mtime_ns
+    path.write_text(json.dumps(document))
+    os.utime(path, ns=(previous + 10 ** 9, previous + 10 ** 9))
+
+
+def test_unchanged_document_is_served_from_cache(manager_for):
+    manager = manager_for(CountingLocalClient)
+    manager.store_document({"text": "Cash"}, doc_id="doc-1")
+
+    first = manager.get_document("doc-1")
+    second = manager.get_document("doc-1")
+
+    assert first["text"] == "Cash"
+    assert second is first
+    assert len(manager.gcs_client.transfers) == 1
+
+
+def test_changed_generation_refetches(manager_for):
+    manager = manager_for(CountingLocalClient)
+    manager.store_document({"text": "Cash"}, doc_id="doc-1")
+    manager.get_document("doc-1")
+
+    _rewrite(manager, "doc-1", {"text": "Bank"})
+
+    assert manager.get_document("doc-1") == {"text": "Bank"}
+    assert len(manager.gcs_client.transfers) == 2
+
+
+def test_storing_a_document_invalidates_its_cache_entry(manager_for):
+    manager = manager_for(CountingLocalClient)
+    manager.store_document({"text": "Cash"}, doc_id="doc-1")
+    manager.get_document("doc-1")
+
+    manager.store_document({"text": "Bank"}, doc_id="doc-1")
+
+    assert manager.get_document("doc-1")["text"] == "Bank"
+
+
+def test_client_without_conditional_download_always_transfers(manager_for):
+    manager = manager_for(UnconditionalClient)
+    manager.store_document({"text": "Cash"}, doc_id="doc-1")
+
+    assert manager.get_document("doc-1")["text"] == "Cash"
+    _rewrite(manager, "doc-1", {"text": "Bank"})
+
+    assert manager.get_document("doc-1") == {"text": "Bank"}
+    assert len(manager.gcs_client.transfers) == 2
+
+
+def test_cache_is_bounded(manager_for, monkeypatch):
+    monkeypatch.setenv("DOCUMENT_CACHE_SIZE", "2")
+    manager = manager_for(CountingLocalClient)
+    for doc_id in ("doc-1", "doc-2", "doc-3"):
+        manager.store_document({"text": doc_id}, doc_id=doc_id)
+        manager.get_document(doc_id)
+
+    assert list(manager._cache) == ["doc-2", "doc-3"]
+
+
+def test_get_documents_fetches_each_id_once(manager_for):
+    manager = manager_for(CountingLocalClient)
+    for doc_id in ("doc-1", "doc-2", "doc-3"):
+        manager.store_document({"text": doc_id}, doc_id=doc_id)
+
+    documents = manager.get_documents(["doc-2", "doc-1", "doc-2", "doc-3"])
+
+    assert list(documents) == ["doc-2", "doc-1", "doc-3"]
+    assert {doc_id: document["text"] for doc_id, document in documents.items()} == \
+        {"doc-1": "doc-1", "doc-2": "doc-2", "doc-3": "doc-3"}
+    assert len(manager.gcs_client.transfers) == 3
+    assert manager.get_documents([]) == {}
+
+
+class FakeBlob:
+    def __init__(self, generation, content):
+        self.generation = generation
+        self.content = content
+        self.requests = []
+
+    def download_as_bytes(self, if_generation_not_match=None):
+        self.requests.append(if_generation_not_match)
+        if if_generation_not_match == self.generation:
+            raise NotModified("304 Not Modified")
+        return self.content
+
+
+def _gcs_client(blob):
+    client = GCSClient.__new__(GCSClient)
+    client.bucket = SimpleNamespace(blob=lambda name: blob)
+    return client
+
+
+def test_gcs_conditional_download_not_modified():
+    blob = FakeBlob(generation=7, content=b"{}")
+    client = _gcs_client(blob)
+
+    assert client.download_file_if_modified("documents/doc-1.json") == (b"{}", 7)
+    assert client.download_file_if_modified("documents/doc-1.json", 7) == (None, 7)
+    assert blob.requests == [None, 7]
+
+
+def test_gcs_conditional_download_newer_generation():
+    blob = FakeBlob(generation=8, content=b'{"text": "Bank"}')
+
+    assert _gcs_client(blob).download_file_if_modified("documents/doc-1.json", 7) == (b'{"text": "Bank"}', 8)
@@ -0,0 +1,91 @@
+"""Tests for the on-disk embedding cache (services/embedding_cache.py)"""
+
+import numpy as np
+import pytest
+
+from financial_analysis.services import embedding_cache
+from financial_analysis.services.embedding_cache import EmbeddingCache, text_hash
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1.0
+        return self.now
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "time", FakeClock())
+    return EmbeddingCache(path=str(tmp_path / "embeddings.db"), max_entries=3)
+
+
+def test_round_trip_is_lossless_within_float32(cache):
+    vector = np.random.default_rng(0).standard_normal(1024).tolist()
+
+    cache.put_many("model", "retrieval.passage", [("a", vector)])
+    stored = cache.get_many("model", "retrieval.passage", ["a"])["a"]
+
+    assert len(stored) == 1024
+    assert stored == np.asarray(vector, dtype=np.float32).tolist()
+    np.testing.assert_allclose(stored, vector, rtol=1e-6)
+
+
+def test_entries_are_keyed_by_model_task_and_text_hash(cache):
+    key = text_hash("Cash | 100")
+    cache.put_many("model-a", "retrieval.passage", [(key, [1.0, 0.0])])
+
+    assert cache.get_many("model-a", "retrieval.passage", [key]) == {key: [1.0, 0.0]}
+    assert cache.get_many("model-b", "retrieval.passage", [key]) == {}
+    assert cache.get_many("model-a", "retrieval.query", [key]) == {}
+    assert cache.get_many("model-a", "retrieval.passage", [text_hash("Cash | 200")]) == {}
+
+    cache.put_many("model-a", "retrieval.query", [(key, [0.0, 1.0])])
+    assert cache.get_many("model-a", "retrieval.query", [key]) == {key: [0.0, 1.0]}
+    assert cache.get_many("model-a", "retrieval.passage", [key]) == {key: [1.0, 0.0]}
+
+
+def test_text_hash_is_stable():
+    assert text_hash("Cash") == text_hash("Cash")
+    assert text_hash("Cash") != text_hash("cash")
+    assert len(text_hash("")) == 40
+
+
+def test_eviction_drops_least_recently_accessed(cache):
+    for key in ("a", "b", "c"):
+        cache.put_many("model", "task", [(key, [1.0])])
+    # Reading "a" makes "b" the least recently used entry
+    cache.get_many("model", "task", ["a"])
+
+    cache.put_many("model", "task", [("d", [4.0])])
+
+    assert cache.get_many("model", "task", ["b"]) == {}
+    assert cache.get_stats()["evictions"] == 1
+
+    # "c" was stored before "a" was read and "d" was written
+    cache.put_many("model", "task", [("e", [5.0])])
+
+    assert cache.get_many("model", "task", ["c"]) == {}
+    assert set(cache.get_many("model", "task", ["a", "d", "e"])) == {"a", "d", "e"}
+
+
+def test_stats_count_hits_and_misses(cache):
+    cache.put_many("model", "task", [("a", [1.0])])
+
+    cache.get_many("model", "task", ["a", "a", "b"])
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_disabled_cache_stores_nothing(tmp_path, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "false")
+    cache = EmbeddingCache(path=str(tmp_path / "embeddings.db"))
+
+    cache.put_many("model", "task", [("a", [1.0])])
+
+    assert cache.get_many("model", "task", ["a"]) == {}
+    assert cache.get_stats()["entries"] == 0
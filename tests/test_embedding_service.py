@@ -0,0 +1,261 @@
+"""Tests for the embedders (services/embedding_service.py): batching, retries, HTTP client lifetime and backends"""
+
+import asyncio
+import json
+import sys
+import types
+
+import httpx
+import pytest
+
+from financial_analysis.services import embedding_service
+from financial_analysis.services.embedding_cache import EmbeddingCache
+from financial_analysis.services.embedding_service import (
+    FastEmbedEmbeddingService,
+    JinaEmbeddingService,
+    estimate_tokens,
+    get_embedder,
+    make_batches,
+)
+
+
+def test_make_batches_respects_item_bound():
+    texts = [f"t{i}" for i in range(7)]
+
+    batches = make_batches(texts, max_items=3, max_tokens=1000)
+
+    assert [start for start, _ in batches] == [0, 3, 6]
+    assert [text for _, batch in batches for text in batch] == texts
+
+
+def test_make_batches_respects_token_bound():
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d" * 4]
+    assert estimate_tokens(texts[0]) == 10
+
+    batches = make_batches(texts, max_items=100, max_tokens=20)
+
+    assert [batch for _, batch in batches] == [texts[:2], texts[2:]]
+
+
+def test_oversized_text_gets_its_own_batch():
+    texts = ["short", "x" * 400, "short"]
+
+    batches = make_batches(texts, max_items=100, max_tokens=10)
+
+    assert [batch for _, batch in batches] == [["short"], ["x" * 400], ["short"]]
+    assert make_batches([]) == []
+
+
+class JinaStub:
+    """httpx.MockTransport handler answering like the Jina embeddings API"""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(json.loads(request.content))
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, Exception):
+                raise failure
+            return httpx.Response(failure)
+        texts = self.requests[-1]["input"]
+        data = [{"index": i, "embedding": [float(len(text)), 1.0]} for i, text in enumerate(texts)]
+        # Out of order on purpose: results must be matched by index
+        return httpx.Response(200, json={"data": list(reversed(data))})
+
+
+@pytest.fixture
+def jina(monkeypatch, tmp_path):
+    clients = []
+
+    def install(handler):
+        service = JinaEmbeddingService(api_key="test-key")
+        service.cache = EmbeddingCache(path=str(tmp_path / "cache.db"))
+
+        def create_client():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            clients.append(client)
+            return client
+        monkeypatch.setattr(service, "_create_http_client", create_client)
+        return service
+
+    monkeypatch.setattr(embedding_service.random, "uniform", lambda low, high: 0.0)
+    install.clients = clients
+    return install
+
+
+def test_results_follow_input_order(jina):
+    service = jina(JinaStub())
+
+    results = service.generate_embeddings(["a", "bbb", "cc"])
+
+    assert [result.embedding[0] for result in results] == [1.0, 3.0, 2.0]
+
+
+def test_transient_failures_are_retried(jina):
+    stub = JinaStub(failures=[503, httpx.ConnectError("reset"), 429])
+    service = jina(stub)
+
+    results = service.generate_embeddings(["row"])
+
+    assert results[0].embedding == [3.0, 1.0]
+    assert len(stub.requests) == 4
+
+
+def test_client_errors_are_not_retried(jina):
+    stub = JinaStub(failures=[400])
+    service = jina(stub)
+
+    with pytest.raises(Exception, match="Jina API request failed"):
+        service.generate_embeddings(["row"])
+    assert len(stub.requests) == 1
+
+
+def test_retries_give_up_after_max_retries(jina):
+    stub = JinaStub(failures=[500] * (embedding_service.JINA_MAX_RETRIES + 1))
+    service = jina(stub)
+
+    with pytest.raises(Exception, match="Jina API request failed"):
+        service.generate_embeddings(["row"])
+    assert len(stub.requests) == embedding_service.JINA_MAX_RETRIES + 1
+
+
+def test_batches_are_sent_separately(jina, monkeypatch):
+    monkeypatch.setattr(embedding_service, "make_batches",
+                        lambda texts: make_batches(texts, max_items=2, max_tokens=1000))
+    stub = JinaStub()
+    service = jina(stub)
+
+    results = service.generate_embeddings(["a", "bb", "ccc", "dddd", "eeeee"])
+
+    assert sorted(len(request["input"]) for request in stub.requests) == [1, 2, 2]
+    assert [result.embedding[0] for result in results] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_blocking_wrappers_close_their_clients(jina):
+    service = jina(JinaStub())
+
+    service.generate_embeddings(["a"])
+    service.generate_embeddings(["b"])
+
+    assert len(jina.clients) == 2
+    assert all(client.is_closed for client in jina.clients)
+    assert service._http_client is None
+
+
+def test_long_lived_client_is_replaced_and_closed_on_a_new_loop(jina):
+    service = jina(JinaStub())
+
+    asyncio.run(service.agenerate_embeddings(["a"]))
+    first = service._http_client
+    asyncio.run(service.agenerate_embeddings(["b"]))
+
+    assert service._http_client is not first
+    assert first.is_closed
+    asyncio.run(service.aclose())
+    assert all(client.is_closed for client in jina.clients)
+
+
+class FakeVector(list):
+    def tolist(self):
+        return list(self)
+
+
+class FakeTextEmbedding:
+    """fastembed.TextEmbedding without the ONNX model download"""
+
+    supported = [{"model": "BAAI/bge-small-en-v1.5", "dim": 384}]
+    probe_dim = 5
+
+    def __init__(self, model_name, cache_dir=None):
+        self.model_name = model_name
+        self.probes = 0
+
+    @classmethod
+    def list_supported_models(cls):
+        return cls.supported
+
+    def embed(self, texts):
+        self.probes += 1
+        return iter([FakeVector([0.0] * self.probe_dim) for _ in texts])
+
+    def passage_embed(self, texts, batch_size=None):
+        return [FakeVector([float(len(text)), 0.0]) for text in texts]
+
+    def query_embed(self, texts):
+        return [FakeVector([0.0, float(len(text))]) for text in texts]
+
+
+@pytest.fixture
+def fastembed(monkeypatch, tmp_path):
+    monkeypatch.setitem(sys.modules, "fastembed", types.SimpleNamespace(TextEmbedding=FakeTextEmbedding))
+    monkeypatch.setattr(embedding_service, "get_embedding_cache",
+                        lambda: EmbeddingCache(path=str(tmp_path / "cache.db")))
+    for name in ("FASTEMBED_MODEL", "FASTEMBED_DIM", "EMBEDDING_BACKEND"):
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+def test_get_embedder_selects_backend_from_env(fastembed):
+    fastembed.setenv("EMBEDDING_BACKEND", "FastEmbed")
+    assert isinstance(get_embedder(), FastEmbedEmbeddingService)
+
+    fastembed.setenv("EMBEDDING_BACKEND", "jina")
+    embedder = get_embedder(api_key="test-key")
+    assert isinstance(embedder, JinaEmbeddingService)
+    assert embedder.api_key == "test-key"
+
+    # An explicit backend wins over the environment
+    assert isinstance(get_embedder("fastembed"), FastEmbedEmbeddingService)
+
+
+def test_get_embedder_defaults_to_jina(fastembed):
+    assert isinstance(get_embedder(api_key="test-key"), JinaEmbeddingService)
+
+
+def test_get_embedder_rejects_unknown_backend(fastembed):
+    fastembed.setenv("EMBEDDING_BACKEND", "word2vec")
+
+    with pytest.raises(ValueError, match="Unknown embedding backend: word2vec"):
+        get_embedder()
+
+
+def test_fastembed_dimension_from_model_list(fastembed):
+    service = FastEmbedEmbeddingService()
+
+    assert service.vector_size == 384
+    assert service._model.probes == 0
+
+
+def test_fastembed_dimension_probe_for_unlisted_model(fastembed):
+    service = FastEmbedEmbeddingService(model_name="org/custom-model")
+
+    assert service.vector_size == FakeTextEmbedding.probe_dim
+    assert service._model.probes == 1
+
+
+def test_fastembed_dimension_override(fastembed):
+    fastembed.setenv("FASTEMBED_DIM", "768")
+
+    assert FastEmbedEmbeddingService().vector_size == 768
+    assert FastEmbedEmbeddingService(vector_size=128).vector_size == 128
+
+
+def test_fastembed_embeds_passages_and_queries(fastembed):
+    service = FastEmbedEmbeddingService()
+
+    passages = service.generate_embeddings(["a", "bbb"])
+    query = service.generate_single_embedding("cc")
+
+    assert [result.embedding for result in passages] == [[1.0, 0.0], [3.0, 0.0]]
+    assert query.embedding == [0.0, 2.0]
+    asyncio.run(service.aclose())
+
+
+def test_fastembed_missing_package_is_reported(fastembed):
+    fastembed.setitem(sys.modules, "fastembed", None)
+
+    with pytest.raises(ValueError, match="fastembed is required"):
+        FastEmbedEmbeddingService()
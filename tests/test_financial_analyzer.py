@@ -0,0 +1,138 @@
+"""Tests for workbook loading and numeric coercion (core/financial_analyzer.py)"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from financial_analysis.core import financial_analyzer
+from financial_analysis.core.financial_analyzer import (
+    _detect_year_columns,
+    _find_header_row,
+    _to_numeric,
+    load_financial_data,
+)
+
+
+def _write_workbook(path, rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+    return path
+
+
+@pytest.mark.parametrize("dtype", [object, "string", "str"])
+def test_to_numeric_strips_thousands_separators(dtype):
+    series = pd.Series(["1,234.5", " 20 ", None, "n/a"], dtype=dtype)
+
+    result = _to_numeric(series)
+
+    assert result.iloc[0] == 1234.5
+    assert result.iloc[1] == 20
+    assert result.iloc[2:].isna().all()
+
+
+def test_to_numeric_keeps_numeric_columns():
+    result = _to_numeric(pd.Series([1.5, np.nan, 3]))
+
+    assert result.iloc[0] == 1.5
+    assert np.isnan(result.iloc[1])
+    assert result.iloc[2] == 3
+
+
+def test_find_header_row_past_the_first_block():
+    rows = [[f"note {i}", None] for i in range(7)] + [["Code", "Account"], ["111", "Cash"]]
+
+    assert _find_header_row(pd.DataFrame(rows), block_size=3) == 7
+
+
+def test_find_header_row_missing():
+    assert _find_header_row(pd.DataFrame([["a", "b"], ["c", "d"]])) is None
+
+
+def test_detect_year_columns_by_name_and_by_content():
+    named = pd.DataFrame(columns=["Code", "Account", "Year 2023", 2024])
+    unnamed = pd.DataFrame({"Code": ["111", "112"], "Account": ["Cash", "Bank"],
+                            "Last Year": ["1,000", "2,000"], "Current Year": ["1,100", None]})
+
+    assert _detect_year_columns(named) == [2, 3]
+    assert _detect_year_columns(unnamed) == [2, 3]
+
+
+def test_load_financial_data_finds_header_and_coerces_years(tmp_path):
+    path = _write_workbook(tmp_path / "ledger.xlsx", [
+        ["ACME Ltd - trial balance"],
+        ["Period ending 31 December"],
+        [],
+        ["Code", "Account", "2023", "2024"],
+        ["111", "Cash", "1,234.5", 1500],
+        ["511", "Revenue", "20,000", "22,500"],
+    ])
+
+    df = load_financial_data(path)
+
+    assert list(df.columns) == ["Code", "Account", "2023", "2024"]
+    assert df["Account"].tolist() == ["Cash", "Revenue"]
+    assert pd.api.types.is_numeric_dtype(df["2023"])
+    assert pd.api.types.is_numeric_dtype(df["2024"])
+    assert df["2023"].tolist() == [1234.5, 20000]
+    assert df["2024"].tolist() == [1500, 22500]
+
+
+def test_load_financial_data_without_code_row(tmp_path):
+    path = _write_workbook(tmp_path / "notes.xlsx", [["Account", "2024"], ["Cash", 10]])
+
+    with pytest.raises(ValueError):
+        load_financial_data(path)
+
+
+class FakeCompletion:
+    def __init__(self, content):
+        self.choices = [type("Choice", (), {"message": type("Message", (), {"content": content})()})()]
+
+
+@pytest.fixture
+def fake_completion(monkeypatch):
+    calls = []
+
+    async def create_chat_completion(**kwargs):
+        calls.append(kwargs)
+        return FakeCompletion("report text")
+    monkeypatch.setattr(financial_analyzer, "create_chat_completion", create_chat_completion)
+    monkeypatch.setattr(financial_analyzer, "compact_financial_table", lambda df, **kwargs: CompactionStub())
+    return calls
+
+
+class CompactionStub:
+    text = "Code\tAccount"
+
+    def summary(self):
+        return "0 rows"
+
+
+def test_sync_wrappers_delegate_to_async_client(fake_completion, caplog):
+    df = pd.DataFrame({"Code": ["111"], "Account": ["Cash"], "2023": [1.0], "2024": [2.0]})
+
+    with caplog.at_level("INFO", logger=financial_analyzer.__name__):
+        report = financial_analyzer.generate_financial_report(None, df, "Assets", "Revenue", "Cash flow")
+    streamed = list(financial_analyzer.stream_financial_report(None, df, "Assets", "Revenue", "Cash flow"))
+    answer = financial_analyzer.ask_calculation_question(None, df, "What is gross margin?")
+
+    assert report == answer == "report text"
+    assert streamed == ["report text"]
+    assert len(fake_completion) == 3
+    assert "Prompt compaction: 0 rows" in caplog.text
+
+
+def test_setup_environment_requires_an_api_key(monkeypatch):
+    monkeypatch.setattr(financial_analyzer, "load_dotenv", lambda: None)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("API_KEY", raising=False)
+
+    with pytest.raises(ValueError):
+        financial_analyzer.setup_environment()
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    assert financial_analyzer.setup_environment().api_key == "test-key"
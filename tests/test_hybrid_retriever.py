@@ -0,0 +1,158 @@
+"""Tests for lexical indexing and rank fusion in the hybrid retriever (services/hybrid_retriever.py)"""
+
+import asyncio
+import io
+
+import pytest
+from openpyxl import Workbook
+
+from financial_analysis.services import financial_agent as financial_agent_module
+from financial_analysis.services.hybrid_retriever import (
+    RRF_K,
+    SEARCH_INDEX_KEY,
+    HybridRetriever,
+    LexicalIndex,
+    extract_workbook_terms,
+)
+from financial_analysis.storage import gcs_client
+
+
+def _workbook_bytes(sheets):
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+LEDGER = _workbook_bytes({
+    "Trial Balance": [
+        ["ACME Ltd"],
+        ["Code", "Account", "2023", "2024"],
+        [1111, "Cash on hand", 100, 120],
+        [5111, "Sales revenue", 900, 950],
+    ],
+    "Notes": [["Prepared by finance"], ["Audited"]],
+})
+
+
+def _expected_total_length(index):
+    return sum(index._doc_lengths.values())
+
+
+def test_extract_workbook_terms_skips_year_columns():
+    terms = extract_workbook_terms(LEDGER)
+
+    assert terms["sheet_names"] == ["Trial Balance", "Notes"]
+    assert {"1111", "Cash on hand", "5111", "Sales revenue"} <= set(terms["search_terms"])
+    assert "Prepared by finance" in terms["search_terms"]
+    assert not {"100", "120", "900", "950"} & set(terms["search_terms"])
+
+
+def test_exact_account_code_ranks_its_file_first():
+    index = LexicalIndex()
+    index.add("ledger", ["ledger.xlsx", "1111", "Cash on hand", "5111", "Sales revenue"])
+    index.add("budget", ["budget.xlsx", "Cash budget", "Sales forecast"])
+    index.add("notes", ["notes.xlsx", "cash cash cash"])
+
+    assert [file_id for file_id, _ in index.search("5111")] == ["ledger"]
+    ranking = index.search("cash 1111")
+    assert ranking[0][0] == "ledger"
+    assert {file_id for file_id, _ in ranking} == {"ledger", "budget", "notes"}
+
+
+def test_reindex_and_remove_keep_lengths_consistent():
+    index = LexicalIndex()
+    index.add("a", ["one two three"])
+    index.add("b", ["two three"])
+    index.add("a", ["four"])
+
+    assert index._total_length == _expected_total_length(index) == 3
+    assert index.search("one") == []
+    assert "two" in index._postings and "a" not in index._postings["two"]
+
+    index.remove("a")
+    index.remove("a")
+    index.remove("missing")
+
+    assert index._total_length == _expected_total_length(index) == 2
+    assert "four" not in index._postings
+    assert len(index) == 1 and "b" in index
+
+    index.remove("b")
+    assert index._total_length == 0
+    assert not index._postings
+    assert index.search("two") == []
+
+
+def test_search_fuses_lexical_and_vector_rankings(monkeypatch):
+    retriever = HybridRetriever()
+    retriever._bootstrapped = True
+    monkeypatch.setattr(retriever, "lexical_search", lambda query, limit: [("a", 3.0), ("b", 2.0)])
+
+    async def vector_search(query, limit, min_score):
+        return [("b", 0.9), ("c", 0.8)]
+    monkeypatch.setattr(retriever, "vector_search", vector_search)
+
+    results = asyncio.run(retriever.search("revenue", limit=3))
+
+    assert [result["file_id"] for result in results] == ["b", "a", "c"]
+    assert results[0]["score"] == pytest.approx(1 / (RRF_K + 2) + 1 / (RRF_K + 1))
+    assert results[0]["lexical_score"] == 2.0 and results[0]["vector_score"] == 0.9
+    assert results[1]["vector_score"] is None
+    assert results[2]["lexical_score"] is None
+
+
+def test_index_workbook_keeps_terms_apart_from_extracted_data(db):
+    db.save_uploaded_document("f.xlsx", "ledger.xlsx", "uploads/f.xlsx", extracted_data={"summary": "FY24"})
+    file_id = db.list_uploaded_files_page()["files"][0]["file_id"]
+    retriever = HybridRetriever()
+
+    retriever.index_workbook(file_id, "ledger.xlsx", LEDGER)
+
+    stored = db.get_uploaded_document(file_id).extracted_data
+    assert stored["summary"] == "FY24"
+    assert "5111" in stored[SEARCH_INDEX_KEY]["search_terms"]
+    assert retriever.lexical_search("5111")[0][0] == file_id
+
+
+def test_document_context_omits_search_terms(db):
+    db.save_uploaded_document("f.xlsx", "ledger.xlsx", "uploads/f.xlsx", extracted_data={"summary": "FY24"})
+    file_id = db.list_uploaded_files_page()["files"][0]["file_id"]
+    HybridRetriever().index_workbook(file_id, "ledger.xlsx", LEDGER)
+
+    context = financial_agent_module.FinancialReportAgent().build_document_context([file_id])
+
+    assert "FY24" in context
+    assert "5111" not in context
+    assert SEARCH_INDEX_KEY not in context
+
+
+class FakeStorage:
+    def __init__(self, files):
+        self.files = files
+        self.downloads = []
+
+    def download_file(self, blob_name):
+        self.downloads.append(blob_name)
+        return self.files[blob_name]
+
+
+def test_backfill_indexes_documents_without_terms(db, monkeypatch):
+    storage = FakeStorage({"uploads/old.xlsx": LEDGER, "uploads/broken.xlsx": b"not a workbook"})
+    monkeypatch.setattr(gcs_client, "get_gcs_client", lambda: storage)
+    db.store_uploaded_file("old", "old.xlsx", "uploads/old.xlsx", file_size=1)
+    db.store_uploaded_file("broken", "broken.xlsx", "uploads/broken.xlsx", file_size=1)
+    retriever = HybridRetriever()
+
+    assert retriever.lexical_search("5111") == []
+    assert retriever.backfill() == 2
+    assert retriever.lexical_search("5111")[0][0] == "old"
+
+    # Unreadable files are recorded too, so later starts do not download them again
+    assert retriever.backfill() == 0
+    assert sorted(storage.downloads) == ["uploads/broken.xlsx", "uploads/old.xlsx"]
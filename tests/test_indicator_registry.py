@@ -0,0 +1,110 @@
+"""Tests for the in-memory indicator registry (core/indicator_registry.py)"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from financial_analysis.core import indicator_registry
+from financial_analysis.core.indicator_registry import INDICATOR_FILENAME, IndicatorRegistry
+
+
+def _write_workbook(path, balance=("Cash", "Inventory")):
+    pd.DataFrame({
+        "Balance Sheet": list(balance),
+        "Income Statement": ["Revenue"] + [None] * (len(balance) - 1),
+        "Cash Flow Statement": ["Operating cash flow"] + [None] * (len(balance) - 1),
+    }).to_excel(path, index=False)
+
+
+def _touch(path, mtime_ns):
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / INDICATOR_FILENAME
+    _write_workbook(path)
+    _touch(path, 1_000_000_000_000)
+    return path
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Counts workbook parses"""
+    calls = []
+    read_excel = pd.read_excel
+
+    def counting_read_excel(path, *args, **kwargs):
+        calls.append(path)
+        return read_excel(path, *args, **kwargs)
+    monkeypatch.setattr(indicator_registry.pd, "read_excel", counting_read_excel)
+    return calls
+
+
+def test_first_get_parses_the_workbook(workbook, reads):
+    registry = IndicatorRegistry(workbook)
+    assert registry.version == 0
+
+    indicators = registry.get()
+
+    assert indicators.balance_items == ("Cash", "Inventory")
+    assert indicators.income_items == ("Revenue",)
+    assert indicators.as_prompt_strings() == ("- Cash\n- Inventory", "- Revenue", "- Operating cash flow")
+    assert indicators.version == registry.version == 1
+    assert len(reads) == 1
+
+
+def test_unchanged_workbook_is_served_from_memory(workbook, reads, monkeypatch):
+    registry = IndicatorRegistry(workbook)
+    first = registry.get()
+
+    read_bytes_calls = []
+    monkeypatch.setattr(type(workbook), "read_bytes",
+                        lambda self: read_bytes_calls.append(self) or b"")
+
+    assert registry.get() is first
+    assert registry.get() is first
+    assert len(reads) == 1
+    # Same mtime and size: not even re-hashed
+    assert read_bytes_calls == []
+
+
+def test_modified_workbook_bumps_version_and_reloads(workbook, reads):
+    registry = IndicatorRegistry(workbook)
+    first = registry.get()
+
+    _write_workbook(workbook, balance=("Cash", "Inventory", "Receivables"))
+    _touch(workbook, 2_000_000_000_000)
+    second = registry.get()
+
+    assert second is not first
+    assert second.balance_items == ("Cash", "Inventory", "Receivables")
+    assert second.version == registry.version == 2
+    assert second.digest != first.digest
+    assert len(reads) == 2
+
+
+def test_touched_but_identical_workbook_is_not_reparsed(workbook, reads):
+    registry = IndicatorRegistry(workbook)
+    first = registry.get()
+
+    _touch(workbook, 2_000_000_000_000)
+
+    assert registry.get() is first
+    assert registry.version == 1
+    assert len(reads) == 1
+
+
+def test_reload_rechecks_but_keeps_identical_content(workbook, reads):
+    registry = IndicatorRegistry(workbook)
+    first = registry.get()
+
+    assert registry.reload() is first
+    assert registry.version == 1
+    assert len(reads) == 1
+
+
+def test_missing_workbook_raises(tmp_path):
+    with pytest.raises(FileNotFoundError, match=INDICATOR_FILENAME):
+        IndicatorRegistry(tmp_path / INDICATOR_FILENAME).get()
@@ -0,0 +1,142 @@
+"""Tests for the staged ingest pipeline (services/ingest_pipeline.py)"""
+
+import asyncio
+
+import pytest
+
+from financial_analysis.services import ingest_pipeline
+from financial_analysis.services.ingest_pipeline import (
+    IngestPipeline,
+    IngestPipelineUnavailable,
+    TASK_COMPLETED,
+    TASK_FAILED,
+    FINISHED_STATES,
+)
+
+
+class FakeVectorService:
+    """Stands in for VectorProcessingService; records calls, fails where told"""
+
+    def __init__(self, fail_download=False, fail_mark_failed=False):
+        self.fail_download = fail_download
+        self.fail_mark_failed = fail_mark_failed
+        self.marked_failed = []
+        self.recorded = []
+
+    def download_excel(self, gcs_url):
+        if self.fail_download:
+            raise RuntimeError(f"cannot download {gcs_url}")
+        return b"content"
+
+    def parse_excel(self, content):
+        return ["row 1", "row 2"]
+
+    async def embed_excel(self, df, filename, file_id):
+        return [f"embedding {row}" for row in df]
+
+    def replace_vectors(self, embeddings, file_id):
+        return [f"{file_id}-{i}" for i in range(len(embeddings))]
+
+    def record_processing(self, file_id, filename, metadata, vector_ids):
+        self.recorded.append((file_id, vector_ids))
+
+    def mark_failed(self, file_id, error):
+        if self.fail_mark_failed:
+            raise RuntimeError("vector service unavailable")
+        self.marked_failed.append(file_id)
+
+
+async def _wait_finished(pipeline, tasks, timeout=5.0):
+    async def poll():
+        while not all(pipeline.get_task(task.task_id).status in FINISHED_STATES for task in tasks):
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+def _run_pipeline(service, files):
+    async def scenario():
+        pipeline = IngestPipeline(queue_size=8, stage_workers={stage: 1 for stage in ingest_pipeline.STAGES})
+        await pipeline.start()
+        try:
+            tasks = [pipeline.submit(file_id, f"{file_id}.xlsx", f"uploads/{file_id}.xlsx") for file_id in files]
+            await _wait_finished(pipeline, tasks)
+            return pipeline, tasks
+        finally:
+            await pipeline.stop()
+    return asyncio.run(scenario())
+
+
+@pytest.fixture
+def use_service(monkeypatch):
+    def install(service):
+        monkeypatch.setattr(ingest_pipeline, "get_vector_processing_service", lambda: service)
+        return service
+    return install
+
+
+def test_tasks_pass_through_every_stage(use_service):
+    service = use_service(FakeVectorService())
+
+    pipeline, tasks = _run_pipeline(service, ["a", "b"])
+
+    assert [task.status for task in tasks] == [TASK_COMPLETED, TASK_COMPLETED]
+    assert all(task.vectors_stored == 2 for task in tasks)
+    assert set(tasks[0].timings) == set(ingest_pipeline.STAGES)
+    assert sorted(file_id for file_id, _ in service.recorded) == ["a", "b"]
+    stats = pipeline.get_stats()
+    assert stats["stages"]["record"]["processed"] == 2
+    assert stats["tasks"] == {TASK_COMPLETED: 2}
+
+
+def test_failed_stage_marks_file_failed(use_service):
+    service = use_service(FakeVectorService(fail_download=True))
+
+    pipeline, tasks = _run_pipeline(service, ["a"])
+
+    assert tasks[0].status == TASK_FAILED
+    assert "cannot download" in tasks[0].error
+    assert service.marked_failed == ["a"]
+    assert pipeline.get_stats()["stages"]["download"]["failed"] == 1
+
+
+def test_worker_survives_failing_failure_bookkeeping(use_service):
+    # A single download worker: if mark_failed killed it, the later tasks would never finish
+    service = use_service(FakeVectorService(fail_download=True, fail_mark_failed=True))
+
+    _, tasks = _run_pipeline(service, ["a", "b", "c"])
+
+    assert [task.status for task in tasks] == [TASK_FAILED] * 3
+
+
+def test_duplicate_submission_returns_active_task(use_service):
+    use_service(FakeVectorService())
+
+    async def scenario():
+        pipeline = IngestPipeline(queue_size=8)
+        await pipeline.start()
+        try:
+            first = pipeline.submit("a", "a.xlsx", "uploads/a.xlsx")
+            second = pipeline.submit("a", "a.xlsx", "uploads/a.xlsx")
+            await _wait_finished(pipeline, [first])
+            return first, second
+        finally:
+            await pipeline.stop()
+
+    first, second = asyncio.run(scenario())
+    assert first is second
+
+
+def test_start_fails_when_service_cannot_be_built(monkeypatch):
+    def broken_service():
+        raise ValueError("JINA_API_KEY not set")
+    monkeypatch.setattr(ingest_pipeline, "get_vector_processing_service", broken_service)
+
+    async def scenario():
+        pipeline = IngestPipeline()
+        with pytest.raises(ValueError):
+            await pipeline.start()
+        assert not pipeline.running
+        with pytest.raises(IngestPipelineUnavailable):
+            pipeline.submit("a", "a.xlsx", "uploads/a.xlsx")
+
+    asyncio.run(scenario())
@@ -0,0 +1,136 @@
+"""Tests for keyset pagination in the database manager (storage/database_manager.py)"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from financial_analysis.storage.database_manager import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    ChatHistory,
+    UploadedDocument,
+    decode_cursor,
+    encode_cursor,
+)
+
+BASE_TIME = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def _add_documents(db, uploaded_at):
+    """Insert one document per (id, uploaded_at) pair"""
+    with db.get_session() as session:
+        for file_id, timestamp in uploaded_at:
+            session.add(UploadedDocument(id=file_id, filename=file_id, original_filename=f"{file_id}.xlsx",
+                                         file_path=f"uploads/{file_id}.xlsx", uploaded_at=timestamp))
+        session.commit()
+
+
+def _all_pages(fetch, key, limit):
+    items, cursor, pages = [], None, 0
+    while True:
+        page = fetch(limit=limit, cursor=cursor)
+        items.extend(page[key])
+        pages += 1
+        cursor = page["next_cursor"]
+        if not cursor:
+            return items, pages
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    assert decode_cursor(encode_cursor(timestamp, "abc")) == (timestamp, "abc")
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm90IGpzb24=", encode_cursor(BASE_TIME, "x")[:-4]])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_are_newest_first_without_gaps_or_duplicates(db):
+    _add_documents(db, [(f"doc-{i:02d}", BASE_TIME + timedelta(minutes=i)) for i in range(23)])
+
+    files, pages = _all_pages(db.list_uploaded_files_page, "files", limit=5)
+
+    assert pages == 5
+    assert [f["file_id"] for f in files] == [f"doc-{i:02d}" for i in reversed(range(23))]
+
+
+def test_timestamp_ties_are_broken_by_id(db):
+    # Every row shares a timestamp, so only the id tie-breaker keeps pages disjoint
+    ids = [f"tie-{i:02d}" for i in range(12)]
+    _add_documents(db, [(file_id, BASE_TIME) for file_id in reversed(ids)])
+
+    files, _ = _all_pages(db.list_uploaded_files_page, "files", limit=5)
+
+    assert [f["file_id"] for f in files] == sorted(ids, reverse=True)
+
+
+def test_ties_straddling_a_page_boundary(db):
+    _add_documents(db, [("a", BASE_TIME), ("b", BASE_TIME + timedelta(seconds=1)),
+                        ("c", BASE_TIME + timedelta(seconds=1)), ("d", BASE_TIME + timedelta(seconds=1)),
+                        ("e", BASE_TIME + timedelta(seconds=2))])
+
+    first = db.list_uploaded_files_page(limit=2)
+    second = db.list_uploaded_files_page(limit=2, cursor=first["next_cursor"])
+    third = db.list_uploaded_files_page(limit=2, cursor=second["next_cursor"])
+
+    assert [f["file_id"] for f in first["files"]] == ["e", "d"]
+    assert [f["file_id"] for f in second["files"]] == ["c", "b"]
+    assert [f["file_id"] for f in third["files"]] == ["a"]
+    assert third["next_cursor"] is None
+
+
+def test_exact_multiple_of_page_size_has_no_empty_last_page(db):
+    _add_documents(db, [(f"doc-{i}", BASE_TIME + timedelta(minutes=i)) for i in range(4)])
+
+    first = db.list_uploaded_files_page(limit=2)
+    second = db.list_uploaded_files_page(limit=2, cursor=first["next_cursor"])
+
+    assert second["next_cursor"] is None
+    assert len(second["files"]) == 2
+
+
+def test_ascending_pages_for_expired_documents(db):
+    _add_documents(db, [(f"old-{i}", BASE_TIME + timedelta(minutes=i)) for i in range(5)]
+                   + [("new", BASE_TIME + timedelta(days=10))])
+    cutoff = BASE_TIME + timedelta(days=1)
+
+    seen, cursor = [], None
+    while True:
+        page = db.get_expired_documents_page(cutoff, 2, cursor)
+        seen.extend(file_id for file_id, _ in page["documents"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == [f"old-{i}" for i in range(5)]
+
+
+def test_chat_history_pages_back_from_latest_message(db):
+    with db.get_session() as session:
+        for i in range(7):
+            session.add(ChatHistory(id=f"m{i}", session_id="s1", user_message=f"q{i}", bot_response=f"a{i}",
+                                    timestamp=BASE_TIME + timedelta(minutes=i)))
+        session.add(ChatHistory(id="other", session_id="s2", user_message="q", bot_response="a",
+                                timestamp=BASE_TIME))
+        session.commit()
+
+    latest = db.get_chat_history_page("s1", limit=3)
+    earlier = db.get_chat_history_page("s1", limit=3, cursor=latest["next_cursor"])
+    first = db.get_chat_history_page("s1", limit=3, cursor=earlier["next_cursor"])
+
+    assert [m["message_id"] for m in latest["messages"]] == ["m4", "m5", "m6"]
+    assert [m["message_id"] for m in earlier["messages"]] == ["m1", "m2", "m3"]
+    assert [m["message_id"] for m in first["messages"]] == ["m0"]
+    assert first["next_cursor"] is None
+
+
+def test_page_size_is_capped(db):
+    _add_documents(db, [(f"doc-{i:04d}", BASE_TIME + timedelta(seconds=i)) for i in range(MAX_PAGE_SIZE + 1)])
+
+    capped = db.list_uploaded_files_page(limit=10_000)
+
+    assert len(capped["files"]) == MAX_PAGE_SIZE
+    assert capped["next_cursor"] is not None
+    assert len(db.list_uploaded_files_page(limit=0)["files"]) == DEFAULT_PAGE_SIZE
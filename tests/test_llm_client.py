@@ -0,0 +1,97 @@
+"""Tests for running LLM coroutines from synchronous code (core/llm_client.py)"""
+
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from financial_analysis.core import llm_client
+
+
+@pytest.fixture
+def no_main_loop(monkeypatch):
+    monkeypatch.setattr(llm_client, "_main_loop", None)
+    monkeypatch.setattr(llm_client, "_client", None)
+    monkeypatch.setattr(llm_client, "_semaphore", None)
+
+
+async def _client_and_semaphore():
+    client = llm_client.get_async_client()
+    assert llm_client.get_async_client() is client
+    return client, llm_client._get_semaphore()
+
+
+def test_each_run_sync_gets_its_own_client_and_semaphore(no_main_loop):
+    first_client, first_semaphore = llm_client.run_sync(_client_and_semaphore())
+    second_client, second_semaphore = llm_client.run_sync(_client_and_semaphore())
+
+    assert first_client is not second_client
+    assert first_semaphore is not second_semaphore
+    assert first_client.is_closed() and second_client.is_closed()
+    # The fallback never leaks into the shared client used by the API loop
+    assert llm_client._client is None
+    assert llm_client._semaphore is None
+
+
+def test_run_sync_uses_the_bound_loop_from_other_threads(no_main_loop):
+    async def scenario():
+        llm_client.bind_event_loop(asyncio.get_running_loop())
+        client, _ = await asyncio.to_thread(llm_client.run_sync, _client_and_semaphore())
+        shared = llm_client._client
+        await llm_client.aclose()
+        return client, shared
+
+    client, shared = asyncio.run(scenario())
+
+    assert client is shared
+    assert client.is_closed()
+
+
+async def _hang(cancelled):
+    try:
+        await asyncio.sleep(30)
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+
+
+def _cancel_soon(event, delay=0.05):
+    timer = threading.Timer(delay, event.set)
+    timer.start()
+    return timer
+
+
+def test_run_sync_cancel_event_stops_the_coroutine(no_main_loop):
+    cancel, cancelled = threading.Event(), threading.Event()
+    _cancel_soon(cancel)
+
+    with pytest.raises(concurrent.futures.CancelledError):
+        llm_client.run_sync(_hang(cancelled), cancel_event=cancel)
+    assert cancelled.is_set()
+
+
+def test_run_sync_cancel_event_on_the_bound_loop(no_main_loop):
+    cancel, cancelled = threading.Event(), threading.Event()
+
+    def worker():
+        # Caught in the thread: awaiting to_thread would turn it into asyncio.CancelledError
+        try:
+            llm_client.run_sync(_hang(cancelled), cancel_event=cancel)
+        except concurrent.futures.CancelledError as e:
+            return e
+
+    async def scenario():
+        llm_client.bind_event_loop(asyncio.get_running_loop())
+        _cancel_soon(cancel)
+        return await asyncio.to_thread(worker)
+
+    assert isinstance(asyncio.run(scenario()), concurrent.futures.CancelledError)
+    assert cancelled.is_set()
+
+
+def test_run_sync_result_with_unset_cancel_event(no_main_loop):
+    async def answer():
+        return 42
+
+    assert llm_client.run_sync(answer(), cancel_event=threading.Event()) == 42
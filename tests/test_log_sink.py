@@ -0,0 +1,118 @@
+"""Tests for the buffered processing-log sink (storage/log_sink.py)"""
+
+import threading
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, func, select
+
+from financial_analysis.storage.log_sink import LogSink
+
+
+@pytest.fixture
+def table_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'logs.db'}")
+    table = Table("logs", MetaData(), Column("id", Integer, primary_key=True), Column("message", String))
+    table.metadata.create_all(engine)
+    yield table, engine
+    engine.dispose()
+
+
+def _count(engine, table):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(table)).scalar()
+
+
+class GatedSink(LogSink):
+    """Writer blocks on its first batch until the gate opens, so the queue can fill deterministically"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gate = threading.Event()
+        self.writing = threading.Event()
+
+    def _write_batch(self, rows):
+        self.writing.set()
+        self.gate.wait(5)
+        super()._write_batch(rows)
+
+
+def test_flush_writes_queued_rows_in_batches(table_engine):
+    table, engine = table_engine
+    sink = LogSink(engine, table, max_queue=1000, batch_size=10, flush_interval_ms=1000)
+
+    for i in range(35):
+        assert sink.write({"id": i, "message": f"row {i}"})
+    assert sink.flush()
+
+    stats = sink.get_stats()
+    assert _count(engine, table) == 35
+    assert stats["written"] == stats["enqueued"] == 35
+    assert stats["batches"] >= 4
+    assert stats["pending"] == 0
+    sink.close()
+
+
+def test_full_queue_drops_and_counts(table_engine):
+    table, engine = table_engine
+    sink = GatedSink(engine, table, max_queue=3, batch_size=1, flush_interval_ms=10)
+
+    assert sink.write({"id": 0, "message": "in flight"})
+    assert sink.writing.wait(5)
+    accepted = [sink.write({"id": i, "message": f"row {i}"}) for i in range(1, 6)]
+
+    assert accepted == [True, True, True, False, False]
+    assert sink.get_stats()["dropped"] == 2
+
+    sink.gate.set()
+    assert sink.flush()
+    assert _count(engine, table) == 4
+    assert sink.get_stats()["written"] == 4
+    sink.close()
+
+
+def test_close_writes_pending_rows_and_drops_later_writes(table_engine):
+    table, engine = table_engine
+    sink = LogSink(engine, table, max_queue=100, batch_size=50, flush_interval_ms=5000)
+    for i in range(5):
+        sink.write({"id": i, "message": f"row {i}"})
+
+    sink.close()
+
+    assert _count(engine, table) == 5
+    assert sink.write({"id": 99, "message": "late"}) is False
+    assert sink.get_stats()["dropped"] == 1
+    assert _count(engine, table) == 5
+
+
+def test_start_reopens_a_closed_sink(table_engine):
+    table, engine = table_engine
+    sink = LogSink(engine, table, max_queue=100, batch_size=10, flush_interval_ms=10)
+    sink.close()
+
+    sink.start()
+    assert sink.write({"id": 1, "message": "after restart"})
+    assert sink.flush()
+
+    assert _count(engine, table) == 1
+    sink.close()
+
+
+def test_failed_batch_is_counted_not_raised(table_engine):
+    table, engine = table_engine
+    sink = LogSink(engine, table, max_queue=100, batch_size=10, flush_interval_ms=10)
+
+    sink.write({"id": 1, "message": "first"})
+    sink.write({"id": 1, "message": "duplicate key"})
+    assert sink.flush()
+
+    stats = sink.get_stats()
+    assert stats["written"] + stats["failed"] == 2
+    assert stats["failed"] >= 1
+    sink.close()
+
+
+def test_processing_log_reads_only_flush_when_asked(db):
+    db.log_sink.flush()
+    db.log_processing_operation("file-1", "process", "success", {"vector_count": 3})
+
+    assert len(db.get_processing_logs("file-1", flush=True)) == 1
@@ -0,0 +1,154 @@
+"""Tests for token counting in the prompt compactor (core/prompt_compactor.py)"""
+
+import io
+
+import pandas as pd
+import pytest
+
+from financial_analysis.core import prompt_compactor
+
+
+class BrokenTiktoken:
+    """tiktoken whose BPE download fails, as it does without network access"""
+
+    calls = 0
+
+    @classmethod
+    def encoding_for_model(cls, model):
+        cls.calls += 1
+        raise ConnectionError("could not download cl100k_base.tiktoken")
+
+    get_encoding = encoding_for_model
+
+
+@pytest.fixture
+def broken_tiktoken(monkeypatch):
+    BrokenTiktoken.calls = 0
+    monkeypatch.setattr(prompt_compactor, "tiktoken", BrokenTiktoken)
+    monkeypatch.setattr(prompt_compactor, "_encoding", None)
+    monkeypatch.setattr(prompt_compactor, "_encoding_failed", False)
+    return BrokenTiktoken
+
+
+def test_count_tokens_estimates_when_encoding_fails(broken_tiktoken):
+    assert prompt_compactor.count_tokens("abcdefgh") == 2
+    assert prompt_compactor.count_tokens("abcdefghi") == 3
+
+
+def test_failed_encoding_is_not_retried(broken_tiktoken):
+    for _ in range(3):
+        prompt_compactor.count_tokens("some text")
+
+    assert broken_tiktoken.calls == 1
+
+
+def test_count_tokens_without_tiktoken(monkeypatch):
+    monkeypatch.setattr(prompt_compactor, "tiktoken", None)
+    monkeypatch.setattr(prompt_compactor, "_encoding", None)
+
+    assert prompt_compactor.count_tokens("") == 0
+    assert prompt_compactor.count_tokens("a" * 40) == 10
+
+
+@pytest.fixture
+def estimated_tokens(monkeypatch):
+    """Deterministic token counts regardless of whether tiktoken can load"""
+    monkeypatch.setattr(prompt_compactor, "tiktoken", None)
+    monkeypatch.setattr(prompt_compactor, "_encoding", None)
+
+
+def _ledger(parents=40, children=10):
+    """Three-digit parent accounts whose values equal the sum of their four-digit sub-accounts"""
+    rows = []
+    for p in range(100, 100 + parents):
+        sub = [(f"{p}{c}", f"Sub-account {p}{c}", float(c + 1), float(2 * (c + 1))) for c in range(children)]
+        rows.append((str(p), f"Account {p}", sum(r[2] for r in sub), sum(r[3] for r in sub)))
+        rows.extend(sub)
+    return pd.DataFrame(rows, columns=["Code", "Account", "2023", "2024"])
+
+
+def _parse(text):
+    body = "\n".join(line for line in text.split("\n") if not line.startswith("..."))
+    return pd.read_csv(io.StringIO(body), sep="\t", dtype={"Code": str})
+
+
+def test_ledger_over_budget_rolls_up_to_code_prefixes(estimated_tokens):
+    df = _ledger()
+    assert prompt_compactor.count_tokens(prompt_compactor._render(df, list(df.columns))) > 600
+
+    compaction = prompt_compactor.compact_financial_table(df, value_columns=[2, 3], token_budget=600)
+    table = _parse(compaction.text)
+
+    assert compaction.compact_tokens <= 600
+    assert compaction.truncated_rows == 0
+    assert compaction.rolled_up_rows == 400
+    assert table["Code"].str.len().eq(3).all()
+    assert compaction.rows_out == len(table) == 40
+
+
+def test_rollup_preserves_totals(estimated_tokens):
+    df = pd.DataFrame([
+        ("111", "Cash", 30.0, 60.0),
+        ("1111", "Cash on hand", 10.0, 20.0),
+        ("1112", "Cash in bank", 20.0, 40.0),
+        # No "112" parent row: the sub-accounts are summed into a synthetic one
+        ("1121", "Bank USD", 5.0, 7.0),
+        ("1122", "Bank EUR", 6.0, 8.0),
+        ("511", "Revenue", 900.0, 950.0),
+    ], columns=["Code", "Account", "2023", "2024"])
+
+    full_tokens = prompt_compactor.compact_financial_table(df, value_columns=[2, 3]).compact_tokens
+
+    compaction = prompt_compactor.compact_financial_table(df, value_columns=[2, 3], token_budget=full_tokens - 1)
+    table = _parse(compaction.text)
+
+    assert compaction.truncated_rows == 0
+    assert table["Code"].tolist() == ["111", "112", "511"]
+    assert table["Account"].tolist()[1] == "Bank USD (+1 sub-accounts)"
+    assert table["2023"].tolist() == [30.0, 11.0, 900.0]
+    assert table["2024"].tolist() == [60.0, 15.0, 950.0]
+
+
+def test_totals_survive_compaction_when_it_fits(estimated_tokens):
+    df = _ledger(parents=5, children=4)
+    parents = df[df["Code"].str.len() == 3]
+
+    compaction = prompt_compactor.compact_financial_table(df, value_columns=[2, 3], token_budget=80)
+    table = _parse(compaction.text)
+
+    assert compaction.truncated_rows == 0
+    assert table["2023"].sum() == parents["2023"].sum()
+    assert table["2024"].sum() == parents["2024"].sum()
+
+
+def test_zero_and_empty_rows_are_dropped(estimated_tokens):
+    df = pd.DataFrame([
+        ("111", "Cash", 10.0, 20.0),
+        ("112", "Dormant account", 0.0, 0.0),
+        ("113", "Unposted", None, None),
+        (None, None, None, None),
+        ("511", "Revenue", 0.0, 5.0),
+    ], columns=["Code", "Account", "2023", "2024"])
+    df["Notes"] = None
+
+    compaction = prompt_compactor.compact_financial_table(df, value_columns=[2, 3])
+    table = _parse(compaction.text)
+
+    assert table["Code"].tolist() == ["111", "511"]
+    assert list(table.columns) == ["Code", "Account", "2023", "2024"]
+    assert compaction.rows_in == 5 and compaction.rows_out == 2
+    assert compaction.rolled_up_rows == compaction.truncated_rows == 0
+
+
+def test_budget_truncation_keeps_header_and_notes_omission(estimated_tokens):
+    df = pd.DataFrame({"Account": [f"Account number {i}" for i in range(200)],
+                       "2023": [float(i + 1) for i in range(200)], "2024": [1.0] * 200})
+
+    compaction = prompt_compactor.compact_financial_table(df, value_columns=[1, 2], token_budget=100)
+    lines = compaction.text.split("\n")
+
+    assert lines[0] == "Account\t2023\t2024"
+    assert lines[-1] == f"... {compaction.truncated_rows} further rows omitted to fit the token budget"
+    assert compaction.truncated_rows > 0
+    assert compaction.rows_out == 200 - compaction.truncated_rows == len(lines) - 2
+    assert prompt_compactor.count_tokens("\n".join(lines[:-1])) <= 100
@@ -0,0 +1,132 @@
+"""Tests for the vector search caches (services/query_cache.py)"""
+
+import asyncio
+
+import pytest
+
+from financial_analysis.services import query_cache
+from financial_analysis.services.query_cache import QueryCache, _LRU
+from financial_analysis.services.vector_processing import VectorProcessingService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(query_cache, "time", clock)
+    return clock
+
+
+def test_lru_entries_expire_after_ttl(clock):
+    lru = _LRU(max_entries=10, ttl_seconds=60)
+    lru.put("key", "value")
+
+    clock.now += 60
+    assert lru.get("key") == "value"
+
+    clock.now += 1
+    assert lru.get("key") is None
+    assert lru.get_stats()["entries"] == 0
+    assert (lru.hits, lru.misses) == (1, 1)
+
+
+def test_lru_without_ttl_never_expires(clock):
+    lru = _LRU(max_entries=10)
+    lru.put("key", "value")
+
+    clock.now += 10 ** 6
+
+    assert lru.get("key") == "value"
+
+
+def test_lru_evicts_least_recently_used():
+    lru = _LRU(max_entries=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    lru.get("a")
+
+    lru.put("c", 3)
+
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+
+
+def test_query_embeddings_ignore_whitespace():
+    cache = QueryCache(embedding_entries=10, result_entries=10, result_ttl_seconds=0)
+    cache.put_embedding("jina:v3", "cash  flow\n2024", [1.0])
+
+    assert cache.get_embedding("jina:v3", " cash flow 2024 ") == [1.0]
+    assert cache.get_embedding("fastembed:bge", "cash flow 2024") is None
+
+
+def test_result_key_includes_collection_version():
+    cache = QueryCache(embedding_entries=10, result_entries=10, result_ttl_seconds=0)
+    cache.put_results(cache.result_key([1.0, 0.0], 5, 0.7, version=1), [{"doc_id": "a"}])
+
+    assert cache.get_results(cache.result_key([1.0, 0.0], 5, 0.7, version=1)) == [{"doc_id": "a"}]
+    assert cache.get_results(cache.result_key([1.0, 0.0], 5, 0.7, version=2)) is None
+    assert cache.get_results(cache.result_key([1.0, 0.0], 10, 0.7, version=1)) is None
+
+
+def test_cached_results_are_copies():
+    cache = QueryCache(embedding_entries=10, result_entries=10, result_ttl_seconds=0)
+    key = cache.result_key([1.0], 5, 0.7, version=0)
+    cache.put_results(key, [{"doc_id": "a"}])
+
+    cache.get_results(key)[0]["file_info"] = {"filename": "changed"}
+
+    assert cache.get_results(key) == [{"doc_id": "a"}]
+
+
+class FakeQdrant:
+    def __init__(self):
+        self.collection_version = 0
+        self.searches = 0
+
+    def search_vectors(self, query_vector, limit, score_threshold):
+        self.searches += 1
+        return [{"doc_id": f"hit-{self.searches}", "score": 0.9, "payload": {}}]
+
+
+class FakeEmbedder:
+    backend = "fake"
+    model = "model"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def agenerate_single_embedding(self, text, task):
+        self.calls += 1
+        return type("Result", (), {"embedding": [1.0, 0.0]})()
+
+
+@pytest.fixture
+def service(db):
+    service = VectorProcessingService.__new__(VectorProcessingService)
+    service.embedding_service = FakeEmbedder()
+    service.qdrant_manager = FakeQdrant()
+    service.query_cache = QueryCache(embedding_entries=10, result_entries=10, result_ttl_seconds=0)
+    service.db_manager = db
+    return service
+
+
+def test_search_is_served_from_cache_until_the_collection_changes(service):
+    search = lambda: asyncio.run(service.search_similar_documents("cash", limit=5))
+
+    first = search()
+    assert search() == first
+    assert service.qdrant_manager.searches == 1
+    assert service.embedding_service.calls == 1
+
+    # A write bumps the version: the next search goes back to Qdrant
+    service.qdrant_manager.collection_version += 1
+    assert search() != first
+    assert service.qdrant_manager.searches == 2
+    # The query embedding does not depend on the collection
+    assert service.embedding_service.calls == 1
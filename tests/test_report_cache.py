@@ -0,0 +1,146 @@
+"""Tests for report cache keys and the table layout shared by the API and agent paths"""
+
+import asyncio
+
+import pandas as pd
+import pytest
+
+from financial_analysis.core import financial_analyzer
+from financial_analysis.services import financial_agent as financial_agent_module
+from financial_analysis.services.analysis_jobs import build_tables_data
+from financial_analysis.services.report_cache import ReportCache
+
+REPORT_TEXT = """Summary of the year.
+
+#### Balance Sheet Table
+| Indicator | 2024 | 2023 |
+|---|---|---|
+| Total Assets | 1200 | 1000 |
+| Total Liabilities | 700 | 650 |
+
+#### Income Statement Table
+| Indicator | 2024 | 2023 |
+|---|---|---|
+| Revenue | 900 | 800 |
+
+#### Cash Flow Statement Table
+| Indicator | 2024 | 2023 |
+|---|---|---|
+| Net Cash Flow | 50 | -20 |
+"""
+
+INDICATORS = ("Total Assets", "Revenue", "Net Cash Flow")
+
+
+@pytest.fixture(autouse=True)
+def output_dir(monkeypatch, tmp_path):
+    """Send the extractors' workbook side output to a scratch directory"""
+    monkeypatch.setattr(financial_analyzer, "Path", lambda *_: tmp_path / "src" / "core" / "financial_analyzer.py")
+    return tmp_path / "output"
+
+
+def _strip(row):
+    return {key.strip(): value.strip() for key, value in row.items()}
+
+
+def _ledger(amount=100.0):
+    return pd.DataFrame({"Code": ["111", "511"], "Account": ["Cash", "Revenue"],
+                         "2023": [amount, 80.0], "2024": [120.0, 90.0]})
+
+
+def test_cache_key_is_stable_for_identical_workbooks():
+    assert ReportCache.make_key(_ledger(), *INDICATORS) == ReportCache.make_key(_ledger(), *INDICATORS)
+
+
+def test_cache_key_ignores_blank_rows():
+    padded = pd.concat([_ledger(), pd.DataFrame([[None] * 4], columns=_ledger().columns)], ignore_index=True)
+    assert ReportCache.make_key(padded, *INDICATORS) == ReportCache.make_key(_ledger(), *INDICATORS)
+
+
+@pytest.mark.parametrize("changed", [
+    {"df": _ledger(amount=101.0)},
+    {"balance_str": "Total Assets, Equity"},
+    {"model": "gpt-4o-mini"},
+    {"prompt_version": "next"},
+])
+def test_cache_key_changes_with_inputs(changed):
+    arguments = {"df": _ledger(), "balance_str": INDICATORS[0], "income_str": INDICATORS[1], "cf_str": INDICATORS[2]}
+    baseline = ReportCache.make_key(**arguments)
+    arguments.update(changed)
+    assert ReportCache.make_key(**arguments) != baseline
+
+
+def test_build_tables_data_uses_snake_case_keys():
+    tables = build_tables_data(REPORT_TEXT)
+
+    assert {"balance_sheet", "income_statement", "cash_flow_statement"} <= set(tables)
+    assert len(tables["balance_sheet"]) == 2
+    assert _strip(tables["balance_sheet"][0]) == {"Indicator": "Total Assets", "2024": "1200", "2023": "1000"}
+    assert [_strip(row) for row in tables["cash_flow_statement"]] == [
+        {"Indicator": "Net Cash Flow", "2024": "50", "2023": "-20"}
+    ]
+
+
+def test_cached_tables_round_trip(db):
+    cache = ReportCache(ttl_seconds=0, max_entries=10)
+    key = ReportCache.make_key(_ledger(), *INDICATORS)
+    tables = build_tables_data(REPORT_TEXT)
+
+    assert cache.get(key) is None
+    cache.put(key, REPORT_TEXT, tables)
+    cached = cache.get(key)
+
+    assert cached["report_text"] == REPORT_TEXT
+    assert cached["tables"] == tables
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_cache_evicts_least_recently_used(db):
+    cache = ReportCache(ttl_seconds=0, max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, key)
+    cache.get("a")
+    cache.put("c", "c")
+
+    assert cache.get("b") is None
+    assert cache.get("a")["report_text"] == "a"
+    assert cache.get("c")["report_text"] == "c"
+
+
+@pytest.fixture
+def agent(db, monkeypatch):
+    monkeypatch.setattr(financial_agent_module, "load_financial_data", lambda path: _ledger())
+    monkeypatch.setattr(financial_agent_module, "load_financial_indicators", lambda: INDICATORS)
+    monkeypatch.setattr(financial_agent_module, "get_report_cache",
+                        lambda: ReportCache(ttl_seconds=0, max_entries=10))
+    db.store_uploaded_file("file-1", "ledger.xlsx", "uploads/ledger.xlsx", file_size=1)
+    return financial_agent_module.FinancialReportAgent()
+
+
+def test_agent_fills_cache_with_api_table_keys(agent, monkeypatch):
+    async def generate(*args):
+        return REPORT_TEXT
+    monkeypatch.setattr(financial_agent_module, "agenerate_financial_report", generate)
+
+    result = asyncio.run(agent.analyze_document("file-1"))
+
+    cached = ReportCache().get(ReportCache.make_key(_ledger(), *INDICATORS))
+    assert cached["tables"] == result["tables"] == build_tables_data(REPORT_TEXT)
+    assert "balance_sheet" in cached["tables"]
+
+
+def test_agent_reuses_api_cache_entry(agent, monkeypatch):
+    async def generate(*args):
+        raise AssertionError("cache hit must not call the model")
+    monkeypatch.setattr(financial_agent_module, "agenerate_financial_report", generate)
+    monkeypatch.setattr(financial_agent_module, "build_tables_data",
+                        lambda text: pytest.fail("cache hit must not re-extract tables"))
+
+    tables = build_tables_data(REPORT_TEXT)
+    ReportCache().put(ReportCache.make_key(_ledger(), *INDICATORS), REPORT_TEXT, tables)
+
+    result = asyncio.run(agent.analyze_document("file-1"))
+
+    assert "error" not in result
+    assert result["tables"] == tables
+    assert result["analysis_summary"] == REPORT_TEXT
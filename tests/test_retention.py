@@ -0,0 +1,109 @@
+"""Tests for the batched, resumable retention purge (services/retention.py)"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from financial_analysis.services.retention import RetentionEngine
+from financial_analysis.storage.database_manager import GeneratedReport, UploadedDocument
+
+
+def _add_expired(db, tmp_path, count, age_days=40):
+    """Insert count expired documents backed by real local files"""
+    uploaded_at = datetime.utcnow() - timedelta(days=age_days)
+    paths = {}
+    with db.get_session() as session:
+        for i in range(count):
+            file_id = f"doc-{i:02d}"
+            path = tmp_path / f"{file_id}.xlsx"
+            path.write_bytes(b"content")
+            paths[file_id] = path
+            session.add(UploadedDocument(id=file_id, filename=file_id, original_filename=path.name,
+                                         file_path=str(path), uploaded_at=uploaded_at + timedelta(minutes=i)))
+        session.commit()
+    return paths
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return RetentionEngine(batch_size=2, delete_workers=2, checkpoint_path=str(tmp_path / "checkpoint.json"),
+                           delete_vectors=False)
+
+
+def test_run_purges_expired_documents_and_reports(db, engine, tmp_path):
+    paths = _add_expired(db, tmp_path, 5)
+    db.store_uploaded_file("fresh", "fresh.xlsx", "uploads/fresh.xlsx", file_size=1)
+    with db.get_session() as session:
+        session.add(GeneratedReport(document_id="doc-00", report_type="financial",
+                                    generated_at=datetime.utcnow() - timedelta(days=40)))
+        session.add(GeneratedReport(document_id="fresh", report_type="financial"))
+        session.commit()
+
+    report = engine.run(days_old=30)
+
+    assert report["status"] == "completed"
+    assert report["documents_deleted"] == 5
+    assert report["blobs_deleted"] == 5
+    assert report["reports_deleted"] == 1
+    assert not any(path.exists() for path in paths.values())
+    assert [f["file_id"] for f in db.list_uploaded_files_page()["files"]] == ["fresh"]
+
+
+def test_interrupted_run_resumes_from_checkpoint(db, engine, tmp_path, monkeypatch):
+    paths = _add_expired(db, tmp_path, 5)
+    purge_documents = db.purge_documents
+    calls = []
+
+    def flaky_purge(file_ids):
+        calls.append(list(file_ids))
+        if len(calls) == 2:
+            raise RuntimeError("database is locked")
+        return purge_documents(file_ids)
+
+    monkeypatch.setattr(db, "purge_documents", flaky_purge)
+    with pytest.raises(RuntimeError):
+        engine.run(days_old=30)
+
+    checkpoint = json.loads(engine.checkpoint_path.read_text())
+    assert checkpoint["status"] == "failed"
+    assert checkpoint["phase"] == "documents"
+    assert checkpoint["documents_deleted"] == 2
+    assert checkpoint["cursor"] is not None
+
+    monkeypatch.setattr(db, "purge_documents", purge_documents)
+    # A different window must not change the cutoff of the run being resumed
+    report = engine.run(days_old=1000, resume=True)
+
+    assert report["status"] == "completed"
+    assert report["resumed"] is True
+    assert report["run_id"] == checkpoint["run_id"]
+    assert report["cutoff"] == checkpoint["cutoff"]
+    assert report["documents_deleted"] == 5
+    assert not any(path.exists() for path in paths.values())
+    assert db.list_uploaded_files_page()["files"] == []
+    assert engine.get_status()["status"] == "completed"
+
+
+def test_completed_checkpoint_starts_a_new_run(db, engine, tmp_path):
+    _add_expired(db, tmp_path, 1)
+    first = engine.run(days_old=30)
+
+    second = engine.run(days_old=30, resume=True)
+
+    assert second["run_id"] != first["run_id"]
+    assert second["resumed"] is False
+    assert second["documents_deleted"] == 0
+
+
+def test_failed_blob_delete_keeps_the_document(db, engine, tmp_path, monkeypatch):
+    _add_expired(db, tmp_path, 3)
+    monkeypatch.setattr(RetentionEngine, "_delete_blob",
+                        lambda self, file_path: "failed" if file_path.endswith("doc-01.xlsx") else "deleted")
+
+    report = engine.run(days_old=30)
+
+    assert report["documents_deleted"] == 2
+    assert report["documents_kept"] == 1
+    assert report["blob_failures"] == 1
+    assert [f["file_id"] for f in db.list_uploaded_files_page()["files"]] == ["doc-01"]
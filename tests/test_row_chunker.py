@@ -0,0 +1,118 @@
+"""Tests for grouping spreadsheet rows into embedding chunks (services/row_chunker.py)"""
+
+import pandas as pd
+
+from financial_analysis.services.row_chunker import (
+    PREVIEW_CHARS,
+    _code_bounds,
+    _window_bounds,
+    chunk_rows,
+)
+
+
+def _ledger():
+    return pd.DataFrame({
+        "Code": ["111", "112", "113", "121", None, "131", "132"],
+        "Account": ["Cash", "Bank", "Deposits", "Receivables", "Receivables note", "Inventory", "Goods"],
+        "2023": [1.0, 2.0, 3.0, 4.0, None, 6.0, 7.0],
+        "2024": [10.0, 20.0, 30.0, 40.0, None, 60.0, 70.0],
+    })
+
+
+def test_window_bounds_overlap_and_cover_every_row():
+    assert _window_bounds(10, 4, 1) == [(0, 4), (3, 7), (6, 10)]
+    assert _window_bounds(3, 5, 2) == [(0, 3)]
+    # Overlap as large as the window still advances
+    assert _window_bounds(3, 2, 2) == [(0, 2), (1, 3)]
+
+
+def test_code_bounds_split_on_prefix_change():
+    codes = pd.Series(["111", "112", "121", None, "131"])
+
+    # Rows without a code stay with the range before them
+    assert _code_bounds(codes, max_rows=20) == [(0, 2), (2, 4), (4, 5)]
+
+
+def test_code_bounds_cap_each_range():
+    codes = pd.Series(["111", "112", "113", "114", "115"])
+
+    assert _code_bounds(codes, max_rows=2) == [(0, 2), (2, 4), (4, 5)]
+
+
+def test_code_strategy_chunks_by_account_range():
+    chunks = chunk_rows(_ledger(), strategy="code", chunk_rows=20)
+
+    assert [(chunk.row_start, chunk.row_end) for chunk in chunks] == [(0, 2), (3, 4), (5, 6)]
+    assert [(chunk.code_start, chunk.code_end) for chunk in chunks] == [("111", "113"), ("121", "121"), ("131", "132")]
+    assert [chunk.chunk_index for chunk in chunks] == [0, 1, 2]
+
+
+def test_code_strategy_without_code_column_uses_windows():
+    df = _ledger().drop(columns=["Code"])
+
+    chunks = chunk_rows(df, strategy="code", chunk_rows=3, overlap=1)
+
+    assert [(chunk.row_start, chunk.row_end) for chunk in chunks] == [(0, 2), (2, 4), (4, 6)]
+    assert all(chunk.code_start is None for chunk in chunks)
+
+
+def test_window_strategy():
+    chunks = chunk_rows(_ledger(), strategy="window", chunk_rows=4, overlap=2)
+
+    assert [(chunk.row_start, chunk.row_end) for chunk in chunks] == [(0, 3), (2, 5), (4, 6)]
+
+
+def test_row_strategy_has_one_chunk_per_row():
+    chunks = chunk_rows(_ledger(), strategy="row")
+
+    assert [(chunk.row_start, chunk.row_end) for chunk in chunks] == [(i, i) for i in range(7)]
+    assert chunk_rows(pd.DataFrame(), strategy="row") == []
+
+
+def test_chunk_text_has_headers_once_with_aligned_cells():
+    chunks = chunk_rows(_ledger(), strategy="code", chunk_rows=20)
+
+    assert chunks[0].text.split("\n") == [
+        "Code | Account | 2023 | 2024",
+        "111 | Cash | 1.0 | 10.0",
+        "112 | Bank | 2.0 | 20.0",
+        "113 | Deposits | 3.0 | 30.0",
+    ]
+    # Empty cells keep their column position
+    assert chunks[1].text.split("\n")[2] == " | Receivables note |  | "
+
+
+def test_columns_empty_in_the_chunk_are_left_out():
+    df = _ledger()
+    df["Notes"] = [None] * 6 + ["Check stock count"]
+
+    chunks = chunk_rows(df, strategy="code", chunk_rows=20)
+
+    assert chunks[0].text.split("\n")[0] == "Code | Account | 2023 | 2024"
+    assert chunks[2].text.split("\n")[0] == "Code | Account | 2023 | 2024 | Notes"
+    assert chunks[2].text.split("\n")[1] == "131 | Inventory | 6.0 | 60.0 | "
+
+
+def test_payload_references_row_range():
+    chunk = chunk_rows(_ledger(), strategy="code", chunk_rows=20)[2]
+
+    payload = chunk.payload("ledger.xlsx", "file-1")
+
+    assert payload == {
+        "type": "row_chunk",
+        "filename": "ledger.xlsx",
+        "file_id": "file-1",
+        "chunk_index": 2,
+        "row_start": 5,
+        "row_end": 6,
+        "row_count": 2,
+        "preview": chunk.text[:PREVIEW_CHARS],
+        "code_start": "131",
+        "code_end": "132",
+    }
+
+
+def test_payload_without_codes_has_no_code_range():
+    chunk = chunk_rows(_ledger().drop(columns=["Code"]), strategy="row")[0]
+
+    assert "code_start" not in chunk.payload("ledger.xlsx", "file-1")
@@ -0,0 +1,52 @@
+"""Tests for incremental table extraction from streamed reports (core/financial_analyzer.py)"""
+
+import pytest
+
+from financial_analysis.core import financial_analyzer
+from financial_analysis.core.financial_analyzer import IncrementalTableExtractor, extract_structured_tables
+
+from test_report_cache import REPORT_TEXT
+
+
+@pytest.fixture(autouse=True)
+def output_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(financial_analyzer, "Path", lambda *_: tmp_path / "src" / "core" / "financial_analyzer.py")
+
+
+def _stream(text, chunk_size):
+    extractor = IncrementalTableExtractor()
+    tables = []
+    for start in range(0, len(text), chunk_size):
+        tables.extend(extractor.feed(text[start:start + chunk_size]))
+    return tables + extractor.finish()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, len(REPORT_TEXT)])
+def test_streamed_tables_match_full_extraction(chunk_size):
+    expected = extract_structured_tables(REPORT_TEXT)
+
+    streamed = _stream(REPORT_TEXT, chunk_size)
+
+    assert [name for name, _ in streamed] == list(expected)
+    for name, df in streamed:
+        assert df.to_dict(orient="records") == expected[name].to_dict(orient="records")
+
+
+def test_table_is_emitted_when_next_heading_starts():
+    extractor = IncrementalTableExtractor()
+    first, rest = REPORT_TEXT.split("#### Income Statement Table")
+
+    assert extractor.feed(first) == []
+    emitted = extractor.feed("#### Income Statement Table\n")
+
+    assert [name for name, _ in emitted] == ["Balance Sheet"]
+
+
+def test_unterminated_last_line_is_flushed_on_finish():
+    extractor = IncrementalTableExtractor()
+    extractor.feed("#### Cash Flow Statement Table\n| Indicator | 2024 |\n| Net Cash Flow | 50 |")
+
+    tables = extractor.finish()
+
+    assert len(tables) == 1
+    assert len(tables[0][1]) == 1
@@ -0,0 +1,163 @@
+"""Tests for streaming uploads into storage (storage/gcs_client.py, storage/local_storage_client.py)"""
+
+import asyncio
+import hashlib
+import io
+
+import pytest
+
+from financial_analysis.storage.gcs_client import GCSUploadStream, UploadTooLarge, stream_upload
+from financial_analysis.storage.local_storage_client import LocalStorageClient
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorageClient(base_path=str(tmp_path / "storage"))
+
+
+def _stored_files(storage):
+    return sorted(str(path.relative_to(storage.base_path)) for path in storage.base_path.rglob("*") if path.is_file())
+
+
+def test_local_stream_appears_only_on_commit(storage):
+    stream = storage.open_upload_stream("uploads/a.xlsx")
+    stream.write(b"abc")
+    stream.write(b"def")
+
+    assert _stored_files(storage) == ["uploads/a.xlsx.part"]
+    assert stream.commit() == "uploads/a.xlsx"
+    assert _stored_files(storage) == ["uploads/a.xlsx"]
+    assert storage.download_file("uploads/a.xlsx") == b"abcdef"
+    assert stream.bytes_written == 6
+
+
+def test_local_stream_commit_replaces_existing_file(storage):
+    first = storage.open_upload_stream("uploads/a.xlsx")
+    first.write(b"old")
+    first.commit()
+
+    second = storage.open_upload_stream("uploads/a.xlsx")
+    second.write(b"new")
+    second.commit()
+
+    assert storage.download_file("uploads/a.xlsx") == b"new"
+
+
+def test_local_stream_abort_removes_partial_file(storage):
+    stream = storage.open_upload_stream("uploads/a.xlsx")
+    stream.write(b"abc")
+
+    stream.abort()
+
+    assert _stored_files(storage) == []
+
+
+class FakeUpload:
+    upload_url = "https://storage.googleapis.com/upload/session-1"
+
+
+class FakeTransport:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.deleted = []
+
+    def delete(self, url):
+        if self.fail:
+            raise ConnectionError("network down")
+        self.deleted.append(url)
+
+
+class LegacyWriter:
+    """BlobWriter from google-cloud-storage releases without terminate()"""
+
+    def __init__(self, transport=None):
+        self._upload_and_transport = (FakeUpload(), transport) if transport else None
+
+
+class FakeBlob:
+    def __init__(self, writer):
+        self.writer = writer
+
+    def open(self, mode, **kwargs):
+        return self.writer
+
+
+def test_gcs_abort_deletes_the_resumable_session():
+    transport = FakeTransport()
+    stream = GCSUploadStream(FakeBlob(LegacyWriter(transport)), "uploads/a.xlsx")
+
+    stream.abort()
+    stream.abort()
+
+    assert transport.deleted == [FakeUpload.upload_url]
+
+
+def test_gcs_abort_prefers_writer_terminate():
+    class Writer(LegacyWriter):
+        terminated = False
+
+        def terminate(self):
+            self.terminated = True
+
+    writer = Writer(FakeTransport())
+    GCSUploadStream(FakeBlob(writer), "uploads/a.xlsx").abort()
+
+    assert writer.terminated
+    assert writer._upload_and_transport[1].deleted == []
+
+
+def test_gcs_abort_before_first_chunk_has_nothing_to_cancel():
+    GCSUploadStream(FakeBlob(LegacyWriter()), "uploads/a.xlsx").abort()
+
+
+def test_gcs_abort_logs_a_failed_cancel(caplog):
+    stream = GCSUploadStream(FakeBlob(LegacyWriter(FakeTransport(fail=True))), "uploads/a.xlsx")
+
+    stream.abort()
+
+    assert "Could not cancel GCS upload session" in caplog.text
+
+
+class UnsizedUpload:
+    """UploadFile stand-in whose size is unknown up front, so only the streaming check can catch it"""
+
+    def __init__(self, content):
+        self._content = io.BytesIO(content)
+        self.reads = 0
+
+    async def read(self, size=-1):
+        self.reads += 1
+        return self._content.read(size)
+
+
+def test_stream_upload_stores_file_and_hash(storage):
+    content = b"x" * 50
+    source = UnsizedUpload(content)
+
+    size, sha256 = asyncio.run(stream_upload(source, storage, "uploads/a.xlsx", "application/octet-stream",
+                                             max_size=64, chunk_size=16))
+
+    assert size == 50
+    assert sha256 == hashlib.sha256(content).hexdigest()
+    assert source.reads == 5
+    assert storage.download_file("uploads/a.xlsx") == content
+    assert _stored_files(storage) == ["uploads/a.xlsx"]
+
+
+def test_stream_upload_exactly_at_limit_is_accepted(storage):
+    size, _ = asyncio.run(stream_upload(UnsizedUpload(b"x" * 64), storage, "uploads/a.xlsx", "application/octet-stream",
+                                        max_size=64, chunk_size=16))
+
+    assert size == 64
+
+
+def test_stream_upload_over_limit_aborts_partial_upload(storage):
+    source = UnsizedUpload(b"x" * 100)
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(stream_upload(source, storage, "uploads/a.xlsx", "application/octet-stream",
+                                  max_size=64, chunk_size=16))
+
+    # Stops reading at the first chunk past the limit
+    assert source.reads == 5
+    assert _stored_files(storage) == []
@@ -0,0 +1,222 @@
+"""Tests for Qdrant points and collection profiles (services/vector_database.py)"""
+
+import os
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client import QdrantClient
+
+from financial_analysis.services import vector_database
+from financial_analysis.services.vector_database import CollectionProfile, QdrantManager
+
+VECTOR_SIZE = 4
+
+
+@pytest.fixture
+def qdrant(monkeypatch):
+    monkeypatch.setattr(vector_database, "QdrantClient", lambda **_: QdrantClient(":memory:"))
+    return QdrantManager(collection_name="test", vector_size=VECTOR_SIZE, profile=CollectionProfile())
+
+
+def _rows(file_id, count):
+    vectors = [[1.0, float(i), 0.0, 1.0] for i in range(count)]
+    payloads = [{"file_id": file_id, "row_index": i, "type": "excel_row"} for i in range(count)]
+    return vectors, payloads
+
+
+def test_points_by_file_id_skip_vectors_unless_requested(qdrant):
+    qdrant.add_vectors(*_rows("file-1", 3), wait=True)
+    qdrant.add_vectors(*_rows("file-2", 2), wait=True)
+
+    points = qdrant.get_vectors_by_file_id("file-1")
+    with_vectors = list(qdrant.iter_vectors_by_file_id("file-1", with_vectors=True))
+
+    assert sorted(point["payload"]["row_index"] for point in points) == [0, 1, 2]
+    assert all(point["vector"] is None for point in points)
+    assert all(len(point["vector"]) == VECTOR_SIZE for point in with_vectors)
+
+
+def test_delete_by_file_id_counts_and_removes_only_that_file(qdrant):
+    qdrant.add_vectors(*_rows("file-1", 3), wait=True)
+    qdrant.add_vectors(*_rows("file-2", 2), wait=True)
+    version = qdrant.collection_version
+
+    assert qdrant.delete_vectors_by_file_id("file-1") == 3
+    assert qdrant.get_vectors_by_file_id("file-1") == []
+    assert len(qdrant.get_vectors_by_file_id("file-2")) == 2
+    assert qdrant.collection_version > version
+
+    # Nothing matched: no delete request and no cache invalidation
+    version = qdrant.collection_version
+    assert qdrant.delete_vectors_by_file_id("file-1") == 0
+    assert qdrant.collection_version == version
+
+
+def test_point_ids_are_stable_uuid5_per_file():
+    point_id_for = QdrantManager.point_id_for
+    row = {"file_id": "file-1", "row_index": 7}
+
+    assert point_id_for(row) == point_id_for(dict(row))
+    assert uuid.UUID(point_id_for(row)).version == 5
+    assert point_id_for(row) != point_id_for({"file_id": "file-2", "row_index": 7})
+    assert point_id_for({"file_id": "file-1", "chunk_index": 7}) != point_id_for(row)
+    assert point_id_for({"file_id": "file-1", "type": "file_summary", "row_index": 0}) == \
+        point_id_for({"file_id": "file-1", "type": "file_summary"})
+    assert point_id_for({}, doc_id="doc-1") == point_id_for({"source": "other"}, doc_id="doc-1")
+    # Nothing to key on: a fresh random ID
+    assert point_id_for({}) != point_id_for({})
+
+
+def test_reingesting_a_file_overwrites_its_points(qdrant):
+    first = qdrant.add_vectors(*_rows("file-1", 5), wait=True)
+    _, payloads = _rows("file-1", 5)
+    second = qdrant.add_vectors([[0.0, 1.0, 1.0, 0.0]] * 5, payloads, wait=True)
+
+    assert first == second
+    assert qdrant.client.count("test", exact=True).count == 5
+    stored = list(qdrant.iter_vectors_by_file_id("file-1", with_vectors=True))
+    assert all(point["vector"][0] == 0.0 for point in stored)
+
+
+def test_batched_parallel_upserts_cover_every_point(qdrant, monkeypatch):
+    qdrant.upsert_batch_size = 3
+    qdrant.upsert_parallel = 2
+    batch_sizes = []
+    upsert = qdrant.client.upsert
+
+    def recording_upsert(collection_name, points, wait):
+        batch_sizes.append(len(points))
+        return upsert(collection_name=collection_name, points=points, wait=wait)
+    monkeypatch.setattr(qdrant.client, "upsert", recording_upsert)
+
+    doc_ids = qdrant.add_vectors(*_rows("file-1", 10), wait=True)
+
+    assert sorted(batch_sizes) == [1, 3, 3, 3]
+    assert len(set(doc_ids)) == 10
+    stored = qdrant.get_vectors_by_file_id("file-1")
+    assert sorted(point["payload"]["row_index"] for point in stored) == list(range(10))
+    assert sorted(str(point["id"]) for point in stored) == sorted(doc_ids)
+
+
+def test_failed_batch_is_raised(qdrant, monkeypatch):
+    qdrant.upsert_batch_size = 2
+    version = qdrant.collection_version
+
+    def failing_upsert(collection_name, points, wait):
+        raise ConnectionError("qdrant unavailable")
+    monkeypatch.setattr(qdrant.client, "upsert", failing_upsert)
+
+    with pytest.raises(ConnectionError):
+        qdrant.add_vectors(*_rows("file-1", 5))
+    assert qdrant.collection_version == version
+
+
+def _collection_info(on_disk=False, m=16, ef_construct=100, indexing_threshold=20000, memmap_threshold=None,
+                     scalar=None):
+    """get_collection() result for an existing collection created without a profile"""
+    return SimpleNamespace(
+        config=SimpleNamespace(
+            params=SimpleNamespace(vectors=SimpleNamespace(size=VECTOR_SIZE, on_disk=on_disk)),
+            hnsw_config=SimpleNamespace(m=m, ef_construct=ef_construct, on_disk=None),
+            optimizer_config=SimpleNamespace(indexing_threshold=indexing_threshold, memmap_threshold=memmap_threshold),
+            quantization_config=SimpleNamespace(scalar=scalar) if scalar else None
+        ),
+        payload_schema={field: "keyword" for field in vector_database.PAYLOAD_INDEX_FIELDS}
+    )
+
+
+class ExistingCollectionClient:
+    """QdrantClient stand-in for a server that already has the collection"""
+
+    def __init__(self, info):
+        self.info = info
+        self.updates = []
+
+    def get_collections(self):
+        return SimpleNamespace(collections=[SimpleNamespace(name="test")])
+
+    def get_collection(self, collection_name):
+        return self.info
+
+    def update_collection(self, collection_name, **changes):
+        self.updates.append(changes)
+
+
+@pytest.fixture
+def existing_collection(monkeypatch):
+    for name in list(os.environ):
+        if name.startswith("QDRANT_"):
+            monkeypatch.delenv(name)
+    client = ExistingCollectionClient(_collection_info())
+    monkeypatch.setattr(vector_database, "QdrantClient", lambda **_: client)
+    return client
+
+
+def test_profile_from_env_defaults_match_the_dataclass(existing_collection):
+    assert CollectionProfile.from_env() == CollectionProfile()
+
+
+def test_profile_from_env_reads_overrides(existing_collection, monkeypatch):
+    monkeypatch.setenv("QDRANT_QUANTIZATION", "NONE")
+    monkeypatch.setenv("QDRANT_VECTORS_ON_DISK", "false")
+    monkeypatch.setenv("QDRANT_HNSW_M", "32")
+    monkeypatch.setenv("QDRANT_OVERSAMPLING", "3.5")
+
+    profile = CollectionProfile.from_env()
+
+    assert (profile.quantization, profile.vectors_on_disk, profile.hnsw_m, profile.oversampling) == ("none", False, 32, 3.5)
+    assert not profile.quantized
+    assert profile.quantization_config() is None
+    assert profile.search_params().quantization is None
+
+
+def test_default_constructor_only_reports_profile_differences(existing_collection, capsys):
+    manager = QdrantManager(collection_name="test", vector_size=VECTOR_SIZE)
+
+    assert not manager.migrate_profile
+    assert existing_collection.updates == []
+    assert "differs from the profile, not migrating" in capsys.readouterr().out
+
+
+def test_dry_run_lists_only_differing_settings(existing_collection):
+    manager = QdrantManager(collection_name="test", vector_size=VECTOR_SIZE)
+
+    planned = manager.apply_profile(dry_run=True)
+
+    assert set(planned) == {"vectors_config", "optimizers_config", "quantization_config"}
+    assert planned["vectors_config"] == {"": {"on_disk": True}}
+    assert planned["optimizers_config"] == {"indexing_threshold": 20000, "memmap_threshold": 20000}
+    assert planned["quantization_config"]["scalar"] == {"type": "int8", "quantile": 0.99, "always_ram": True}
+    assert existing_collection.updates == []
+
+
+def test_opt_in_applies_the_profile_on_startup(existing_collection, monkeypatch):
+    monkeypatch.setenv("QDRANT_APPLY_PROFILE", "true")
+
+    QdrantManager(collection_name="test", vector_size=VECTOR_SIZE)
+
+    assert len(existing_collection.updates) == 1
+    assert set(existing_collection.updates[0]) == {"vectors_config", "optimizers_config", "quantization_config"}
+
+
+def test_matching_collection_needs_no_changes(existing_collection):
+    existing_collection.info = _collection_info(
+        on_disk=True, memmap_threshold=20000,
+        scalar=SimpleNamespace(quantile=0.99, always_ram=True)
+    )
+    manager = QdrantManager(collection_name="test", vector_size=VECTOR_SIZE, migrate_profile=True)
+
+    assert manager.apply_profile() == {}
+    assert existing_collection.updates == []
+
+
+def test_disabling_quantization_is_planned(existing_collection):
+    existing_collection.info = _collection_info(
+        on_disk=True, memmap_threshold=20000,
+        scalar=SimpleNamespace(quantile=0.99, always_ram=True)
+    )
+    manager = QdrantManager(collection_name="test", vector_size=VECTOR_SIZE,
+                            profile=CollectionProfile(quantization="none"))
+
+    assert manager.apply_profile(dry_run=True) == {"quantization_config": "Disabled"}